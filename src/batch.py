@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+'''Runs the operations listed in a manifest in one process.
+
+A manifest lists operations in the order in which they must run. Each
+operation is a mapping from the name of a sub command to its arguments, named
+like the options of dli (with dashes or underscores); flags take true, and
+repeated options take a list. Ticket summaries are taken from the tickets
+mapping, so checkout never prompts:
+
+    workers: 4
+    tickets:
+      PS-1234: Update the installation guide
+    operations:
+      - add: {project-code: PS-8.0, source-dir: ../../ps-8.0}
+      - add: {project-code: PS-5.7, source-dir: ../../ps-5.7}
+      - checkout: {project-code: PS-8.0, ticket-id: PS-1234}
+      - detect: {project-code: PS-8.0}
+      - search: {query: [binary, log]}
+      - gc: {dry-run: true}
+
+Operations of different projects run at the same time, each project in a
+worker process; the operations of one project run in the order of the
+manifest, and after a failure the remaining operations of the project are
+skipped. Operations which read or write more than one project (merge, diff,
+and the operations which take no project code) run alone, after all
+operations listed before them have finished. Workers are forked from the
+batch process, so the options and the meta documents already parsed are
+shared with them.'''
+
+import yaml
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from constants import OperationName as op_name, UIArgumentName as ui_name, NameFactory
+from ui import CLIArgumentFactory
+from meta import MetaDocument
+from daemon import run_captured
+from errors import ManifestInvalid
+
+
+class Job:
+    '''One operation of the manifest.'''
+    __slots__ = ('number', 'operation', 'argv', 'project_code')
+
+    def __init__(self, number, operation, argv, project_code):
+        self.number = number
+        self.operation = operation
+        self.argv = argv
+        self.project_code = project_code
+
+
+    @property
+    def exclusive(self):
+        return (not self.project_code or
+                self.operation in (op_name.merge, op_name.diff))
+
+
+
+class BatchManifest:
+    workers_key = 'workers'
+    tickets_key = 'tickets'
+    operations_key = 'operations'
+
+    # Operations which never finish or which start other batches.
+    excluded = (op_name.daemon, op_name.watch, op_name.serve, op_name.batch)
+
+    def __init__(self, path, option_sep, name_sep):
+        self.path = path
+        self._names = NameFactory(name_sep_char=name_sep)
+        self._arguments = CLIArgumentFactory(opt_sep_char=option_sep,
+                                             name_sep_char=name_sep)
+        with open(path) as manifest_file:
+            data = yaml.safe_load(manifest_file) or {}
+        if not isinstance(data, dict):
+            raise ManifestInvalid('the manifest must be a mapping')
+        self.workers = data.get(BatchManifest.workers_key)
+        self.tickets = {str(_id_).upper(): str(_summary_)
+                        for _id_, _summary_ in (data.get(BatchManifest.tickets_key) or {}).items()}
+        self.jobs = [self._make_job(_number_, _entry_)
+                     for _number_, _entry_ in enumerate(data.get(BatchManifest.operations_key) or [], 1)]
+
+
+    def _make_job(self, number, entry):
+        if not isinstance(entry, dict) or len(entry) != 1:
+            raise ManifestInvalid('operation {}: expected one sub command and its arguments'.format(number))
+        operation, arguments = next(iter(entry.items()))
+        if operation in BatchManifest.excluded:
+            raise ManifestInvalid("operation {}: '{}' cannot run in a batch".format(number, operation))
+        arguments = {self._names.make(_name_).name: _value_
+                     for _name_, _value_ in (arguments or {}).items()}
+
+        ticket_id = arguments.get(ui_name.ticket_id)
+        if operation == op_name.checkout and ui_name.ticket_summary not in arguments:
+            summary = ticket_id and self.tickets.get(str(ticket_id).upper())
+            if summary is None:
+                raise ManifestInvalid("operation {}: no summary of ticket '{}' in the manifest".format(
+                    number, ticket_id))
+            arguments[ui_name.ticket_summary] = summary
+
+        argv = [operation]
+        positional = []
+        for _name_, _value_ in arguments.items():
+            values = _value_ if isinstance(_value_, list) else [_value_]
+            if _name_ == ui_name.query:
+                positional.extend(str(_) for _ in values)
+                continue
+            option = self._arguments.make(_name_).option
+            for _each_ in values:
+                if _each_ is True:
+                    argv.append(option)
+                elif _each_ is not False and _each_ is not None:
+                    argv.extend([option, str(_each_)])
+        project_code = arguments.get(ui_name.project_code)
+        return Job(number, operation, argv + positional,
+                   project_code and str(project_code).strip().upper())
+
+
+    def stages(self):
+        '''Yields lists of groups of jobs: the groups of a stage may run at the
+        same time, and the jobs of a group run in order.'''
+        groups = {}
+        for _job_ in self.jobs:
+            if _job_.exclusive:
+                if groups:
+                    yield list(groups.values())
+                    groups = {}
+                yield [[_job_]]
+            else:
+                groups.setdefault(_job_.project_code, []).append(_job_)
+        if groups:
+            yield list(groups.values())
+
+
+
+def run_group(run_command, jobs):
+    '''Runs the jobs in order until one fails. Returns (job number, stdout,
+    stderr, status) for each job; skipped jobs have no status.'''
+    results = []
+    failed = False
+    for _job_ in jobs:
+        if failed:
+            results.append((_job_.number, '', '', None))
+            continue
+        stdout, stderr, status = run_captured(run_command, _job_.argv)
+        failed = status != 0
+        results.append((_job_.number, stdout, stderr, status))
+    return results
+
+
+
+class BatchRunner:
+    '''Runs the stages of a manifest with run_command(argv).'''
+
+    def __init__(self, manifest, run_command, env, workers=1):
+        self.manifest = manifest
+        self.run_command = run_command
+        self.env = env
+        self.workers = max(1, workers or 1)
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+
+
+    def _load_meta(self, project_codes):
+        '''Parses the meta documents of the projects before the workers are
+        forked, so that every worker finds them parsed.'''
+        for _code_ in project_codes:
+            try:
+                MetaDocument(product_code=_code_,
+                             data_dir_path=self.env.data_dir_path,
+                             meta_dir_name=self.env.meta_dir_name,
+                             data_file_suffix=self.env.data_file_suffix,
+                             record_id_sep=self.env.code_sep).read()
+            except FileNotFoundError:
+                pass
+
+
+    def run(self):
+        '''Yields (job, stdout, stderr, status) as the jobs finish; the status
+        of a skipped job is None.'''
+        jobs = {_job_.number: _job_ for _job_ in self.manifest.jobs}
+        for _stage_ in self.manifest.stages():
+            if len(_stage_) == 1 or self.workers == 1:
+                finished = (run_group(self.run_command, _group_) for _group_ in _stage_)
+                for _results_ in finished:
+                    yield from self._count(jobs, _results_)
+                continue
+
+            self._load_meta(_group_[0].project_code for _group_ in _stage_)
+            # Forked, not spawned: the workers inherit the parsed meta documents.
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(_stage_)),
+                                     mp_context=get_context('fork')) as pool:
+                futures = [pool.submit(run_group, self.run_command, _group_)
+                           for _group_ in _stage_]
+                for _future_ in as_completed(futures):
+                    yield from self._count(jobs, _future_.result())
+
+
+    def _count(self, jobs, results):
+        for _number_, _stdout_, _stderr_, _status_ in results:
+            if _status_ is None:
+                self.skipped += 1
+            elif _status_:
+                self.failed += 1
+            else:
+                self.succeeded += 1
+            yield jobs[_number_], _stdout_, _stderr_, _status_
@@ -0,0 +1,7 @@
+'''End to end benchmarks of dL operations on synthetic documentation corpora.
+
+Run from the src directory:
+
+    python3 -m bench --output results.json
+    python3 -m bench --baseline results.json
+'''
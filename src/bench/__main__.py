@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+'''Command line interface of the benchmarks.'''
+
+import argparse
+
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from bench.corpus import CorpusGenerator
+from bench.runner import Benchmark, compare, save, load
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench')
+    parser.add_argument('--products', type=int, default=2)
+    parser.add_argument('--versions', type=int, default=2)
+    parser.add_argument('--chapters', type=int, default=4)
+    parser.add_argument('--files-per-chapter', type=int, default=10)
+    parser.add_argument('--dup-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', help='Keep the corpus and library in this directory')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare the results with this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression')
+    arguments = parser.parse_args()
+
+    root_dir = arguments.work_dir or mkdtemp(prefix='dl-bench-')
+    try:
+        corpus = CorpusGenerator(root_dir + '/corpus',
+                                 products=arguments.products,
+                                 versions=arguments.versions,
+                                 chapters=arguments.chapters,
+                                 files_per_chapter=arguments.files_per_chapter,
+                                 dup_ratio=arguments.dup_ratio,
+                                 seed=arguments.seed)
+        results = Benchmark(root_dir, corpus).run()
+    finally:
+        if not arguments.work_dir:
+            rmtree(root_dir, ignore_errors=True)
+
+    print('{:<10} {:>10} {:>10} {:>10} {:>14} {:>12}'.format(
+        'operation', 'seconds', 'files/s', 'MB/s', 'sentences/s', 'peak RSS KB'))
+    for _operation_, _result_ in results['results'].items():
+        print('{:<10} {:>10.3f} {:>10.1f} {:>10.2f} {:>14.1f} {:>12}'.format(
+            _operation_, _result_['seconds'], _result_['files_per_second'],
+            _result_['mb_per_second'], _result_['sentences_per_second'],
+            _result_['peak_rss_kb']))
+
+    if arguments.output:
+        save(results, arguments.output)
+
+    if arguments.baseline:
+        for _operation_, _before_, _after_, _change_, _regressed_ in compare(
+                results, load(arguments.baseline), arguments.tolerance):
+            print('{:<10} {:>10.3f} -> {:>10.3f} {:>+8.1%} {}'.format(
+                _operation_, _before_, _after_, _change_,
+                'REGRESSION' if _regressed_ else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+'''Measures the size and speed tradeoff of the blob codecs.
+
+Run from the src directory, either on a synthetic corpus or on real sources:
+
+    python3 -m bench.codecs
+    python3 -m bench.codecs --source-dir ~/workspace/PS-8.0/source
+'''
+
+import argparse
+
+from os import walk
+from os.path import join as path_join
+from time import perf_counter
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from store import BlobStore, codecs
+from bench.corpus import CorpusGenerator
+
+
+def measure(source_dir, codec_names, skip_extensions, work_dir):
+    '''Stores every file under source_dir with each codec and reads it back.
+    Yields (codec, source bytes, stored bytes, write seconds, read seconds).'''
+    sources = [path_join(_dir_, _name_)
+               for _dir_, _, _names_ in walk(source_dir)
+               for _name_ in _names_]
+    for _codec_ in codec_names:
+        store = BlobStore(path_join(work_dir, _codec_), codec=_codec_,
+                          skip_extensions=skip_extensions)
+        names = [str(_) for _ in range(len(sources))]
+
+        started = perf_counter()
+        for _source_, _name_ in zip(sources, names):
+            store.put(_source_, _name_)
+        write_seconds = perf_counter() - started
+
+        started = perf_counter()
+        source_bytes = 0
+        for _name_ in names:
+            for _chunk_ in store.chunks(_name_):
+                source_bytes += len(_chunk_)
+        read_seconds = perf_counter() - started
+
+        stored_bytes = sum(_stat_.st_size for _, _stat_ in store.stats())
+        yield _codec_, source_bytes, stored_bytes, write_seconds, read_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench.codecs')
+    parser.add_argument('--source-dir', help='Measure these files instead of a synthetic corpus')
+    parser.add_argument('--skip', nargs='*', default=['png', 'ico', 'jpg', 'gif'])
+    arguments = parser.parse_args()
+
+    work_dir = mkdtemp(prefix='dl-bench-codecs-')
+    try:
+        source_dir = arguments.source_dir
+        if not source_dir:
+            source_dir = path_join(work_dir, 'corpus')
+            CorpusGenerator(source_dir, products=1, versions=1).generate()
+
+        print('{:<6} {:>12} {:>12} {:>7} {:>12} {:>12}'.format(
+            'codec', 'bytes', 'stored', 'ratio', 'write MB/s', 'read MB/s'))
+        for _codec_, _source_, _stored_, _write_, _read_ in measure(
+                source_dir, [BlobStore.no_codec] + sorted(codecs),
+                arguments.skip, path_join(work_dir, 'stores')):
+            megabytes = _source_ / (1 << 20)
+            print('{:<6} {:>12} {:>12} {:>7.2f} {:>12.1f} {:>12.1f}'.format(
+                _codec_, _source_, _stored_, _source_ / _stored_,
+                megabytes / _write_, megabytes / _read_))
+    finally:
+        rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
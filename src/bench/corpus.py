@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+'''Generates synthetic documentation projects for benchmarks.
+
+A corpus consists of several products, each in several versions. Each project
+is a Sphinx-like source tree with reStructuredText and Markdown documents,
+images and a configuration file. Sentences are drawn either from a pool shared
+by all projects, which produces duplicates, or generated uniquely. Successive
+versions of a product are derived from the previous version with a few edited
+sentences. Some documents contain `only' directives that refer to other
+versions of the same product.
+
+No meta files are generated: the meta documents of the library are the
+output of add, which is the first operation the benchmark times. Written in
+advance, they would make add measure the update of projects already in the
+library rather than adding them.'''
+
+from os import makedirs
+from os.path import join as path_join
+from random import Random
+from collections import OrderedDict
+
+
+class CorpusStats:
+    '''What was generated for one project.'''
+    def __init__(self, project_code, source_dir):
+        self.project_code = project_code
+        self.source_dir = source_dir
+        self.files = 0
+        self.bytes = 0
+        self.sentences = 0
+
+
+    def add(self, text_or_bytes, sentences=0):
+        self.files += 1
+        self.bytes += len(text_or_bytes)
+        self.sentences += sentences
+
+
+    def as_dict(self):
+        return OrderedDict([('project_code', self.project_code),
+                            ('files', self.files),
+                            ('bytes', self.bytes),
+                            ('sentences', self.sentences)])
+
+
+
+class CorpusGenerator:
+    '''Writes N products x M versions of documentation sources under root_dir.
+
+    dup_ratio is the probability that a sentence is taken from the shared pool;
+    edit_ratio is the probability that a sentence changes between versions.'''
+
+    words = ('server', 'replication', 'backup', 'cluster', 'node', 'query',
+             'index', 'table', 'transaction', 'storage', 'engine', 'option',
+             'variable', 'restore', 'encryption', 'plugin', 'user', 'log',
+             'configure', 'install', 'upgrade', 'monitor', 'performance',
+             'memory', 'thread', 'connection', 'schema', 'partition', 'the',
+             'a', 'is', 'to', 'of', 'and', 'when', 'with', 'for', 'may')
+    shared_pool_size = 500
+    png_size = 2048
+
+    def __init__(self, root_dir, products=2, versions=2, chapters=4,
+                 files_per_chapter=10, paragraphs_per_file=8,
+                 sentences_per_paragraph=4, dup_ratio=0.3, edit_ratio=0.05,
+                 only_ratio=0.2, seed=0):
+        self.root_dir = root_dir
+        self.products = products
+        self.versions = versions
+        self.chapters = chapters
+        self.files_per_chapter = files_per_chapter
+        self.paragraphs_per_file = paragraphs_per_file
+        self.sentences_per_paragraph = sentences_per_paragraph
+        self.dup_ratio = dup_ratio
+        self.edit_ratio = edit_ratio
+        self.only_ratio = only_ratio
+        self.seed = seed
+        self._random = Random(seed)
+        self._shared = [self._sentence() for _ in range(self.shared_pool_size)]
+
+
+    def parameters(self):
+        return OrderedDict([('products', self.products),
+                            ('versions', self.versions),
+                            ('chapters', self.chapters),
+                            ('files_per_chapter', self.files_per_chapter),
+                            ('paragraphs_per_file', self.paragraphs_per_file),
+                            ('sentences_per_paragraph', self.sentences_per_paragraph),
+                            ('dup_ratio', self.dup_ratio),
+                            ('edit_ratio', self.edit_ratio),
+                            ('only_ratio', self.only_ratio),
+                            ('seed', self.seed)])
+
+
+    @staticmethod
+    def project_code(product, version):
+        return 'PROD{}-{}.0'.format(product, version)
+
+
+    def _sentence(self):
+        words = [self._random.choice(self.words)
+                 for _ in range(self._random.randint(6, 16))]
+        return ' '.join(words).capitalize() + '.'
+
+
+    def _draw_sentence(self):
+        if self._random.random() < self.dup_ratio:
+            return self._shared[self._random.randrange(len(self._shared))]
+        return self._sentence()
+
+
+    def _make_document(self):
+        '''A document is a list of paragraphs; a paragraph is a list of sentences.'''
+        return [[self._draw_sentence() for _ in range(self.sentences_per_paragraph)]
+                for _ in range(self.paragraphs_per_file)]
+
+
+    def _edit_document(self, document):
+        return [[self._draw_sentence() if self._random.random() < self.edit_ratio else _s_
+                 for _s_ in _paragraph_]
+                for _paragraph_ in document]
+
+
+    def generate(self):
+        '''Writes all projects and returns the list of CorpusStats in the order
+        of generation (all versions of the first product first).'''
+        generated = []
+        for _product_ in range(self.products):
+            documents = None
+            for _version_ in range(self.versions):
+                if documents is None:
+                    documents = [[self._make_document()
+                                  for _ in range(self.files_per_chapter)]
+                                 for _ in range(self.chapters)]
+                else:
+                    documents = [[self._edit_document(_doc_) for _doc_ in _chapter_]
+                                 for _chapter_ in documents]
+                generated.append(self._write_project(_product_, _version_, documents))
+        return generated
+
+
+    def _write_project(self, product, version, documents):
+        project_code = self.project_code(product, version)
+        project_dir = path_join(self.root_dir, project_code)
+        source_dir = path_join(project_dir, 'source')
+        stats = CorpusStats(project_code, project_dir)
+        siblings = [self.project_code(product, _)
+                    for _ in range(self.versions) if _ != version]
+
+        makedirs(source_dir, exist_ok=True)
+        conf = "project = '{}'\nversion = '{}.0'\n".format(project_code, version)
+        self._write(path_join(source_dir, 'conf.py'), conf, stats)
+
+        toctree = ['.. toctree::', '']
+        for _chapter_, _docs_ in enumerate(documents):
+            chapter_dir = path_join(source_dir, 'chapter{}'.format(_chapter_))
+            makedirs(chapter_dir, exist_ok=True)
+            for _index_, _doc_ in enumerate(_docs_):
+                name = 'page{}'.format(_index_)
+                sentences = sum(len(_) for _ in _doc_)
+                if _index_ % 5 == 4:
+                    text = '\n\n'.join(' '.join(_) for _ in _doc_) + '\n'
+                    self._write(path_join(chapter_dir, name + '.md'), text, stats, sentences)
+                    continue
+                lines = [name.title(), '=' * len(name), '']
+                if siblings and self._random.random() < self.only_ratio:
+                    lines += ['.. only:: {}'.format(self._random.choice(siblings)), '']
+                for _paragraph_ in _doc_:
+                    lines += [' '.join(_paragraph_), '']
+                if _index_ % 3 == 0:
+                    image = 'figure{}.png'.format(_index_)
+                    self._write(path_join(chapter_dir, image),
+                                bytes(self._random.getrandbits(8) for _ in range(self.png_size)),
+                                stats)
+                    lines += ['.. image:: {}'.format(image), '']
+                self._write(path_join(chapter_dir, name + '.rst'), '\n'.join(lines), stats, sentences)
+                toctree.append('   chapter{}/{}'.format(_chapter_, name))
+
+        index = [project_code, '=' * len(project_code), ''] + toctree + ['']
+        self._write(path_join(source_dir, 'index.rst'), '\n'.join(index), stats)
+        return stats
+
+
+    @staticmethod
+    def _write(path, contents, stats, sentences=0):
+        mode = 'wb' if isinstance(contents, bytes) else 'w'
+        with open(path, mode) as output_file:
+            output_file.write(contents)
+        stats.add(contents, sentences)
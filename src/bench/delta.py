@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+'''Measures the storage of successive versions of edited pages with delta
+chains of different lengths.
+
+Run from the src directory:
+
+    python3 -m bench.delta
+    python3 -m bench.delta --versions 200 --chains 0 10 50
+'''
+
+import argparse
+import random
+
+from os.path import join as path_join
+from time import perf_counter
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from store import BlobStore, ObjectStore
+
+
+def make_versions(pages, versions, lines, edits, seed):
+    '''Yields (page, version, contents): each version of a page changes,
+    inserts or removes edits lines of the previous one.'''
+    generator = random.Random(seed)
+    words = ['server', 'replication', 'binary', 'log', 'option', 'variable',
+             'install', 'package', 'the', 'of', 'is', 'to', 'and', 'backup']
+
+    def line():
+        return ' '.join(generator.choice(words) for _ in range(12)) + '\n'
+
+    for _page_ in range(pages):
+        text = [line() for _ in range(lines)]
+        for _version_ in range(versions):
+            yield _page_, _version_, ''.join(text).encode()
+            for _ in range(edits):
+                position = generator.randrange(len(text))
+                choice = generator.random()
+                if choice < 0.6:
+                    text[position] = line()
+                elif choice < 0.8:
+                    text.insert(position, line())
+                elif len(text) > 1:
+                    del text[position]
+
+
+def measure(work_dir, contents, max_chain):
+    '''Adds the versions to an object store, each against the previous version
+    of its page. Returns (stored bytes, write seconds, read seconds).'''
+    source = BlobStore(path_join(work_dir, 'source'))
+    objects = ObjectStore(path_join(work_dir, 'objects-{}'.format(max_chain)),
+                          max_chain=max_chain)
+    names = []
+    previous = {}
+    started = perf_counter()
+    for _page_, _version_, _data_ in contents:
+        blob_name = '{}-{}'.format(_page_, _version_)
+        source.put_chunks([_data_], blob_name)
+        name = objects.add_blob(source, blob_name, previous.get(_page_))
+        previous[_page_] = name
+        names.append(name)
+    write_seconds = perf_counter() - started
+
+    objects = ObjectStore(objects.root_path, max_chain=max_chain) # nothing cached
+    started = perf_counter()
+    for _name_ in names:
+        for _ in objects.chunks(_name_):
+            pass
+    read_seconds = perf_counter() - started
+
+    stored_bytes = sum(_stat_.st_size for _, _stat_ in objects.stats())
+    return stored_bytes, write_seconds, read_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench.delta')
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--versions', type=int, default=50)
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--edits', type=int, default=3)
+    parser.add_argument('--chains', type=int, nargs='*', default=[0, 5, 20, 100])
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    contents = list(make_versions(arguments.pages, arguments.versions,
+                                  arguments.lines, arguments.edits, arguments.seed))
+    total = sum(len(_data_) for _, _, _data_ in contents)
+    work_dir = mkdtemp(prefix='dl-bench-delta-')
+    try:
+        print('{:<6} {:>12} {:>12} {:>7} {:>10} {:>10}'.format(
+            'chain', 'bytes', 'stored', 'ratio', 'write s', 'read s'))
+        for _chain_ in arguments.chains:
+            stored, write_seconds, read_seconds = measure(work_dir, contents, _chain_)
+            print('{:<6} {:>12} {:>12} {:>7.1f} {:>10.3f} {:>10.3f}'.format(
+                _chain_, total, stored, total / stored, write_seconds, read_seconds))
+    finally:
+        rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''Compares the duplicate grouping engines of the detect operation.
+
+Each engine groups the sentences of the same documents; the groups must be
+identical. Run from the src directory, either on a synthetic corpus or on
+real sources:
+
+    python3 -m bench.grouping
+    python3 -m bench.grouping --source-dir ~/workspace/PS-8.0/source
+'''
+
+import argparse
+import tracemalloc
+
+from os import walk
+from os.path import join as path_join
+from time import perf_counter
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from text import Text
+from grouping import engines
+from bench.corpus import CorpusGenerator
+
+
+def run(engine_class, documents):
+    '''Returns the groups found by the engine as lists of (file, text) and the
+    seconds spent adding documents and grouping.'''
+    engine = engine_class()
+    started = perf_counter()
+    for _document_ in documents:
+        engine.add(Text(_document_))
+    add_seconds = perf_counter() - started
+
+    started = perf_counter()
+    groups = [[(_.file_path, _.sentence.text) for _ in _group_]
+              for _group_ in engine.groups()]
+    return groups, add_seconds, perf_counter() - started
+
+
+def peak_memory(engine_class, documents):
+    '''The peak of memory allocated while the engine holds all documents.'''
+    tracemalloc.start()
+    try:
+        engine = engine_class()
+        for _document_ in documents:
+            engine.add(Text(_document_))
+        for _ in engine.groups():
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench.grouping')
+    parser.add_argument('--source-dir', help='Use these documents instead of a synthetic corpus')
+    parser.add_argument('--products', type=int, default=2)
+    parser.add_argument('--versions', type=int, default=2)
+    parser.add_argument('--files-per-chapter', type=int, default=25)
+    arguments = parser.parse_args()
+
+    work_dir = mkdtemp(prefix='dl-bench-grouping-')
+    try:
+        source_dir = arguments.source_dir
+        if not source_dir:
+            source_dir = path_join(work_dir, 'corpus')
+            CorpusGenerator(source_dir,
+                            products=arguments.products,
+                            versions=arguments.versions,
+                            files_per_chapter=arguments.files_per_chapter).generate()
+        documents = sorted(path_join(_dir_, _name_)
+                           for _dir_, _, _names_ in walk(source_dir)
+                           for _name_ in _names_ if _name_.endswith('.rst'))
+
+        print('{:<6} {:>10} {:>10} {:>8} {:>14} {}'.format(
+            'engine', 'add s', 'group s', 'groups', 'peak bytes', 'same as dict'))
+        expected = None
+        for _name_ in ('dict', 'array'):
+            groups, add_seconds, group_seconds = run(engines[_name_], documents)
+            if expected is None:
+                expected = groups
+            print('{:<6} {:>10.3f} {:>10.3f} {:>8} {:>14} {}'.format(
+                _name_, add_seconds, group_seconds, len(groups),
+                peak_memory(engines[_name_], documents),
+                'yes' if groups == expected else 'NO'))
+    finally:
+        rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
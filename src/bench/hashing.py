@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+'''Measures the throughput of the available hash functions.
+
+Sentences are hashed one at a time, as signatures are; blocks are hashed in
+chunks of the size used to copy files. Run from the src directory:
+
+    python3 -m bench.hashing
+'''
+
+import argparse
+
+from time import perf_counter
+from random import Random
+
+from hashing import hashers
+
+
+def measure(factory, inputs):
+    '''Returns the megabytes per second and the hashes per second.'''
+    total = sum(len(_) for _ in inputs)
+    started = perf_counter()
+    for _input_ in inputs:
+        factory(_input_).hexdigest()
+    seconds = perf_counter() - started
+    return total / seconds / (1 << 20), len(inputs) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench.hashing')
+    parser.add_argument('--sentences', type=int, default=200000)
+    parser.add_argument('--sentence-size', type=int, default=80)
+    parser.add_argument('--blocks', type=int, default=500)
+    parser.add_argument('--block-size', type=int, default=1 << 16)
+    arguments = parser.parse_args()
+
+    random = Random(0)
+    def random_bytes(size):
+        return random.getrandbits(8 * size).to_bytes(size, 'little')
+
+    sentences = [random_bytes(arguments.sentence_size)
+                 for _ in range(1000)] * (arguments.sentences // 1000)
+    blocks = [random_bytes(arguments.block_size) for _ in range(arguments.blocks)]
+
+    print('{:<10} {:>14} {:>16} {:>14}'.format(
+        'hash', 'sentence MB/s', 'sentences/s', 'block MB/s'))
+    for _name_ in sorted(hashers):
+        sentence_rate, sentences_per_second = measure(hashers[_name_], sentences)
+        block_rate, _ = measure(hashers[_name_], blocks)
+        print('{:<10} {:>14.1f} {:>16.0f} {:>14.1f}'.format(
+            _name_, sentence_rate, sentences_per_second, block_rate))
+
+
+if __name__ == '__main__':
+    main()
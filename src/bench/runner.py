@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+'''Runs dL operations end to end on a synthetic corpus and measures them.'''
+
+import json
+import traceback
+
+from os import makedirs, devnull, fork, pipe, fdopen, close, wait4, _exit
+from os.path import join as path_join
+from copy import copy
+from time import perf_counter
+from contextlib import redirect_stdout
+from collections import OrderedDict
+
+from env import HomeConfLoader, StaticConfLoader
+from lib import DocProject
+from constants import OperationName as op_name
+
+
+class BenchEnvironment(HomeConfLoader):
+    '''Static settings with the library and workspace redirected to the
+    benchmark directory. Unlike Environment, it does not read the command
+    line; operation settings are assigned per run.'''
+
+    def __init__(self, root_dir, static_conf_path=None):
+        super().__init__(static_conf_path or StaticConfLoader.conf_path)
+        self.data_dir_path = path_join(root_dir, 'data')
+        self.workspace_dir_path = path_join(root_dir, 'workspace')
+        self.allow_remote_requests = False
+        self.git_in_workspace = False
+        for _dir_ in (self.meta_dir_name, self.lib_dir_name):
+            makedirs(path_join(self.data_dir_path, _dir_), exist_ok=True)
+        makedirs(self.workspace_dir_path, exist_ok=True)
+
+
+    def make(self, operation, project_code, **settings):
+        env = copy(self)
+        env.operation = operation
+        env.project_code = project_code.strip().upper()
+        env.ticket_id = '{}-1'.format(env.project_code)
+        env.ticket_summary = 'benchmark'
+        for _name_ in settings:
+            setattr(env, _name_, settings[_name_])
+        return env
+
+
+
+class Benchmark:
+    '''Times each operation over all projects of the corpus.
+
+    The operations run in the order in which a writer would use them: add every
+    project, check every project out, merge, detect duplicates, and check every
+    project back in. Each operation runs in a child process, so that its peak
+    RSS is its own rather than the largest of the operations before it; like
+    a dli command, it starts with no meta files cached.'''
+
+    operations = (op_name.add,
+                  op_name.checkout,
+                  op_name.merge,
+                  op_name.detect,
+                  op_name.checkin)
+
+    def __init__(self, root_dir, corpus, static_conf_path=None):
+        self.root_dir = root_dir
+        self.corpus = corpus
+        self.env = BenchEnvironment(root_dir, static_conf_path)
+
+
+    def _run(self, operation, stats):
+        env = self.env.make(operation, stats.project_code, source_dir=stats.source_dir)
+        project = DocProject(env)
+        with open(devnull, 'w') as quiet, redirect_stdout(quiet):
+            getattr(project, operation)()
+
+
+    def _measure(self, operation, generated):
+        '''Runs the operation over all projects in a forked child process.
+        Returns the seconds it took and the peak RSS of the child in KB.'''
+        reader, writer = pipe()
+        pid = fork()
+        if pid == 0:
+            close(reader)
+            try:
+                started = perf_counter()
+                for _stats_ in generated:
+                    self._run(operation, _stats_)
+                with fdopen(writer, 'w') as result:
+                    result.write(repr(perf_counter() - started))
+            except BaseException:
+                traceback.print_exc()
+                _exit(1)
+            _exit(0)
+
+        close(writer)
+        with fdopen(reader) as result:
+            seconds = result.read()
+        _, status, usage = wait4(pid, 0)
+        if status or not seconds:
+            raise RuntimeError("The '{}' benchmark failed".format(operation))
+        return float(seconds), usage.ru_maxrss
+
+
+    def run(self):
+        generated = self.corpus.generate()
+        totals = OrderedDict([('files', sum(_.files for _ in generated)),
+                              ('bytes', sum(_.bytes for _ in generated)),
+                              ('sentences', sum(_.sentences for _ in generated))])
+        results = OrderedDict()
+        for _operation_ in self.operations:
+            seconds, peak_rss_kb = self._measure(_operation_, generated)
+            results[_operation_] = OrderedDict([
+                ('seconds', seconds),
+                ('files_per_second', totals['files'] / seconds),
+                ('mb_per_second', totals['bytes'] / seconds / (1 << 20)),
+                ('sentences_per_second', totals['sentences'] / seconds),
+                ('peak_rss_kb', peak_rss_kb)])
+
+        return OrderedDict([('corpus', self.corpus.parameters()),
+                            ('totals', totals),
+                            ('projects', [_.as_dict() for _ in generated]),
+                            ('results', results)])
+
+
+
+def compare(results, baseline, tolerance=0.1):
+    '''Yields (operation, baseline seconds, seconds, change, regressed) for each
+    operation found in both result sets; change is relative to the baseline and
+    regressed is True when the change exceeds tolerance. Results are only
+    comparable when generated with the same corpus parameters.'''
+    if results['corpus'] != baseline['corpus']:
+        raise ValueError('Benchmark results were produced with different corpus parameters')
+    for _operation_ in results['results']:
+        if _operation_ in baseline['results']:
+            before = baseline['results'][_operation_]['seconds']
+            after = results['results'][_operation_]['seconds']
+            change = (after - before) / before
+            yield _operation_, before, after, change, change > tolerance
+
+
+def save(results, output_path):
+    with open(output_path, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+
+
+def load(input_path):
+    with open(input_path) as input_file:
+        return json.load(input_file, object_pairs_hook=OrderedDict)
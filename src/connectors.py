@@ -9,6 +9,7 @@ from git import Repo
 from messages import Alert, Info
 from signals import VerificationSignals, GitSignals, JIRASignals
 from errors import JIRATicketNotFound, GitRepositoryNotFound
+from profiler import profiler
 
 
 class GitConnector:
@@ -16,17 +17,19 @@ class GitConnector:
         self._workspace_path = os_path.abspath(workspace_path)
         self._repo = None
         self.status = []
-        self._load_repository(with_initialize)
+        with profiler.span('git_load'):
+            self._load_repository(with_initialize)
         Info.DEBUG('Repo', self._workspace_path)
 
 
     def make_branch(self, product_id, ticket_summary):
         '''Creates a Git branch based on the provided JIRA ticket object'''
-        self._repo.create_head(ticket_summary.make_branch_name(product_id)).checkout()
-        git_index_file = self._repo.index
-        git_index_file.add(self._workspace_path)
+        with profiler.span('git_branch'):
+            self._repo.create_head(ticket_summary.make_branch_name(product_id)).checkout()
+            git_index_file = self._repo.index
+            git_index_file.add(self._workspace_path)
 
-        git_index_file.commit(ticket_summary.ticket_id + ": " + ticket_summary.text)
+            git_index_file.commit(ticket_summary.ticket_id + ": " + ticket_summary.text)
         
         #self._repo.create_head(ticket_summary.make_branch_name(product_id)).checkout()
         self.status.append(GitSignals.BranchCreate.Ok)
@@ -53,15 +56,23 @@ class GitConnector:
 
 
 class JIRAConnector:
+    # Sessions by site; the daemon reuses them for all commands.
+    _connections = {}
+
     def __init__(self, site_url):
         self.site_url = site_url
-        self.connection = JIRA(self.site_url)
+        self.connection = JIRAConnector._connections.get(site_url)
+        if self.connection is None:
+            with profiler.span('jira_connect'):
+                self.connection = JIRA(self.site_url)
+            JIRAConnector._connections[site_url] = self.connection
 
     def find_ticket(self, ticket_id, ticket_id_sep):
         class JIRATicketRequest:
             info = None
             status = None
-        requested_ticket = self.connection.issue(ticket_id)
+        with profiler.span('jira_request'):
+            requested_ticket = self.connection.issue(ticket_id)
         if requested_ticket:
             JIRATicketRequest.info = JIRATicketInfo(ticket_id,
                                                     requested_ticket.fields.summary,
@@ -86,8 +97,10 @@ class JIRATicketInfo:
         self.status = None
 
 
-    def update_summary(self, text):
-        self.text = input(text)
+    def update_summary(self, text, summary=None):
+        '''Prompts for the new summary using text as the prompt. When summary
+        is supplied, it is used without prompting.'''
+        self.text = input(text) if summary is None else summary
         Info.DEBUG('new text', self.text)
         Info.DEBUG('new normalized', self.normalized_text)
         Info.DEBUG('update status', self.status)
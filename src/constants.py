@@ -14,6 +14,16 @@ class OperationName:
     checkin = 'checkin'
     merge = 'merge'
     detect = 'detect'
+    gc = 'gc'
+    repack = 'repack'
+    migrate = 'migrate'
+    verify = 'verify'
+    search = 'search'
+    diff = 'diff'
+    daemon = 'daemon'
+    watch = 'watch'
+    batch = 'batch'
+    serve = 'serve'
 
 
 class UIArgumentName:
@@ -23,9 +33,28 @@ class UIArgumentName:
     source_dir = 'source_dir'
     project_code = 'project_code'
     ticket_id = 'ticket_id'
+    ticket_summary = 'ticket_summary'
     include = 'include'
+    paths = 'paths'
+    affected_by = 'affected_by'
+    resolve_variables = 'resolve_variables'
+    query = 'query'
+    against = 'against'
     context = 'context' # such as paragraph (default)
     target = 'target' # such as duplicate (default)
+    at = 'at' # snapshot ID or date
+    profile = 'profile'
+    profile_output = 'profile_output'
+    trace_memory = 'trace_memory'
+    dry_run = 'dry_run'
+    incremental = 'incremental'
+    workers = 'workers'
+    report = 'report'
+    socket = 'socket'
+    poll = 'poll'
+    manifest = 'manifest'
+    port = 'port'
+    bind = 'bind'
 
 
 
@@ -35,6 +64,18 @@ class MetaArgumentName:
     file_name = 'file_name'
     lib_suffix = 'lib_suffix'
     target_dir = 'target_dir'
+    size = 'size' # of the original file in bytes
+    digest = 'digest' # SHA1 of the original file
+
+
+
+class SnapshotArgumentName:
+    '''Argument names used in snapshot files.'''
+
+    project_code = 'project_code'
+    created = 'created'
+    records = 'records'
+    object_name = 'object'
 
 
 
@@ -45,6 +86,13 @@ class OptionInclude:
 
 
 
+class ProfileMode:
+    summary = 'summary'
+    cprofile = 'cprofile'
+    json = 'json'
+
+
+
 class DirectiveNameSpace:
     class Only:
       _ = 'only'
@@ -63,6 +111,9 @@ class OptionName:
     project_name = 'project_name'
     default_doc_format = 'default_doc_format'
     doc_file_extensions = 'doc_file_extensions'
+    ignore = 'ignore'
+    use_gitignore = 'use_gitignore'
+    walk_workers = 'walk_workers'
     default_encoding = 'default_encoding'
     key_length = 'key_length'
     data_file_suffix = 'data_file_suffix'
@@ -73,18 +124,37 @@ class OptionName:
     allow_remote_requests = 'allow_remote_requests'
     interface_type = 'interface_type'
     git_in_workspace = 'git_in_workspace'
+    gc_grace_period = 'gc_grace_period'
+    compression = 'compression'
+    compression_skip = 'compression_skip'
+    lib_layout = 'lib_layout'
+    detect_engine = 'detect_engine'
+    content_hash = 'content_hash'
+    fingerprint_hash = 'fingerprint_hash'
+    delta_chain_length = 'delta_chain_length'
+    watch_debounce = 'watch_debounce'
+    remote_library = 'remote_library'
+    remote_cache_size = 'remote_cache_size'
 
     class Path:
         _ = 'path'
         data_dir = 'data_dir'
         workspace = 'workspace'
         readme = 'readme'
+        daemon_socket = 'daemon_socket'
 
     class DirName:
         _ = 'dir_name'
         meta = 'meta'
         lib = 'lib'
         doc_source = 'doc_source'
+        history = 'history'
+        objects = 'objects'
+        cache = 'cache'
+        graph = 'graph'
+        variables = 'variables'
+        index = 'index'
+        remote = 'remote'
 
 
     class Sep:
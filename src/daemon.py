@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+'''Runs dli commands in a long running process.
+
+`dli daemon' listens on a Unix domain socket and runs the commands that its
+clients send, one at a time, in the same process: the options, the parsed
+meta documents and the JIRA sessions stay loaded between commands, and files
+are only parsed again when their modification time changes.
+
+When the DL_DAEMON_SOCKET environment variable names the socket, dli
+forwards its command line and working directory to the daemon and prints
+what the command printed. This module only uses the standard library so that
+the client starts quickly; if no daemon listens on the socket, dli runs the
+command itself.
+
+Each request and each reply is one line of JSON:
+
+    {"argv": ["detect", "--project-code", "PS-8.0"], "cwd": "/home/me/dl/src"}
+    {"stdout": "...", "stderr": "...", "status": 0}
+
+Commands cannot prompt: the standard input of a command is empty, so a
+ticket summary must be supplied with --ticket-summary.'''
+
+import sys
+import json
+import socket
+
+from io import StringIO
+from os import getcwd, chdir, remove, umask
+from os.path import abspath, exists
+from socketserver import UnixStreamServer, StreamRequestHandler
+from contextlib import redirect_stdout, redirect_stderr
+from traceback import print_exc
+
+from messages import Info
+from errors import DaemonRunning
+
+
+socket_variable = 'DL_DAEMON_SOCKET'
+
+
+
+def forward(socket_path, argv):
+    '''Runs the command in the daemon listening on socket_path and prints its
+    output. Returns the exit status of the command, or None when no daemon
+    listens on the socket.'''
+    request = json.dumps({'argv': argv, 'cwd': getcwd()}) + '\n'
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(socket_path)
+            connection.sendall(request.encode())
+            with connection.makefile('rb') as replies:
+                reply = replies.readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    reply = json.loads(reply)
+    sys.stdout.write(reply['stdout'])
+    sys.stderr.write(reply['stderr'])
+    return reply['status']
+
+
+
+def run_captured(run_command, argv):
+    '''Runs the command and returns what it printed to the standard output
+    and error and its exit status.'''
+    stdout, stderr = StringIO(), StringIO()
+    status = 0
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            run_command(argv)
+        except SystemExit as exited:
+            if isinstance(exited.code, int):
+                status = exited.code
+            elif exited.code is not None:
+                print(exited.code, file=sys.stderr)
+                status = 1
+        except Exception:
+            print_exc()
+            status = 1
+    return stdout.getvalue(), stderr.getvalue(), status
+
+
+
+class _CommandHandler(StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return # a probe by a daemon checking whether the socket is in use
+        request = json.loads(line)
+        reply = self.server.execute(request['argv'], request['cwd'])
+        self.wfile.write((json.dumps(reply) + '\n').encode())
+
+
+
+class DaemonServer(UnixStreamServer):
+    '''Runs each received command with run_command(argv) in the working
+    directory of the client. Commands run one at a time: the caches of the
+    process are not shared between threads.'''
+
+    def __init__(self, socket_path, run_command):
+        self.socket_path = abspath(socket_path)
+        self.run_command = run_command
+        self.served = 0
+        if exists(self.socket_path):
+            if DaemonServer._listening(self.socket_path):
+                raise DaemonRunning(self.socket_path)
+            remove(self.socket_path) # left by a daemon which did not stop cleanly
+
+        # Only the owner may connect: commands run with the owner's rights.
+        mask = umask(0o177)
+        try:
+            super().__init__(self.socket_path, _CommandHandler)
+        finally:
+            umask(mask)
+
+
+    @staticmethod
+    def _listening(socket_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except ConnectionRefusedError:
+                return False
+        return True
+
+
+    def execute(self, argv, cwd):
+        '''Runs the command and returns the reply to the client.'''
+        daemon_cwd = getcwd()
+        daemon_stdin = sys.stdin
+        try:
+            chdir(cwd)
+            sys.stdin = StringIO()
+            stdout, stderr, status = run_captured(self.run_command, argv)
+        finally:
+            sys.stdin = daemon_stdin
+            chdir(daemon_cwd)
+        self.served += 1
+        return {'stdout': stdout,
+                'stderr': stderr,
+                'status': status}
+
+
+    def serve(self):
+        '''Serves commands until interrupted, then removes the socket.'''
+        print(Info.daemon_listening(self.socket_path, socket_variable))
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            remove(self.socket_path)
+        print(Info.daemon_stopped(self.served))
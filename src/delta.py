@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+'''Binary deltas between two versions of a file.
+
+A delta rebuilds the target from the source with two instructions: copy a
+range of the source, and insert literal bytes. Matches are found by indexing
+the source in blocks of block_size bytes; each block of the target which is
+found in the index is extended in both directions. A changed line in a long
+page thus costs a few bytes, and the delta of unrelated files is about as
+long as the target.
+
+Each instruction starts with a varint: the length shifted left by one, with
+the low bit set for a copy. A copy is followed by the varint offset in the
+source, an insert by its bytes. The delta starts with the varint length of
+the target.'''
+
+
+block_size = 16
+
+
+
+def _put_varint(output, value):
+    while value >= 0x80:
+        output.append(value & 0x7f | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def _get_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+
+def encode(source, target):
+    '''Returns the delta which makes target from source.'''
+    index = {}
+    for _offset_ in range(len(source) - block_size, -1, -block_size):
+        index[source[_offset_:_offset_ + block_size]] = _offset_
+
+    delta = bytearray()
+    _put_varint(delta, len(target))
+
+    def insert(start, end):
+        if end > start:
+            _put_varint(delta, (end - start) << 1)
+            delta.extend(target[start:end])
+
+    literal = position = 0
+    last = len(target) - block_size
+    while position <= last:
+        offset = index.get(target[position:position + block_size])
+        if offset is None:
+            position += 1
+            continue
+        start = position
+        while start > literal and offset and source[offset - 1] == target[start - 1]:
+            start -= 1
+            offset -= 1
+        source_end = offset + position + block_size - start
+        end = position + block_size
+        while (target[end:end + block_size] == source[source_end:source_end + block_size] and
+               end + block_size <= len(target)):
+            end += block_size
+            source_end += block_size
+        while end < len(target) and source_end < len(source) and target[end] == source[source_end]:
+            end += 1
+            source_end += 1
+        insert(literal, start)
+        _put_varint(delta, (end - start) << 1 | 1)
+        _put_varint(delta, offset)
+        literal = position = end
+    insert(literal, len(target))
+    return bytes(delta)
+
+
+def decode(source, delta):
+    '''Returns the target made from source by the delta.'''
+    length, position = _get_varint(delta, 0)
+    target = bytearray()
+    while position < len(delta):
+        instruction, position = _get_varint(delta, position)
+        size = instruction >> 1
+        if instruction & 1:
+            offset, position = _get_varint(delta, position)
+            target.extend(source[offset:offset + size])
+        else:
+            target.extend(delta[position:position + size])
+            position += size
+    if len(target) != length:
+        raise ValueError('the delta does not match its source')
+    return bytes(target)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+'''Keeps track of which documents include or refer to which files.'''
+
+import re
+import yaml
+
+from os import makedirs
+from os.path import join as path_join, isfile, normpath, dirname
+from collections import deque
+
+
+class DependencyGraph:
+    '''Edges from documents to the files that they pull in with the include,
+    literalinclude, image and figure directives.
+
+    Paths are relative to the source directory of the project, with `/' as
+    the separator. A path in a directive is relative to the document that
+    contains it; a path that starts with a slash is relative to the source
+    directory, as in Sphinx. Both directions of every edge are kept, so the
+    documents which depend on a file are found without scanning the graph.'''
+
+    directive_pattern = re.compile(
+        r'^\s*\.\.\s+(?:include|literalinclude|image|figure)::\s*(\S+)')
+
+    def __init__(self, product_code, data_dir_path, graph_dir_name, data_file_suffix):
+        self.product_code = product_code.lower().strip()
+        self._graph_dir_path = path_join(data_dir_path, graph_dir_name)
+        self._data_file_suffix = data_file_suffix
+        self.dependencies = {}
+        self.dependents = {}
+
+
+    @property
+    def path(self):
+        return path_join(self._graph_dir_path,
+                         '.'.join([self.product_code, self._data_file_suffix]))
+
+
+    @staticmethod
+    def make_path(target_dir, file_name):
+        return '/'.join([target_dir, file_name]) if target_dir else file_name
+
+
+    @staticmethod
+    def resolve(document, reference):
+        if reference.startswith('/'):
+            return normpath(reference.lstrip('/'))
+        return normpath(path_join(dirname(document), reference))
+
+
+    def scan(self, document, lines):
+        '''Replaces the dependencies of the document with those found in lines.'''
+        match = self.directive_pattern.match
+        references = set()
+        for _line_ in lines:
+            found = match(_line_)
+            if found:
+                references.add(self.resolve(document, found.group(1)))
+        self.update(document, references)
+        return references
+
+
+    def update(self, document, references):
+        self.remove(document)
+        if references:
+            self.dependencies[document] = set(references)
+            for _reference_ in references:
+                self.dependents.setdefault(_reference_, set()).add(document)
+
+
+    def remove(self, document):
+        for _reference_ in self.dependencies.pop(document, ()):
+            documents = self.dependents[_reference_]
+            documents.discard(document)
+            if not documents:
+                del self.dependents[_reference_]
+
+
+    def dependents_of(self, path):
+        '''The documents which refer to path directly.'''
+        return self.dependents.get(path, set())
+
+
+    def affected_by(self, paths):
+        '''The given paths and all documents which depend on any of them,
+        directly or through other documents.'''
+        return self._closure(paths, self.dependents)
+
+
+    def required_by(self, paths):
+        '''The given paths and all files which they pull in, directly or
+        through other documents.'''
+        return self._closure(paths, self.dependencies)
+
+
+    @staticmethod
+    def _closure(paths, edges):
+        found = set(paths)
+        pending = deque(found)
+        while pending:
+            for _path_ in edges.get(pending.popleft(), ()):
+                if _path_ not in found:
+                    found.add(_path_)
+                    pending.append(_path_)
+        return found
+
+
+    def read(self):
+        if isfile(self.path):
+            with open(self.path) as input_file:
+                data = yaml.safe_load(input_file) or {}
+            for _document_ in data:
+                self.update(_document_, data[_document_])
+        return self
+
+
+    def save(self):
+        makedirs(self._graph_dir_path, exist_ok=True)
+        with open(self.path, 'w') as output_file:
+            yaml.dump({_document_: sorted(self.dependencies[_document_])
+                       for _document_ in self.dependencies},
+                      stream=output_file,
+                      default_flow_style=False)
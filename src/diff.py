@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+'''Compares the paragraphs of two projects.
+
+A document is reduced to the list of its paragraph signatures (see
+Paragraph.signature), so differences in whitespace, case and punctuation
+are ignored. Documents are paired by their path in the project; paragraphs
+are paired by signature with dictionaries, so the cost is linear in the
+number of paragraphs. The signatures of a document are cached by the digest
+of its contents, so each version of a document is parsed once.'''
+
+import json
+
+from os import makedirs, replace
+from os.path import isfile, dirname
+from bisect import bisect_left
+from collections import OrderedDict
+
+from text import Paragraph
+
+
+def paragraph_signatures(lines):
+    '''Returns [signature, line number] for each paragraph in lines. Line
+    numbers start at 1.'''
+    signatures = []
+    collected, first = [], 0
+    for _number_, _line_ in enumerate(lines, 1):
+        if _line_.strip():
+            if not collected:
+                first = _number_
+            collected.append(_line_)
+        elif collected:
+            signatures.append([Paragraph(collected).signature, first])
+            collected = []
+    if collected:
+        signatures.append([Paragraph(collected).signature, first])
+    return signatures
+
+
+
+class SignatureCache:
+    '''Paragraph signatures of documents, keyed by the digest of their contents.'''
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.changed = False
+        if isfile(path):
+            with open(path) as cache_file:
+                self.entries = json.load(cache_file)
+
+
+    def get(self, digest, read_lines):
+        '''Returns the signatures of the document with the given digest; the
+        document is only read, with read_lines, if they are not cached.'''
+        signatures = digest and self.entries.get(digest)
+        if signatures is None:
+            signatures = paragraph_signatures(read_lines())
+            if digest:
+                self.entries[digest] = signatures
+                self.changed = True
+        return signatures
+
+
+    def save(self):
+        if self.changed:
+            makedirs(dirname(self.path), exist_ok=True)
+            with open(self.path + '.tmp', 'w') as cache_file:
+                json.dump(self.entries, cache_file, separators=(',', ':'))
+            replace(self.path + '.tmp', self.path)
+
+
+
+class FileDiff:
+    '''Paragraph changes of one document. Each change is a (signature, line)
+    pair; moved paragraphs are (signature, old line, new line).'''
+    __slots__ = ('path', 'added', 'removed', 'moved')
+
+    def __init__(self, path):
+        self.path = path
+        self.added = []
+        self.removed = []
+        self.moved = []
+
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved)
+
+
+    def as_dict(self):
+        return OrderedDict([('path', self.path),
+                            ('added', [_[1] for _ in self.added]),
+                            ('removed', [_[1] for _ in self.removed]),
+                            ('moved', [list(_[1:]) for _ in self.moved])])
+
+
+
+def compare(old, new, path):
+    '''Compares two lists of [signature, line] of the same document.
+
+    Paragraphs are paired by signature (the n-th occurrence of a signature in
+    old with its n-th occurrence in new). Of the paired paragraphs, the
+    longest run that keeps its relative order is unchanged; the others have
+    been moved.'''
+    result = FileDiff(path)
+    positions = {}
+    for _index_, (_signature_, _) in enumerate(old):
+        positions.setdefault(_signature_, []).append(_index_)
+    used = {}
+    pairs = [] # (index in old, index in new)
+    for _index_, (_signature_, _line_) in enumerate(new):
+        candidates = positions.get(_signature_, ())
+        taken = used.get(_signature_, 0)
+        if taken < len(candidates):
+            pairs.append((candidates[taken], _index_))
+            used[_signature_] = taken + 1
+        else:
+            result.added.append((_signature_, _line_))
+    for _signature_, _indexes_ in positions.items():
+        for _index_ in _indexes_[used.get(_signature_, 0):]:
+            result.removed.append((_signature_, old[_index_][1]))
+    result.removed.sort(key=lambda _: _[1])
+
+    in_order = set(_longest_increasing(pairs))
+    for _pair_ in pairs:
+        if _pair_ not in in_order:
+            result.moved.append((new[_pair_[1]][0], old[_pair_[0]][1], new[_pair_[1]][1]))
+    return result
+
+
+def _longest_increasing(pairs):
+    '''Returns the pairs which form the longest run of increasing old
+    indexes, in O(n log n).'''
+    tails, tail_pairs, previous = [], [], {}
+    for _pair_ in pairs:
+        position = bisect_left(tails, _pair_[0])
+        if position == len(tails):
+            tails.append(_pair_[0])
+            tail_pairs.append(_pair_)
+        else:
+            tails[position] = _pair_[0]
+            tail_pairs[position] = _pair_
+        previous[_pair_] = tail_pairs[position - 1] if position else None
+    run = []
+    current = tail_pairs[-1] if tail_pairs else None
+    while current is not None:
+        run.append(current)
+        current = previous[current]
+    return run
@@ -99,9 +99,10 @@ class DirectiveBuffer:
             
 
 class DirectiveAgent:
-    def __init__(self, env, file_name):
+    def __init__(self, env, file_name, renderer=None):
         self.file_name = file_name
         self.env = env
+        self.renderer = renderer
     def run(self, values):
         pass
 
@@ -122,19 +123,23 @@ class AutoAgent(DirectiveAgent):
 
 
 class ProductAgent(DirectiveAgent):
-    def __init__(self, env, file_name):
-        super().__init__(env, file_name)
+    '''Writes the product variants of the document to the other projects.
+    The renderer produces the version variants in the same pass.'''
+    def __init__(self, env, file_name, renderer=None):
+        super().__init__(env, file_name, renderer)
     def run(self, values):
-        Info.DEBUG('Found in file', self.file_name)
-        Info.DEBUG('Product agent running',values)
+        if self.renderer:
+            return self.renderer.render(self.file_name.name)
         return None
 
 
 
 class VersionAgent(DirectiveAgent):
-    def __init__(self, env, file_name):
-        super().__init__(env, file_name)
+    '''Writes the version variants of the document to the other projects.
+    The renderer produces the product variants in the same pass.'''
+    def __init__(self, env, file_name, renderer=None):
+        super().__init__(env, file_name, renderer)
     def run(self, values):
-        Info.DEBUG('Found in file', self.file_name)
-        Info.DEBUG('Version agent running',values)
+        if self.renderer:
+            return self.renderer.render(self.file_name.name)
         return None
@@ -1,21 +1,69 @@
 #!/usr/bin/env python3
 '''The *main* module of the app (dli - documentation Library interface). Its job is
 to load the key components and manage their interactions based on user's
-requests.'''
+requests.
+
+When the DL_DAEMON_SOCKET environment variable names the socket of a running
+daemon (see `dli daemon'), the command is sent to the daemon instead.'''
+
+import sys
+from os import environ
+
+from daemon import socket_variable, forward
+from constants import OperationName as op_name
+
+if __name__ == '__main__' and environ.get(socket_variable) and sys.argv[1:2] != [op_name.daemon]:
+    status = forward(environ[socket_variable], sys.argv[1:])
+    if status is not None:
+        sys.exit(status)
 
 from env import Environment
 from lib import DocProject
-from constants import OperationName as op_name
-from messages import Help
-
-e = Environment()
-dp = DocProject(e)
-
-if e.operation == op_name.add: dp.add()
-elif e.operation == op_name.checkout: dp.checkout()
-elif e.operation == op_name.checkin:  dp.checkin()
-elif e.operation == op_name.merge: dp.merge()
-elif e.operation == op_name.detect: dp.detect()
-else:
-    for _line_ in Help.no_operation(e.readme_path):
-        print(_line_)
+from messages import Alert, Help
+from profiler import profiler
+from memtrace import memory_tracer
+from signals import has_failed
+
+
+def run(e):
+    '''Runs the operation and returns its status.'''
+    dp = DocProject(e)
+    status = None
+
+    with profiler.session(e.operation, e.profile, e.profile_output), \
+         memory_tracer.session(e.operation, e.trace_memory):
+        if e.operation == op_name.add: status = dp.add()
+        elif e.operation == op_name.checkout: status = dp.checkout()
+        elif e.operation == op_name.checkin: status = dp.checkin()
+        elif e.operation == op_name.merge: status = dp.merge()
+        elif e.operation == op_name.detect: status = dp.detect()
+        elif e.operation == op_name.gc: status = dp.gc()
+        elif e.operation == op_name.repack: status = dp.repack()
+        elif e.operation == op_name.migrate: status = dp.migrate()
+        elif e.operation == op_name.verify: status = dp.verify()
+        elif e.operation == op_name.search: status = dp.search()
+        elif e.operation == op_name.diff: status = dp.diff()
+        elif e.operation == op_name.watch: dp.watch()
+        elif e.operation == op_name.batch: status = dp.batch(run_received)
+        elif e.operation == op_name.daemon: dp.daemon(run_received)
+        elif e.operation == op_name.serve: dp.serve()
+        else:
+            for _line_ in Help.no_operation(e.readme_path):
+                print(_line_)
+    return status
+
+
+def run_received(argv):
+    '''Runs a command received by the daemon or listed in a batch manifest;
+    exits with status 1 if the operation has failed.'''
+    e = Environment(argv=argv)
+    if e.operation in (op_name.daemon, op_name.watch, op_name.serve):
+        print(Alert.daemon_cannot_run(e.operation))
+        sys.exit(1)
+    if has_failed(run(e)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    if has_failed(run(Environment())):
+        sys.exit(1)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 '''Defines all configuration options'''
-from yaml import load, dump
+from yaml import safe_load, dump
+from os import stat
 from os.path import (sep as path_sep,
                      join as path_join,
                      expanduser, isfile, exists)
@@ -18,47 +19,103 @@ class ConfLoader:
     '''
     def __init__(self, conf_path=None):
         '''Inializes all settings to `None'; Arranged alphabetically'''
+        self.affected_by = None
+        self.against = None
         self.allow_remote_requests = None
+        self.at = None
+        self.bind = None
+        self.cache_dir_name = None
         self.code_sep = None
         self.commit_message_primary_sep = None
         self.commit_message_secondary_sep = None
         self.company_name = None
+        self.compression = None
+        self.compression_skip = None
+        self.content_hash = None
         self.context = None
+        self.daemon_socket_path = None
         self.data_dir_path = None
         self.data_file_suffix = None
         self.default_doc_format = None
         self.default_encoding = None
+        self.delta_chain_length = None
+        self.detect_engine = None
         self.directive_default_name_space = None
         self.directive_name_space_sep = None
         self.directive_prefix = None
         self.directive_value_sep = None
         self.doc_file_extensions = None
         self.doc_source_dir_name = None
+        self.dry_run = None
+        self.fingerprint_hash = None
+        self.gc_grace_period = None
         self.git_in_workspace = None
+        self.graph_dir_name = None
+        self.history_dir_name = None
         self.home_conf_path = None
+        self.ignore = None
         self.include = None
+        self.index_dir_name = None
+        self.incremental = None
         self.interface_type = None
         self.jira_site = None
         self.key_length = None
+        self.manifest = None
         self.lib_dir_name = None
+        self.lib_layout = None
         self.message_horizontal_line = None
         self.message_screen_width = None
         self.meta_dir_name = None
         self.name_sep = None
         self.name_space_sep = None
+        self.objects_dir_name = None
         self.operation = None
         self.option_sep = None
+        self.paths = None
+        self.poll = None
+        self.port = None
+        self.profile = None
+        self.profile_output = None
         self.project_code = None
         self.project_name = None
+        self.query = None
         self.readme_path = None
+        self.remote_cache_size = None
+        self.remote_dir_name = None
+        self.remote_library = None
+        self.report = None
         self.require_project_code_in_ticket = None
+        self.resolve_variables = None
         self.source_dir = None
         self.static_conf_path = None
         self.target = None
         self.ticket_id = None
+        self.ticket_summary = None
+        self.trace_memory = None
         self.ui_arguments = None
+        self.use_gitignore = None
+        self.variables_dir_name = None
+        self.walk_workers = None
+        self.watch_debounce = None
+        self.workers = None
         self.workspace_dir_path = None
 
+    _loaded = {}
+
+    @staticmethod
+    def load_file(conf_path):
+        '''Parses the YAML file unless it has not changed since it was last
+        parsed; the daemon reads the options once for all commands.'''
+        status = stat(conf_path)
+        key = (status.st_mtime_ns, status.st_size)
+        cached = ConfLoader._loaded.get(conf_path)
+        if cached is None or cached[0] != key:
+            with open(conf_path) as conf_file:
+                cached = key, safe_load(conf_file)
+            ConfLoader._loaded[conf_path] = cached
+        return cached[1]
+
+
     @staticmethod
     def make_path(conf_value):
         '''Makes a valid path from the given string or list of parts
@@ -88,12 +145,15 @@ class StaticConfLoader(ConfLoader):
     def __init__(self, conf_path=None):
         super().__init__(conf_path)
         self.static_conf_path = conf_path or StaticConfLoader.conf_path
-        data = load(open(self.static_conf_path))
+        data = ConfLoader.load_file(self.static_conf_path)
         
         self.company_name = data[opt_name.company_name]
         self.project_name = data[opt_name.project_name]
         self.default_doc_format = data[opt_name.default_doc_format]
         self.doc_file_extensions = data[opt_name.doc_file_extensions]
+        self.ignore = data[opt_name.ignore]
+        self.use_gitignore = data[opt_name.use_gitignore]
+        self.walk_workers = data[opt_name.walk_workers]
         self.default_encoding = data[opt_name.default_encoding]
         self.key_length = data[opt_name.key_length]
         self.data_file_suffix = data[opt_name.data_file_suffix]
@@ -103,16 +163,35 @@ class StaticConfLoader(ConfLoader):
         self.jira_site = data[opt_name.jira_site]
         self.allow_remote_requests = data[opt_name.allow_remote_requests]
         self.git_in_workspace = data[opt_name.git_in_workspace]
+        self.gc_grace_period = data[opt_name.gc_grace_period]
+        self.compression = data[opt_name.compression]
+        self.compression_skip = data[opt_name.compression_skip]
+        self.lib_layout = data[opt_name.lib_layout]
+        self.detect_engine = data[opt_name.detect_engine]
+        self.content_hash = data[opt_name.content_hash]
+        self.fingerprint_hash = data[opt_name.fingerprint_hash]
+        self.delta_chain_length = data[opt_name.delta_chain_length]
+        self.watch_debounce = data[opt_name.watch_debounce]
+        self.remote_library = data[opt_name.remote_library]
+        self.remote_cache_size = data[opt_name.remote_cache_size]
 
         path = opt_name.Path
         self.data_dir_path = data[path._][path.data_dir]
         self.workspace_dir_path = data[path._][path.workspace]
         self.readme_path = data[path._][path.readme]
+        self.daemon_socket_path = data[path._][path.daemon_socket]
 
         dir_name = opt_name.DirName
         self.meta_dir_name = data[dir_name._][dir_name.meta]
         self.lib_dir_name = data[dir_name._][dir_name.lib]
         self.doc_source_dir_name = data[dir_name._][dir_name.doc_source]
+        self.history_dir_name = data[dir_name._][dir_name.history]
+        self.objects_dir_name = data[dir_name._][dir_name.objects]
+        self.cache_dir_name = data[dir_name._][dir_name.cache]
+        self.graph_dir_name = data[dir_name._][dir_name.graph]
+        self.variables_dir_name = data[dir_name._][dir_name.variables]
+        self.index_dir_name = data[dir_name._][dir_name.index]
+        self.remote_dir_name = data[dir_name._][dir_name.remote]
         
         sep = opt_name.Sep
         self.code_sep = data[sep._][sep.code]
@@ -184,13 +263,12 @@ class HomeConfLoader(StaticConfLoader):
         options_file = options_file or self._make_default_file_path()[0]
         if isfile(options_file):
             self.home_conf_path = options_file
-            with open(self.home_conf_path) as options:
-                self._options = load(options)
-                self.workspace_dir_path, _ = ConfLoader.make_path(self._options[opt_name.Path.workspace])
-                self.git_in_workspace = self._options[opt_name.git_in_workspace]
-                self.allow_remote_requests = self._options[opt_name.allow_remote_requests]
-                self.commit_message_primary_sep = self._options[opt_name.Sep.commit_message_primary]
-                self.commit_message_secondary_sep = self._options[opt_name.Sep.commit_message_secondary]
+            self._options = ConfLoader.load_file(self.home_conf_path)
+            self.workspace_dir_path, _ = ConfLoader.make_path(self._options[opt_name.Path.workspace])
+            self.git_in_workspace = self._options[opt_name.git_in_workspace]
+            self.allow_remote_requests = self._options[opt_name.allow_remote_requests]
+            self.commit_message_primary_sep = self._options[opt_name.Sep.commit_message_primary]
+            self.commit_message_secondary_sep = self._options[opt_name.Sep.commit_message_secondary]
 
 
     def _normalize(self, term):
@@ -204,12 +282,13 @@ class UIConfLoader(HomeConfLoader):
     '''Loads user interface configuration settings. 
 
     This loader has the top priority'''
-    def __init__(self, interface_type=InterfaceType.CLI):
+    def __init__(self, interface_type=InterfaceType.CLI, argv=None):
         
         super().__init__()
         super().setup(self.home_conf_path)
 
         self.interface_type = InterfaceType.CLI
+        self._argv = argv
 
 
     def setup(self):
@@ -220,7 +299,7 @@ class UIConfLoader(HomeConfLoader):
     def _setup_cli(self):
         option_sep = str(self.option_sep)[0]
         name_sep = str(self.name_sep)[0]
-        cli = CLI(option_sep, name_sep)
+        cli = CLI(option_sep, name_sep, self._argv)
         #Setting home_conf_path to a valid path will enable reading home options
         #from a file other than the default file.
         #self.home_conf_path = cli.arguments(ui_name.home_conf_path)
@@ -228,10 +307,29 @@ class UIConfLoader(HomeConfLoader):
         self.operation = cli.arguments[ui_name.operation]
         self.ui_arguments = cli.arguments
         self.ticket_id = cli.arguments.get(ui_name.ticket_id)
+        self.ticket_summary = cli.arguments.get(ui_name.ticket_summary)
         self.source_dir = cli.arguments.get(ui_name.source_dir)
         self.include = cli.arguments.get(ui_name.include)
+        self.paths = cli.arguments.get(ui_name.paths)
+        self.affected_by = cli.arguments.get(ui_name.affected_by)
+        self.resolve_variables = cli.arguments.get(ui_name.resolve_variables)
+        self.query = cli.arguments.get(ui_name.query)
+        self.against = cli.arguments.get(ui_name.against)
         self.context = cli.arguments.get(ui_name.context)
         self.target = cli.arguments.get(ui_name.target)
+        self.at = cli.arguments.get(ui_name.at)
+        self.profile = cli.arguments.get(ui_name.profile)
+        self.profile_output = cli.arguments.get(ui_name.profile_output)
+        self.trace_memory = cli.arguments.get(ui_name.trace_memory)
+        self.dry_run = cli.arguments.get(ui_name.dry_run)
+        self.incremental = cli.arguments.get(ui_name.incremental)
+        self.workers = cli.arguments.get(ui_name.workers)
+        self.report = cli.arguments.get(ui_name.report)
+        self.poll = cli.arguments.get(ui_name.poll)
+        self.manifest = cli.arguments.get(ui_name.manifest)
+        self.port = cli.arguments.get(ui_name.port)
+        self.bind = cli.arguments.get(ui_name.bind)
+        self.daemon_socket_path = cli.arguments.get(ui_name.socket) or self.daemon_socket_path
 
         project_code = cli.arguments.get(ui_name.project_code)
         self.project_code = project_code and project_code.strip().upper()
@@ -240,10 +338,11 @@ class UIConfLoader(HomeConfLoader):
 
 class Environment(UIConfLoader):
     '''Combines settings from different sources and exposes these settings
-    as if they were its own properties'''
+    as if they were its own properties. The command line is taken from
+    argv when supplied (the daemon runs commands sent by its clients).'''
 
-    def __init__(self, conf_file_name=None):
-        super().__init__()
+    def __init__(self, conf_file_name=None, argv=None):
+        super().__init__(argv=argv)
         super().setup()
 
 if __name__ == '__main__':
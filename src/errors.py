@@ -5,3 +5,6 @@ class FeatureBranchNotFound(Exception): pass
 class FeatureBranchTooMany(Exception): pass
 class JIRATicketNotFound(Exception): pass
 class GitRepositoryNotFound(Exception): pass
+class SnapshotNotFound(Exception): pass
+class DaemonRunning(Exception): pass
+class ManifestInvalid(Exception): pass
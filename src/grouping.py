@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+'''Groups the sentences of documents by their signatures to find duplicates.
+
+Two engines give the same groups in the same order: groups are ordered by
+the first occurrence of their sentence, and the occurrences in a group by
+the order in which they were added.
+
+The dict engine keeps a list of occurrences per signature. The array engine
+keeps two flat columns: a 64-bit fingerprint (the first 16 hex digits of
+the signature) and a document number. The columns are sorted by fingerprint
+once, and groups are the runs of equal fingerprints. Only the text of each
+sentence is kept, and only when it may be displayed: the text of the first
+occurrence of each fingerprint, and the texts of the later occurrences,
+which are duplicates by definition. NumPy is used when it is installed,
+otherwise the columns are stdlib arrays.'''
+
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+Statistics = namedtuple('Statistics', ['file_path',
+                                       'sentence'])
+
+Sentence = namedtuple('Sentence', ['text'])
+
+
+
+class DictGroupingEngine:
+    name = 'dict'
+
+    def __init__(self):
+        self.contents = {}
+
+
+    def add(self, doc):
+        for _ in doc.paragraphs.contents:
+            for _s_ in _.sentences:
+                if _s_ not in self.contents:
+                    self.contents[_s_] = []
+                self.contents[_s_].append(Statistics(doc.file_path,
+                                                     _.sentences[_s_]))
+
+
+    def groups(self):
+        '''Yields the lists of occurrences of each duplicated sentence.'''
+        for _ in self.contents:
+            if len(self.contents[_]) > 1:
+                yield self.contents[_]
+
+
+
+class ArrayGroupingEngine:
+    name = 'array'
+    fingerprint_digits = 16
+
+    def __init__(self):
+        self.file_paths = []
+        self.fingerprints = array('Q')
+        self.documents = array('I')
+        self.first_texts = {} # fingerprint: text of its first occurrence
+        self.texts = {}       # row: text of a later occurrence
+
+
+    def add(self, doc):
+        document = len(self.file_paths)
+        self.file_paths.append(doc.file_path)
+        digits = self.fingerprint_digits
+        for _ in doc.paragraphs.contents:
+            for _s_, _sentence_ in _.sentences.items():
+                fingerprint = int(_s_[:digits], 16)
+                if fingerprint in self.first_texts:
+                    self.texts[len(self.fingerprints)] = _sentence_.text
+                else:
+                    self.first_texts[fingerprint] = _sentence_.text
+                self.fingerprints.append(fingerprint)
+                self.documents.append(document)
+
+
+    def _runs(self):
+        '''Returns (first row, rows) for each run of equal fingerprints of
+        length two or more; rows are in the order in which they were added.'''
+        if numpy is not None:
+            fingerprints = numpy.frombuffer(self.fingerprints, dtype=numpy.uint64)
+            order = numpy.argsort(fingerprints, kind='stable')
+            ordered = fingerprints[order]
+            starts = numpy.flatnonzero(numpy.r_[True, ordered[1:] != ordered[:-1]])
+            ends = numpy.r_[starts[1:], len(ordered)]
+            duplicated = (ends - starts) > 1
+            return [(int(order[_start_]), order[_start_:_end_].tolist())
+                    for _start_, _end_ in zip(starts[duplicated], ends[duplicated])]
+
+        fingerprints = self.fingerprints
+        order = sorted(range(len(fingerprints)), key=fingerprints.__getitem__)
+        runs = []
+        start = 0
+        for _index_ in range(1, len(order) + 1):
+            if _index_ == len(order) or fingerprints[order[_index_]] != fingerprints[order[start]]:
+                if _index_ - start > 1:
+                    runs.append((order[start], order[start:_index_]))
+                start = _index_
+        return runs
+
+
+    def groups(self):
+        '''Yields the lists of occurrences of each duplicated sentence.'''
+        file_paths, documents, texts = self.file_paths, self.documents, self.texts
+        for _first_, _rows_ in sorted(self._runs()):
+            first = Statistics(file_paths[documents[_first_]],
+                               Sentence(self.first_texts[self.fingerprints[_first_]]))
+            yield [first] + [Statistics(file_paths[documents[_row_]], Sentence(texts[_row_]))
+                             for _row_ in _rows_[1:]]
+
+
+
+class IncrementalGroupingEngine(DictGroupingEngine):
+    '''The dict engine which also remembers the signatures of each document,
+    so that a changed document is grouped again without the others.'''
+    name = 'incremental'
+
+    def __init__(self):
+        super().__init__()
+        self.documents = {}
+
+
+    def add(self, doc):
+        self.remove(doc.file_path)
+        super().add(doc)
+        self.documents[doc.file_path] = [_s_ for _ in doc.paragraphs.contents
+                                         for _s_ in _.sentences]
+
+
+    def remove(self, file_path):
+        for _s_ in set(self.documents.pop(file_path, ())):
+            remaining = [_ for _ in self.contents[_s_] if _.file_path != file_path]
+            if remaining:
+                self.contents[_s_] = remaining
+            else:
+                del self.contents[_s_]
+
+
+    def groups_of(self, file_paths):
+        '''Yields the groups of duplicates which include a sentence of any of
+        the given documents.'''
+        seen = set()
+        for _path_ in file_paths:
+            for _s_ in self.documents.get(_path_, ()):
+                if _s_ not in seen and len(self.contents[_s_]) > 1:
+                    seen.add(_s_)
+                    yield self.contents[_s_]
+
+
+
+engines = {DictGroupingEngine.name: DictGroupingEngine,
+           ArrayGroupingEngine.name: ArrayGroupingEngine}
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+'''Selects the hash functions used by the library.
+
+Two kinds of hashes are configured separately in the options:
+
+content_hash names the directories of a project in the library (the lib
+suffix of each file). It must not change for an existing library without
+care, which is why copy_project keeps the suffixes already recorded.
+
+fingerprint_hash makes the signatures of sentences and paragraphs, which
+are only compared within one run or kept in caches named after the hash.
+It does not need to resist attacks, so a short or non-cryptographic hash
+can be used.
+
+A hash is a factory of objects with the hashlib interface (update and
+hexdigest). xxh64 is available when the xxhash package is installed.'''
+
+from hashlib import sha1, md5, blake2b, blake2s
+
+
+hashers = {}
+
+def register_hasher(name, factory):
+    hashers[name] = factory
+
+
+def get_hasher(name):
+    '''Returns the factory of the named hash; SHA1 by default.'''
+    try:
+        return hashers[name or 'sha1']
+    except KeyError:
+        raise ValueError("Unknown hash '{}'; available: {}".format(
+            name, ', '.join(sorted(hashers))))
+
+
+register_hasher('sha1', sha1)
+register_hasher('md5', md5)
+register_hasher('blake2b', blake2b)
+register_hasher('blake2b64', lambda data=b'': blake2b(data, digest_size=8))
+register_hasher('blake2s64', lambda data=b'': blake2s(data, digest_size=8))
+
+try:
+    import xxhash
+except ImportError:
+    pass
+else:
+    register_hasher('xxh64', xxhash.xxh64)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+'''Keeps immutable snapshots of library projects.
+
+A snapshot is the meta catalog of a project at the time of the snapshot with a
+reference to the contents of every file. The contents are kept in a content
+addressed object store so that unchanged files are shared by all snapshots.
+With a delta chain length, a changed file is stored as a delta against its
+object in the previous snapshot.'''
+
+import yaml
+
+from os import makedirs, listdir
+from os.path import join as path_join
+from bisect import bisect_right
+from datetime import datetime, time
+
+from constants import MetaArgumentName as meta_arg, SnapshotArgumentName as snap_arg
+from meta import MetaRecord
+from store import ObjectStore
+from errors import SnapshotNotFound
+from profiler import profiler
+
+
+class Snapshot:
+    '''Immutable state of a project: its meta records and object references.'''
+
+    id_format = '%Y%m%dT%H%M%S%f'
+
+    def __init__(self, snapshot_id, project_code, created, records):
+        self.snapshot_id = snapshot_id
+        self.project_code = project_code
+        self.created = created
+        self.records = records
+
+
+    def get_contents(self):
+        '''Yields pairs of a meta record and the name of the object which keeps
+        the contents of the record.'''
+        for _signature_ in self.records:
+            record = self.records[_signature_]
+            yield (MetaRecord(record[meta_arg.file_name],
+                              record[meta_arg.target_dir],
+                              record[meta_arg.lib_suffix],
+                              size=record.get(meta_arg.size),
+                              digest=record.get(meta_arg.digest)),
+                   record[snap_arg.object_name])
+
+
+    @staticmethod
+    def make_id(moment):
+        return moment.strftime(Snapshot.id_format)
+
+
+
+class History:
+    '''The collection of snapshots of one project.'''
+
+    def __init__(self, product_code, data_dir_path, history_dir_name,
+                 objects_dir_name, data_file_suffix, layout=None, max_chain=0):
+        self.product_code = product_code.lower().strip()
+        self._data_file_suffix = data_file_suffix
+        self._history_path = path_join(data_dir_path,
+                                       history_dir_name,
+                                       self.product_code)
+        self.objects = ObjectStore(path_join(data_dir_path, objects_dir_name),
+                                   layout=layout,
+                                   max_chain=max_chain)
+        makedirs(self._history_path, exist_ok=True)
+
+
+    def _make_path(self, snapshot_id):
+        return path_join(self._history_path,
+                         '.'.join([snapshot_id, self._data_file_suffix]))
+
+
+    def snapshot_ids(self):
+        '''Snapshot IDs are timestamps; sorting them gives the order of creation.'''
+        suffix = '.' + self._data_file_suffix
+        return sorted(_name_[:-len(suffix)]
+                      for _name_ in listdir(self._history_path)
+                      if _name_.endswith(suffix))
+
+
+    def record(self, meta_doc, lib_store):
+        '''Makes a new snapshot from the supplied meta document. The contents of
+        each record are taken from lib_store.
+
+        A record with the same size and digest as in the previous snapshot
+        refers to the same object, so only new and changed files are read.'''
+        created = datetime.now()
+        snapshot_id = Snapshot.make_id(created)
+        previous = {}
+        snapshot_ids = self.snapshot_ids()
+        if snapshot_ids:
+            previous = self.load(snapshot_ids[-1]).records
+        records = {}
+        for _signature_, _record_ in meta_doc.get_contents():
+            entry = _record_.as_dict()
+            last = previous.get(_signature_, {})
+            name = last.get(snap_arg.object_name)
+            if not (self._unchanged(_record_, last) and self.objects.exists(name)):
+                name = self.objects.add_blob(lib_store, _signature_, name)
+                profiler.count('stored')
+            entry[snap_arg.object_name] = name
+            records[_signature_] = entry
+            profiler.count('files')
+
+        contents = {snap_arg.project_code: self.product_code,
+                    snap_arg.created: created.isoformat(),
+                    snap_arg.records: records}
+        with open(self._make_path(snapshot_id), 'w') as output_file:
+            yaml.dump(contents, stream=output_file, default_flow_style=False)
+        return snapshot_id
+
+
+    @staticmethod
+    def _unchanged(record, last):
+        '''True if the record has the size and digest of the entry of the same
+        file in the previous snapshot. Records of older meta files have no
+        digest and are always stored.'''
+        return (record.digest is not None and
+                (record.size, record.digest) == (last.get(meta_arg.size),
+                                                 last.get(meta_arg.digest)))
+
+
+    def find(self, at):
+        '''Returns the snapshot with the given ID or the latest snapshot made no
+        later than the given ISO date or time. A date without time refers to
+        the end of that day.'''
+        snapshot_ids = self.snapshot_ids()
+        if at in snapshot_ids:
+            snapshot_id = at
+        else:
+            try:
+                moment = datetime.fromisoformat(at)
+            except ValueError:
+                raise SnapshotNotFound(at)
+            if len(at) <= len('YYYY-MM-DD'):
+                moment = datetime.combine(moment.date(), time.max)
+            position = bisect_right(snapshot_ids, Snapshot.make_id(moment))
+            if not position:
+                raise SnapshotNotFound(at)
+            snapshot_id = snapshot_ids[position - 1]
+        return self.load(snapshot_id)
+
+
+    def load(self, snapshot_id):
+        with open(self._make_path(snapshot_id)) as input_file:
+            data = yaml.safe_load(input_file)
+        return Snapshot(snapshot_id,
+                        data[snap_arg.project_code],
+                        data[snap_arg.created],
+                        data[snap_arg.records])
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 '''Top level operations and helper functions'''
 
+import json
+
 from os import walk, sep, makedirs
+from time import monotonic
+from multiprocessing import cpu_count
 from hashlib import sha1
 from shutil import copy as copy_file
 from git import Repo
@@ -13,7 +17,9 @@ from signals import (OperationStatusSignals,
                      VerificationSignals, JIRASignals,
                      TargetMark, ContextMark)
 from errors import (DataSourceNotFound,
-                    FeatureBranchNotFound)
+                    FeatureBranchNotFound,
+                    DaemonRunning,
+                    ManifestInvalid)
 from messages import (Alert,
                       Info,
                       Request)
@@ -21,46 +27,208 @@ from constants import (MetaArgumentName as meta_arg,
                        NameFactory,
                        DirectiveNameSpace)
 from connectors import GitConnector, JIRAConnector
-from operations import (AddOperation,
+from daemon import DaemonServer
+from server import LibraryServer
+from batch import BatchManifest, BatchRunner
+from operations import (Operation,
+                        AddOperation,
                         CheckOutOperation,
                         CheckInOperation,
                         MergeOperation,
-                        DetectOperation)
+                        DetectOperation,
+                        GarbageCollectOperation,
+                        RepackOperation,
+                        MigrateOperation,
+                        VerifyOperation,
+                        SearchOperation,
+                        DiffOperation,
+                        WatchOperation)
 
 
 class DocProject:
     def __init__(self, env):
         self.env = env
+        # The last operation is kept until the project is released, so that
+        # the memory tracer counts its objects at the end of the operation.
+        self.operation = None
     
     def detect(self):
         '''Searches each asset for actionable patterns'''
-        op = DetectOperation(self.env,
-                             target=TargetMark.Duplicate,
-                             context=ContextMark.Paragraph)
+        op = self.operation = DetectOperation(self.env,
+                                              target=TargetMark.Duplicate,
+                                              context=ContextMark.Paragraph)
         op.inspect()
         for _ in op.display():
             print('{} => {}'.format(*reversed(_)))
+        return op.status
 
             
 
     def merge(self):
         '''Scans all assets in the selected project and executes commands.'''
-        MergeOperation(self.env)
+        self.operation = MergeOperation(self.env)
+        return self.operation.status
 
 
     def add(self):
         '''Adds documentation assets from the given directory to the library.'''
-        AddOperation(self.env)
+        self.operation = AddOperation(self.env)
+        return self.operation.status
 
 
     def checkout(self):
         '''Loads the assets of the product from the library into the
         workspace.
         '''
-        CheckOutOperation(self.env)
+        self.operation = CheckOutOperation(self.env)
+        return self.operation.status
         
 
     def checkin(self):
         '''Updates the library based on the changes in workspace.'''
 
-        CheckInOperation(self.env)
+        self.operation = CheckInOperation(self.env)
+        return self.operation.status
+
+
+    def gc(self):
+        '''Removes library files which are not referenced by any project.'''
+        op = self.operation = GarbageCollectOperation(self.env, dry_run=self.env.dry_run)
+        op.inspect()
+        total = 0
+        for _name_, _size_ in op.display():
+            total += _size_
+            print(Info.gc_orphan(_name_, _size_, op.dry_run))
+        print(Info.gc_summary(len(op.orphans), total, len(op.referenced), op.dry_run))
+        return op.status
+
+
+    def repack(self):
+        '''Consolidates library files into a pack file.'''
+        op = self.operation = RepackOperation(self.env)
+        print(Info.repack_summary(op.packed))
+        return op.status
+
+
+    def migrate(self):
+        '''Moves library files to the layout selected in the options.'''
+        op = self.operation = MigrateOperation(self.env)
+        print(Info.migrate_summary(op.moved, self.env.lib_layout))
+        return op.status
+
+
+    def verify(self):
+        '''Checks the integrity of library files.'''
+        op = self.operation = VerifyOperation(self.env,
+                                              incremental=self.env.incremental,
+                                              workers=self.env.workers)
+        op.inspect()
+        for _code_, _name_, _status_ in op.display():
+            print(Info.verify_problem(_code_, _name_, _status_))
+        if self.env.report:
+            with open(self.env.report, 'w') as report_file:
+                json.dump(op.report(), report_file, indent=2)
+        print(Info.verify_summary(op.checked, op.skipped, len(op.problems)))
+        return op.status
+
+
+    def search(self):
+        '''Finds a phrase in the documents of the library.'''
+        op = self.operation = SearchOperation(self.env, self.env.query)
+        op.inspect()
+        for _code_, _path_, _line_ in op.display():
+            print(Info.search_hit(_code_, _path_, _line_))
+        print(Info.search_summary(len(op.hits)))
+        return op.status
+
+
+    def diff(self):
+        '''Compares the paragraphs of two projects.'''
+        op = self.operation = DiffOperation(self.env, self.env.against)
+        op.inspect()
+        for _file_ in op.display():
+            print(Info.diff_file(_file_.path, len(_file_.added),
+                                 len(_file_.removed), len(_file_.moved)))
+        for _moved_ in op.moved_between:
+            print(Info.diff_moved_between(*_moved_))
+        if self.env.report:
+            with open(self.env.report, 'w') as report_file:
+                json.dump(op.report(), report_file, indent=2)
+        print(Info.diff_summary(len(op.files), op.unchanged))
+        return op.status
+
+
+    def watch(self):
+        '''Updates the library as the files of the project are saved.'''
+        def report():
+            for _path_ in op.updated:
+                print(Info.watch_file(_path_, removed=False))
+            for _path_ in op.removed:
+                print(Info.watch_file(_path_, removed=True))
+            for _ in op.display():
+                print('{} => {}'.format(*reversed(_)))
+            print(Info.watch_summary(len(op.updated), len(op.removed), op.seconds))
+
+        op = self.operation = WatchOperation(self.env, poll=self.env.poll)
+        try:
+            op.start()
+            print(Info.watch_started(op.source_dir, op.watcher.name))
+            report()
+            for _ in op.watch():
+                report()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            op.close()
+        print(Info.watch_stopped())
+
+
+    def batch(self, run_command):
+        '''Runs the operations listed in a manifest with run_command(argv).'''
+        started = monotonic()
+        try:
+            manifest = BatchManifest(self.env.manifest,
+                                     option_sep=self.env.option_sep,
+                                     name_sep=self.env.name_sep)
+        except (ManifestInvalid, OSError) as error:
+            print(Alert.manifest_invalid(self.env.manifest, error))
+            return [OperationStatusSignals.Batch.Failed]
+        runner = BatchRunner(manifest, run_command, self.env,
+                             workers=self.env.workers or manifest.workers or cpu_count())
+        for _job_, _stdout_, _stderr_, _status_ in runner.run():
+            print(Info.batch_job(_job_.number, ' '.join(_job_.argv), _status_))
+            print(_stdout_ + _stderr_, end='')
+        print(Info.batch_summary(runner.succeeded, runner.failed, runner.skipped,
+                                 monotonic() - started))
+        if runner.failed:
+            return [OperationStatusSignals.Batch.Failed]
+        return [OperationStatusSignals.Batch.Ok]
+
+
+    def daemon(self, run_command):
+        '''Runs the commands sent by dli clients over a local socket.'''
+        try:
+            server = DaemonServer(self.env.daemon_socket_path, run_command)
+        except DaemonRunning:
+            print(Alert.daemon_running(self.env.daemon_socket_path))
+            return
+        server.serve()
+
+
+    def serve(self):
+        '''Serves the library to dli clients over HTTP.'''
+        operation = Operation(self.env)
+        server = LibraryServer((self.env.bind, self.env.port),
+                               data_dir_path=self.env.data_dir_path,
+                               lib=operation.lib,
+                               lib_dir_name=self.env.lib_dir_name,
+                               data_dir_names=[self.env.meta_dir_name,
+                                               self.env.graph_dir_name])
+        print(Info.serve_listening(self.env.bind, server.server_address[1]))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            operation.lib.close()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+'''Traces memory usage of operations.
+
+At each phase boundary (the end of a profiler span of the first or second
+level), the tracer records the memory allocated by Python, the peak resident
+set size of the process, the top allocation sites, and the number of live
+instances of the core classes.'''
+
+import gc
+import json
+import tracemalloc
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from resource import getrusage, RUSAGE_SELF
+
+from profiler import profiler
+
+
+class MemoryTracer:
+    '''Collects memory snapshots at the boundaries of profiler spans.'''
+
+    stdout_mark = '-'
+    top_sites = 10
+    traced_classes = ('text.TextFragment',
+                      'text.Paragraph',
+                      'text.Text',
+                      'meta.MetaRecord',
+                      'meta.MetaDocument',
+                      'grouping.Statistics')
+
+    def __init__(self):
+        self.phases = []
+        self.operation = None
+
+
+    @staticmethod
+    def peak_rss():
+        '''The peak resident set size of the process in kilobytes.'''
+        return getrusage(RUSAGE_SELF).ru_maxrss
+
+
+    @staticmethod
+    def count_objects(class_names):
+        '''Counts the live instances of the classes, given as module.class.'''
+        counts = OrderedDict((_name_, 0) for _name_ in class_names)
+        names = dict((_name_.rpartition('.')[2], _name_) for _name_ in class_names)
+        for _object_ in gc.get_objects():
+            cls = type(_object_)
+            name = names.get(cls.__name__)
+            if name and name == '.'.join([cls.__module__, cls.__name__]):
+                counts[name] += 1
+        return counts
+
+
+    def take_snapshot(self, phase):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)])
+        top = [OrderedDict([('site', '{}:{}'.format(_stat_.traceback[0].filename,
+                                                    _stat_.traceback[0].lineno)),
+                            ('bytes', _stat_.size),
+                            ('blocks', _stat_.count)])
+               for _stat_ in snapshot.statistics('lineno')[:self.top_sites]]
+        self.phases.append(OrderedDict([
+            ('phase', phase),
+            ('current_bytes', current),
+            ('peak_bytes', peak),
+            ('peak_rss_kb', MemoryTracer.peak_rss()),
+            ('objects', MemoryTracer.count_objects(self.traced_classes)),
+            ('top_sites', top)]))
+
+
+    def _on_span(self, span):
+        if span.path.count('/') <= 1:
+            self.take_snapshot(span.path)
+
+
+    def report(self):
+        '''The machine readable form of the collected snapshots.'''
+        return OrderedDict([('operation', self.operation),
+                            ('peak_rss_kb', MemoryTracer.peak_rss()),
+                            ('peak_traced_bytes', max([_['peak_bytes'] for _ in self.phases] or [0])),
+                            ('phases', self.phases)])
+
+
+    @contextmanager
+    def session(self, operation, output_path=None):
+        '''Traces everything executed in the body of the with statement and
+        writes the report to output_path (or `-' for standard output).
+        Without output_path, this is a no-op.'''
+        if not output_path:
+            yield self
+            return
+
+        self.operation = operation
+        self.phases = []
+        profiler_enabled = profiler.enabled
+        profiler.enabled = True
+        profiler.listeners.append(self._on_span)
+        tracemalloc.start()
+        try:
+            if profiler.active:
+                yield self
+            else:
+                with profiler.span(operation):
+                    yield self
+        finally:
+            self.take_snapshot('end')
+            tracemalloc.stop()
+            profiler.listeners.remove(self._on_span)
+            profiler.enabled = profiler_enabled
+            self._write(output_path)
+
+
+    def _write(self, output_path):
+        if output_path == self.stdout_mark:
+            print(json.dumps(self.report(), indent=2))
+        else:
+            with open(output_path, 'w') as output_file:
+                json.dump(self.report(), output_file, indent=2)
+
+
+
+memory_tracer = MemoryTracer()
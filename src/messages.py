@@ -27,6 +27,35 @@ class Alert:
     def git_repo_not_found(path):
         return "No Git repository has been detected under '{}'".format(path)
 
+    @staticmethod
+    def snapshot_not_found(project_code, at):
+        return "No snapshot of project '{}' matches '{}'".format(project_code, at)
+
+    @staticmethod
+    def project_not_found(project_code):
+        return "Project '{}' has not been added to the library".format(project_code)
+
+    @staticmethod
+    def blob_corrupted(blob_name, target_path):
+        return "Library file '{}' does not match its recorded digest; '{}' may be corrupted".format(
+            blob_name, target_path)
+
+    @staticmethod
+    def daemon_running(socket_path):
+        return "A daemon is already listening on '{}'".format(socket_path)
+
+    @staticmethod
+    def daemon_cannot_run(operation):
+        return "The daemon cannot run '{}'; run it directly".format(operation)
+
+    @staticmethod
+    def remote_file_missing(url, relative_path):
+        return "The library at '{}' has no file '{}'".format(url, relative_path)
+
+    @staticmethod
+    def manifest_invalid(manifest_path, reason):
+        return "Manifest '{}' is not valid: {}".format(manifest_path, reason)
+
     @staticmethod
     def feature_branch_too_many(project_code, library):
         return 'More than one feature branch is detected for {} under [{}]'.format(project_code, library)
@@ -47,6 +76,103 @@ class Info:
     def commit_message(ticket_id):
         return "[MERGED] JIRA ticket '{}'".format(ticket_id)
 
+    @staticmethod
+    def snapshot_created(project_code, snapshot_id):
+        return "Snapshot '{}' of project '{}' has been created".format(snapshot_id, project_code)
+
+    @staticmethod
+    def gc_orphan(blob_name, size, dry_run):
+        return '{} {} ({} bytes)'.format('Would remove' if dry_run else 'Removed',
+                                         blob_name, size)
+
+    @staticmethod
+    def gc_summary(count, size, referenced, dry_run):
+        return '{} orphaned blobs, {} bytes {}; {} blobs are referenced'.format(
+            count, size, 'can be freed' if dry_run else 'freed', referenced)
+
+    @staticmethod
+    def repack_summary(count):
+        return '{} blobs have been packed'.format(count)
+
+    @staticmethod
+    def migrate_summary(count, layout):
+        return "{} blobs have been moved to the '{}' layout".format(count, layout)
+
+    @staticmethod
+    def verify_problem(project_code, blob_name, status):
+        return "{}: {} in project '{}'".format(status, blob_name, project_code)
+
+    @staticmethod
+    def verify_summary(checked, skipped, failed):
+        return '{} blobs have been verified, {} unchanged blobs skipped; {} problems found'.format(
+            checked, skipped, failed)
+
+    @staticmethod
+    def search_hit(project_code, file_path, line):
+        return '{}: {}:{}'.format(project_code, file_path, line)
+
+    @staticmethod
+    def search_summary(count):
+        return '{} matches found'.format(count)
+
+    @staticmethod
+    def diff_file(file_path, added, removed, moved):
+        return '{}: {} added, {} removed, {} moved'.format(file_path, added, removed, moved)
+
+    @staticmethod
+    def diff_moved_between(source_path, source_line, target_path, target_line):
+        return 'moved: {}:{} -> {}:{}'.format(source_path, source_line, target_path, target_line)
+
+    @staticmethod
+    def diff_summary(changed, unchanged):
+        return '{} documents changed, {} unchanged'.format(changed, unchanged)
+
+    @staticmethod
+    def daemon_listening(socket_path, variable):
+        return "Listening on '{0}'; set {1}={0} to send commands to this daemon".format(
+            socket_path, variable)
+
+    @staticmethod
+    def daemon_stopped(count):
+        return 'The daemon has stopped after {} commands'.format(count)
+
+    @staticmethod
+    def serve_listening(host, port):
+        return "Serving the library at http://{}:{}/; press Ctrl+C to stop".format(host, port)
+
+    @staticmethod
+    def remote_summary(url, fetched, not_modified):
+        return "{}: {} files transferred, {} not modified".format(url, fetched, not_modified)
+
+    @staticmethod
+    def watch_started(source_dir, watcher_name):
+        return "Watching '{}' ({}); press Ctrl+C to stop".format(source_dir, watcher_name)
+
+    @staticmethod
+    def watch_file(file_path, removed):
+        return '{} {}'.format('removed' if removed else 'updated', file_path)
+
+    @staticmethod
+    def watch_summary(updated, removed, seconds):
+        return '{} files updated, {} removed in {:.2f} s'.format(updated, removed, seconds)
+
+    @staticmethod
+    def watch_stopped():
+        return 'Stopped watching'
+
+    @staticmethod
+    def batch_job(number, command, status):
+        if status is None:
+            result = 'skipped'
+        else:
+            result = 'failed ({})'.format(status) if status else 'ok'
+        return '[{}] dli {}: {}'.format(number, command, result)
+
+    @staticmethod
+    def batch_summary(succeeded, failed, skipped, seconds):
+        return '{} operations succeeded, {} failed, {} skipped in {:.1f} s'.format(
+            succeeded, failed, skipped, seconds)
+
     @staticmethod
     def work_offline():
         return 'Using offline resources ...'
@@ -71,6 +197,30 @@ class Help:
     def checkout_project():
         return 'Load the project data from the library to the working space'
 
+    @staticmethod
+    def checkout_at():
+        return 'Load the project as it was in the given snapshot ID or at the given ISO date'
+
+    @staticmethod
+    def checkout_paths():
+        return "Only load files from directories matching this pattern, such as 'installation/**'"
+
+    @staticmethod
+    def checkout_include():
+        return "Only load files whose names match this pattern, such as '*.rst'"
+
+    @staticmethod
+    def affected_by():
+        return 'Only process the documents which include this file, directly or indirectly'
+
+    @staticmethod
+    def resolve_variables():
+        return 'Replace references to shared variables with their values in the workspace'
+
+    @staticmethod
+    def ticket_summary():
+        return 'Use this ticket summary instead of prompting for it'
+
     @staticmethod
     def checkin_project():
         return 'Load the project data from the working space to the library'
@@ -79,6 +229,114 @@ class Help:
     def merge_project():
         return 'Scan the project and reuse its assets in other projects'
 
+    @staticmethod
+    def gc_library():
+        return 'Remove library files which no project refers to'
+
+    @staticmethod
+    def repack_library():
+        return 'Move referenced library files into one pack file and drop the rest'
+
+    @staticmethod
+    def migrate_library():
+        return 'Move library files to the layout selected in the options'
+
+    @staticmethod
+    def verify_library():
+        return 'Check that library files exist and match the recorded size and digest'
+
+    @staticmethod
+    def incremental():
+        return 'Skip library files which have not changed since they were last verified'
+
+    @staticmethod
+    def workers():
+        return 'The number of worker processes (the number of CPUs by default)'
+
+    @staticmethod
+    def verify_report():
+        return 'Write the JSON report to this file'
+
+    @staticmethod
+    def search_library():
+        return 'Find a word or phrase in the documents of all projects'
+
+    @staticmethod
+    def search_query():
+        return 'The words to find next to each other, ignoring case and punctuation'
+
+    @staticmethod
+    def search_project():
+        return 'Only search the documents of this project'
+
+    @staticmethod
+    def diff_projects():
+        return 'List the paragraphs added, removed and moved between two projects'
+
+    @staticmethod
+    def diff_against():
+        return 'The project to compare with, such as the next version'
+
+    @staticmethod
+    def diff_report():
+        return 'Write the JSON report to this file'
+
+    @staticmethod
+    def run_daemon():
+        return 'Serve commands over a local socket, keeping options and meta documents loaded'
+
+    @staticmethod
+    def daemon_socket():
+        return 'The path of the socket (see the daemon_socket option)'
+
+    @staticmethod
+    def watch_project():
+        return 'Update the library as the files of a checked out project are saved'
+
+    @staticmethod
+    def watch_poll():
+        return 'Check the files for changes periodically instead of using inotify'
+
+    @staticmethod
+    def run_batch():
+        return 'Run the operations listed in a manifest in one process'
+
+    @staticmethod
+    def batch_manifest():
+        return 'The YAML file which lists the operations and the ticket summaries'
+
+    @staticmethod
+    def batch_workers():
+        return 'The number of projects processed at the same time'
+
+    @staticmethod
+    def serve_library():
+        return 'Serve the library over HTTP to dli clients (see the remote_library option)'
+
+    @staticmethod
+    def serve_port():
+        return 'The port to listen on'
+
+    @staticmethod
+    def serve_bind():
+        return 'The address to listen on; 0.0.0.0 serves other hosts'
+
+    @staticmethod
+    def dry_run():
+        return 'Only report what would be done'
+
+    @staticmethod
+    def profile():
+        return 'Measure the time spent in each phase of the operation'
+
+    @staticmethod
+    def profile_output():
+        return 'Write the JSON trace or cProfile statistics to this file'
+
+    @staticmethod
+    def trace_memory():
+        return 'Write a JSON memory report to this file (or - for standard output)'
+
     @staticmethod
     def no_operation(readme_file_path):
         with open(readme_file_path) as readme:
@@ -3,9 +3,12 @@
 
 import yaml
 
-from os import sep as path_sep
+from os import sep as path_sep, scandir, stat
+from os.path import splitext
+from sys import intern
 from constants import MetaArgumentName as meta_arg
 from signals import MetaSignals as signal
+from profiler import profiler
 
 
 
@@ -16,6 +19,19 @@ class MetaDataSourceType:
 
 
 class MetaDocument:
+    '''The records of the files of a project, by signature (file name and lib
+    suffix), with indexes by target directory, file name and extension. The
+    indexes keep the records of each key in the order of registration.
+
+    Records are values: they are shared by the indexes, by the readers of the
+    document and by the documents parsed from the same file, and are replaced
+    rather than modified.'''
+
+    # Records of parsed meta files by path, with the modification time and
+    # size of the file when it was parsed; a long running process (the
+    # daemon) only parses a meta file again when it changes.
+    _loaded = {}
+
     def __init__(self, product_code, data_dir_path, meta_dir_name, data_file_suffix,
                  record_id_sep, source_type=MetaDataSourceType.YAML):
         self._record_id_sep = record_id_sep
@@ -28,6 +44,40 @@ class MetaDocument:
                                              self._meta_dir_name])
 
         self._contents = {}
+        self._by_target_dir = {}
+        self._by_file_name = {}
+        self._by_extension = {}
+
+
+    @staticmethod
+    def product_codes(data_dir_path, meta_dir_name, data_file_suffix):
+        '''Yields the product codes of all meta documents in the library.'''
+        suffix = '.' + data_file_suffix
+        with scandir(path_sep.join([data_dir_path, meta_dir_name])) as entries:
+            for _entry_ in entries:
+                if _entry_.name.endswith(suffix) and _entry_.is_file():
+                    yield _entry_.name[:-len(suffix)]
+
+
+    @staticmethod
+    def _load(data_source_path):
+        '''Returns the records of the meta file.'''
+        status = stat(data_source_path)
+        key = (status.st_mtime_ns, status.st_size)
+        cached = MetaDocument._loaded.get(data_source_path)
+        if cached is not None and cached[0] == key:
+            profiler.count('cached')
+            return cached[1]
+        with open(data_source_path) as data_source:
+            data = yaml.safe_load(data_source)
+        records = [MetaRecord(_record_[meta_arg.file_name],
+                              _record_[meta_arg.target_dir],
+                              _record_[meta_arg.lib_suffix],
+                              size=_record_.get(meta_arg.size),
+                              digest=_record_.get(meta_arg.digest))
+                   for _record_ in data.values()]
+        MetaDocument._loaded[data_source_path] = key, records
+        return records
 
 
     def read(self):
@@ -37,16 +87,11 @@ class MetaDocument:
             data_source_path = path_sep.join([self._meta_dir_path,
                                          ".".join([self.product_code,
                                                    self._data_file_suffix])])
-            data = yaml.load(open(data_source_path))
-            for each in data:
-                record = data[each]
-                file_name = record[meta_arg.file_name]
-                target_dir = record[meta_arg.target_dir]
-                lib_suffix = record[meta_arg.lib_suffix]
-
-                self.register(MetaRecord(file_name,
-                                         target_dir,
-                                         lib_suffix))
+            with profiler.span('meta_load'):
+                records = self._load(data_source_path)
+                profiler.count('records', len(records))
+            for _record_ in records:
+                self.register(_record_)
             if self._contents:
                 status = signal.MetaDocumentLoadFromYAMLFile.Ok
             else:
@@ -68,37 +113,101 @@ class MetaDocument:
         status = None
         signature = self.make_signature(meta_record.file_name,
                                         meta_record.lib_suffix)
-        new_record = MetaRecord(meta_record.file_name,
-                                meta_record.target_dir,
-                                meta_record.lib_suffix)
-        
         if not signature in self._contents:
-            self._contents[signature] = dict()
-            self._contents[signature][meta_arg.file_name] = new_record.file_name
-            self._contents[signature][meta_arg.lib_suffix] = new_record.lib_suffix
-            self._contents[signature][meta_arg.target_dir] = new_record.target_dir
+            self._contents[signature] = meta_record
+            for _index_, _key_ in self._index_keys(meta_record):
+                bucket = _index_.get(_key_)
+                if bucket is None:
+                    _index_[_key_] = meta_record
+                elif type(bucket) is list:
+                    bucket.append(meta_record)
+                else:
+                    _index_[_key_] = [bucket, meta_record]
         else:
             status = signal.RecordRegister.Failed
 
         return status
 
 
+    def unregister(self, file_name, lib_suffix):
+        '''Removes the record of the file from the contents of the document.
+        Returns the removed record or None.'''
+        record = self._contents.pop(self.make_signature(file_name, lib_suffix), None)
+        if record is not None:
+            for _index_, _key_ in self._index_keys(record):
+                bucket = _index_[_key_]
+                if type(bucket) is not list:
+                    del _index_[_key_]
+                    continue
+                bucket.remove(record)
+                if len(bucket) == 1:
+                    _index_[_key_] = bucket[0]
+        return record
+
+
+    @staticmethod
+    def _bucket(index, key):
+        '''The records with the key in the index. Most file names occur once,
+        so a key of one record maps to the record itself rather than to a
+        list.'''
+        bucket = index.get(key, ())
+        return bucket if type(bucket) in (list, tuple) else (bucket,)
+
+
+    def _index_keys(self, record):
+        return ((self._by_target_dir, record.target_dir),
+                (self._by_file_name, record.file_name),
+                (self._by_extension, record.extension))
+
+
+    def get(self, file_name, lib_suffix):
+        '''Returns the record of the file or None.'''
+        return self._contents.get(self.make_signature(file_name, lib_suffix))
+
+
+    def find(self, target_dir=None, file_name=None, extension=None):
+        '''Returns the records which match all the given fields, such as the
+        records of a directory or all copies of a file, in the order of
+        registration. The records are taken from the smallest of the indexes
+        of the given fields, so a lookup does not scan the document.'''
+        fields = [(MetaDocument._bucket(_index_, _key_), _name_, _key_)
+                  for _index_, _name_, _key_ in (
+                          (self._by_target_dir, 'target_dir', target_dir),
+                          (self._by_file_name, 'file_name', file_name),
+                          (self._by_extension, 'extension', extension))
+                  if _key_ is not None]
+        if not fields:
+            return list(self._contents.values())
+        smallest, _, _ = min(fields, key=lambda _: len(_[0]))
+        return [_record_ for _record_ in smallest
+                if all(getattr(_record_, _name_) == _key_ for _, _name_, _key_ in fields)]
+
+
+    def target_dirs(self):
+        '''The directories which contain recorded files.'''
+        return self._by_target_dir.keys()
+
+
     def save(self):
         output_file_name = ".".join([self.product_code, self._data_file_suffix])
-        output_file = open(path_sep.join([self._meta_dir_path,
-                                     output_file_name]), "w")
+        output_file_path = path_sep.join([self._meta_dir_path,
+                                          output_file_name])
+        MetaDocument._loaded.pop(output_file_path, None)
 
-        yaml.dump(self._contents,
-                  stream=output_file,
-                  default_flow_style=False)
+        with profiler.span('meta_save'), open(output_file_path, "w") as output_file:
+            yaml.dump({_signature_: _record_.as_dict()
+                       for _signature_, _record_ in self._contents.items()},
+                      stream=output_file,
+                      default_flow_style=False)
+            profiler.count('records', len(self._contents))
 
 
     def get_contents(self):
-        '''The keys in contents are not very important as they are constructed
-        based on other fields: file_name and lib_suffix.'''
+        '''Yields the signature and the record of each file. The keys in
+        contents are not very important as they are constructed based on
+        other fields: file_name and lib_suffix.'''
 
-        for each in self._contents:
-            yield each, self._contents[each]
+        yield from self._contents.items()
 
 
     @property
@@ -106,10 +215,34 @@ class MetaDocument:
         return self._contents
 
 class MetaRecord:
-    def __init__(self, file_name, target_dir, lib_suffix):
-        self.file_name = file_name
-        self.target_dir = target_dir
-        self.lib_suffix = lib_suffix
+    '''The location and contents of one file. Directory names and suffixes
+    are shared by many records, so one copy of each is kept.'''
+    __slots__ = ('file_name', 'target_dir', 'lib_suffix', 'size', 'digest')
 
+    def __init__(self, file_name, target_dir, lib_suffix, size=None, digest=None):
+        self.file_name = file_name
+        self.target_dir = intern(target_dir)
+        self.lib_suffix = intern(lib_suffix)
+        self.size = size
+        self.digest = digest
 
 
+    @property
+    def extension(self):
+        '''The extension of the file name without the dot, or an empty
+        string.'''
+        return splitext(self.file_name)[1][1:]
+
+
+    def as_dict(self):
+        '''The record as it is written to a meta file.'''
+        data = {meta_arg.file_name: self.file_name,
+                meta_arg.lib_suffix: self.lib_suffix,
+                meta_arg.target_dir: self.target_dir}
+        # Older meta files have no size and digest; they are only
+        # written when known so that such files keep their format.
+        if self.size is not None:
+            data[meta_arg.size] = self.size
+        if self.digest is not None:
+            data[meta_arg.digest] = self.digest
+        return data
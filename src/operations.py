@@ -1,21 +1,39 @@
 #!/usr/bin/env python3
 '''Implementations of the top level features'''
 
-from os.path import sep as path_sep, join as path_join
-from os import walk, makedirs
-from hashlib import sha1
-from shutil import copyfile as copy_file
-from collections import namedtuple
+from os.path import sep as path_sep, join as path_join, isdir, isfile, getsize, relpath
+from os import makedirs, replace, remove
+from time import time, monotonic
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count
 
 from ui import CLIMessage
 from signals import (OperationStatusSignals,
                      VerificationSignals, JIRASignals,
+                     HistorySignals,
                      TargetMark, ContextMark)
-from text import Text
+from text import Text, use_fingerprint_hash
+from hashing import get_hasher
 from meta import MetaDocument, MetaRecord, MetaDataSourceType
+from store import BlobStore, ObjectStore, decode_errors
+from remote import RemoteLibrary
+from history import History
+from walker import DirectoryWalker
+from sparse import SparseSet
+from depgraph import DependencyGraph
+from variables import VariableStore
+from render import VariantRenderer, Target
+from search import SearchIndex
+from diff import SignatureCache, compare as compare_paragraphs
+from grouping import (DictGroupingEngine, IncrementalGroupingEngine,
+                      engines as grouping_engines)
+from verify import VerificationState, VerifyStatus, init_worker, verify_blob
+from watch import make_watcher, batches
 from errors import (DataSourceNotFound,
                     FeatureBranchNotFound,
-                    FeatureBranchTooMany)
+                    FeatureBranchTooMany,
+                    SnapshotNotFound)
 from messages import (Alert,
                       Info,
                       Request)
@@ -23,6 +41,7 @@ from constants import (MetaArgumentName as meta_arg,
                        NameFactory,
                        DirectiveNameSpace)
 from connectors import GitConnector, JIRAConnector, JIRATicketInfo
+from profiler import profiler
 from directives import (DirectiveBuffer,
                         AutoAgent,
                         ProductAgent,
@@ -36,6 +55,13 @@ class Operation:
         self.status = []
         self.collection = dict()
         self.workspace_path = None
+        self.meta_doc = None
+        use_fingerprint_hash(self.env.fingerprint_hash)
+        self.lib = BlobStore(path_join(self.env.data_dir_path,
+                                       self.env.lib_dir_name),
+                             codec=self.env.compression,
+                             skip_extensions=self.env.compression_skip,
+                             layout=self.env.lib_layout)
 
         if self.env.project_code:
             self.workspace_path = path_join(self.env.workspace_dir_path,
@@ -57,7 +83,8 @@ class Operation:
                                      legend=message_legend,
                                      text_width=self.env.message_screen_width,
                                      decoration_token=self.env.message_horizontal_line).make()
-                self.status.append(ticket.update_summary(text=message))
+                self.status.append(ticket.update_summary(text=message,
+                                                          summary=self.env.ticket_summary))
             else:
                 print(Alert.jira_ticket_not_found(self.env.ticket_id))
                 print(Info.work_offline())
@@ -76,48 +103,184 @@ class Operation:
                                     text=message,
                                     ticket_id_sep=self.env.code_sep)
 
-            self.status.append(ticket.update_summary(message))
+            self.status.append(ticket.update_summary(message,
+                                                  summary=self.env.ticket_summary))
             return ticket
         #+END_nested_functions
 
         return self.env.allow_remote_requests and work_online() or work_offline()
 
 
-    def copy_project(self, target_dir):
-        collected = self.collect(target_dir)
+    def copy_project(self, target_dir, sparse=None):
+        '''Registers every collected file in the meta document of the project
+        and copies it to the library as soon as it is found.
+
+        With a sparse set, only the selected files are expected in target_dir;
+        the records of the other files are kept from the current meta
+        document. Documents are scanned for the files that they include, and
+        the dependency graph of the project is updated.'''
         meta_doc = MetaDocument(product_code=self.env.project_code,
                                 data_dir_path=self.env.data_dir_path,
                                 meta_dir_name=self.env.meta_dir_name,
                                 data_file_suffix=self.env.data_file_suffix,
                                 record_id_sep=self.env.code_sep)
-        
-        for _file_path_ in collected:
-            local_file_path = _file_path_.partition(path_sep+self.env.doc_source_dir_name+path_sep)[-1]
-            file_dir, _, file_name = local_file_path.rpartition(path_sep)
-
-            suffix= sha1(bytes(path_join(self.env.project_code, file_dir),
-                               self.env.default_encoding)).hexdigest()[:self.env.key_length]
-
-            lib_file_name = self.env.code_sep.join([file_name, suffix])
-            
-            meta_rec = MetaRecord(file_name=file_name,
-                                  target_dir=file_dir,
-                                  lib_suffix=suffix)
-            meta_doc.register(meta_rec)
-            self.collection[lib_file_name] = _file_path_
-          
+        current = MetaDocument(product_code=self.env.project_code,
+                               data_dir_path=self.env.data_dir_path,
+                               meta_dir_name=self.env.meta_dir_name,
+                               data_file_suffix=self.env.data_file_suffix,
+                               record_id_sep=self.env.code_sep)
+        try:
+            current.read()
+        except FileNotFoundError:
+            pass
+        # Directories already in the library keep their suffixes, so that
+        # changing content_hash does not rename the files of existing projects.
+        suffixes = {_dir_: current.find(target_dir=_dir_)[0].lib_suffix
+                    for _dir_ in current.target_dirs()}
+        kept = []
+        if sparse:
+            kept = [_record_ for _, _record_ in current.get_contents()
+                    if not sparse.matches(_record_.target_dir, _record_.file_name)]
+        graph = self.make_graph().read()
+        variable_store = self.make_variable_store()
+        variables = dict(variable_store.read(self.env.project_code)) if sparse else {}
+        index = self.make_search_index().read()
+        doc_suffix = '.' + self.env.default_doc_format
+
+        with profiler.span('collect'):
+            for _file_path_ in self.collect(target_dir):
+                local_file_path = _file_path_.partition(path_sep+self.env.doc_source_dir_name+path_sep)[-1]
+                file_dir, _, file_name = local_file_path.rpartition(path_sep)
+
+                suffix = suffixes.get(file_dir)
+                if suffix is None:
+                    suffix = suffixes[file_dir] = self.make_lib_suffix(file_dir)
+
+                lib_file_name = self.env.code_sep.join([file_name, suffix])
+                size, digest = self._save(lib_file_name, _file_path_)
+
+                meta_rec = MetaRecord(file_name=file_name,
+                                      target_dir=file_dir,
+                                      lib_suffix=suffix,
+                                      size=size,
+                                      digest=digest)
+                meta_doc.register(meta_rec)
+                self.collection[lib_file_name] = _file_path_
+                if file_name.endswith(doc_suffix):
+                    with open(_file_path_, encoding=self.env.default_encoding,
+                              errors='replace') as doc_file:
+                        lines = doc_file.readlines()
+                    document = graph.make_path(file_dir, file_name)
+                    graph.scan(document, lines)
+                    VariableStore.scan(lines, variables)
+                    if not index.is_current(document, digest):
+                        index.update(document, digest, lines)
+
+        # Files collected from the workspace take precedence over the records
+        # kept from the sparse checkout, such as included files pulled in
+        # with the selected documents.
+        for _record_ in kept:
+            meta_doc.register(_record_)
+
+        documents = set(graph.make_path(_record_.target_dir, _record_.file_name)
+                        for _, _record_ in meta_doc.get_contents())
+        for _document_ in list(graph.dependencies):
+            if _document_ not in documents:
+                graph.remove(_document_)
+        index.prune(documents)
+
         meta_doc.save()
-        self._save()
+        graph.save()
+        variable_store.save(self.env.project_code, variables)
+        with profiler.span('index'):
+            index.save()
+        self.meta_doc = meta_doc
         return self.collection
 
     
-    def _save(self):
-        if self.collection:
-            for _file_name_ in self.collection:
-                source = self.collection[_file_name_]
-                destination = path_join(self.env.data_dir_path,
-                                        self.env.lib_dir_name, _file_name_)
-                copy_file(source, destination)
+    def make_lib_suffix(self, file_dir):
+        '''The suffix of the library files of a new directory of the project.'''
+        content_hasher = get_hasher(self.env.content_hash)
+        return content_hasher(bytes(path_join(self.env.project_code, file_dir),
+                                    self.env.default_encoding)).hexdigest()[:self.env.key_length]
+
+
+    def _save(self, lib_file_name, source_path):
+        '''Copies the file to the library. Returns its size and digest, which
+        are computed during the copy and kept in the meta record to verify
+        the file when it is checked out.'''
+        size, digest = self.lib.put(source_path, lib_file_name)
+        profiler.count('files')
+        profiler.count('bytes', size)
+        return size, digest
+
+
+    def meta_documents(self):
+        '''Yields the meta documents of the library, loaded one at a time.'''
+        with profiler.span('meta_load'):
+            for _code_ in MetaDocument.product_codes(self.env.data_dir_path,
+                                                     self.env.meta_dir_name,
+                                                     self.env.data_file_suffix):
+                meta_doc = MetaDocument(product_code=_code_,
+                                        data_dir_path=self.env.data_dir_path,
+                                        meta_dir_name=self.env.meta_dir_name,
+                                        data_file_suffix=self.env.data_file_suffix,
+                                        record_id_sep=self.env.code_sep)
+                meta_doc.read()
+                yield meta_doc
+
+
+    def referenced_blobs(self):
+        '''Returns the names of all lib blobs referenced from the meta documents
+        of the library. The documents are loaded one at a time.'''
+        referenced = set()
+        for _meta_doc_ in self.meta_documents():
+            referenced.update(_meta_doc_.contents)
+        return referenced
+
+
+    def make_history(self):
+        return History(product_code=self.env.project_code,
+                       data_dir_path=self.env.data_dir_path,
+                       history_dir_name=self.env.history_dir_name,
+                       objects_dir_name=self.env.objects_dir_name,
+                       data_file_suffix=self.env.data_file_suffix,
+                       layout=self.env.lib_layout,
+                       max_chain=self.env.delta_chain_length)
+
+
+    def make_graph(self, data_dir_path=None):
+        return DependencyGraph(product_code=self.env.project_code,
+                               data_dir_path=data_dir_path or self.env.data_dir_path,
+                               graph_dir_name=self.env.graph_dir_name,
+                               data_file_suffix=self.env.data_file_suffix)
+
+
+    def affected_documents(self):
+        '''Returns the paths of the documents affected by the files given with
+        --affected-by, or None if all documents should be processed.'''
+        if not self.env.affected_by:
+            return None
+        return self.make_graph().read().affected_by(
+            _.strip('/') for _ in self.env.affected_by)
+
+
+    def make_search_index(self, project_code=None):
+        return SearchIndex(product_code=project_code or self.env.project_code,
+                           data_dir_path=self.env.data_dir_path,
+                           index_dir_name=self.env.index_dir_name,
+                           data_file_suffix=self.env.data_file_suffix)
+
+
+    def make_variable_store(self):
+        return VariableStore(data_dir_path=self.env.data_dir_path,
+                             variables_dir_name=self.env.variables_dir_name,
+                             data_file_suffix=self.env.data_file_suffix,
+                             code_sep=self.env.code_sep)
+
+
+    def make_sparse_path(self):
+        return path_join(self.workspace_path, SparseSet.file_name)
 
 
     def make_workspace_path(self, target_dir=None):
@@ -134,26 +297,29 @@ class Operation:
 
 
     def collect(self, target_dir):
-        collected_paths = set()
+        '''Yields the paths of documentation files under target_dir, skipping
+        the directories and files matched by the ignore patterns.'''
+        return self.make_walker().walk(target_dir)
+
 
-        for _dir_ in walk(target_dir):
-            current_dir = _dir_[0]
-            files = _dir_[2]
-            
-            for _file_name_ in files:
-                if _file_name_.rpartition(".")[-1] in self.env.doc_file_extensions:
-                    collected_paths.add(path_join(current_dir, _file_name_))
-        return collected_paths
+    def make_walker(self):
+        return DirectoryWalker(extensions=self.env.doc_file_extensions,
+                               ignore=self.env.ignore or (),
+                               use_gitignore=self.env.use_gitignore,
+                               workers=self.env.walk_workers)
 
 
 
 class AddOperation(Operation):
-    def __init__(self, env):
+    def __init__(self, env, sparse=None):
         super().__init__(env)
         source_dir = path_join(self.env.source_dir,
                                self.env.doc_source_dir_name)
 
-        if self.copy_project(source_dir):
+        if self.copy_project(source_dir, sparse):
+            with profiler.span('snapshot'):
+                self.make_history().record(self.meta_doc, self.lib)
+            self.status.append(HistorySignals.SnapshotCreate.Ok)
             self.status.append(OperationStatusSignals.Add.Ok)
         else:
             self.status.append(OperationStatusSignals.Add.Failed)
@@ -163,26 +329,85 @@ class AddOperation(Operation):
 class CheckOutOperation(Operation):
     def __init__(self, env):
         super().__init__(env)
-        meta_doc = MetaDocument(product_code=self.env.project_code,
-                                data_dir_path=self.env.data_dir_path,
-                                meta_dir_name=self.env.meta_dir_name,
-                                data_file_suffix=self.env.data_file_suffix,
-                                record_id_sep=self.env.code_sep)
-        meta_doc.read()
-        for _ in meta_doc.get_contents():
-            signature, record = _
-            record = MetaRecord(**record)
-            source_file_path = path_join(self.env.data_dir_path,
-                                         self.env.lib_dir_name,
-                                         signature)
-            target_dir = self.make_workspace_path(record.target_dir)
-            makedirs(target_dir, exist_ok=True)            
-            target_file_path = path_join(target_dir,
-                                         record.file_name)
-            copy_file(source_file_path, target_file_path)
-            self.status.append(OperationStatusSignals.CheckOut.Ok)
+        self.data_dir_path = self.env.data_dir_path
+        self.remote = None
+        if self.env.remote_library and not self.env.at:
+            with profiler.span('fetch'):
+                if not self._open_remote():
+                    return
+        try:
+            self._check_out()
+        finally:
+            if self.remote:
+                self.lib.close()
+                print(Info.remote_summary(self.remote.url, self.remote.fetched,
+                                          self.remote.not_modified))
+
+
+    def _open_remote(self):
+        '''Reads the project from the library at the remote_library URL. The
+        meta document and the dependency graph are brought up to date in the
+        local cache; library files are fetched before they are copied.'''
+        self.remote = RemoteLibrary(self.env.remote_library,
+                                    cache_dir=path_join(self.env.data_dir_path,
+                                                        self.env.cache_dir_name,
+                                                        self.env.remote_dir_name),
+                                    lib_dir_name=self.env.lib_dir_name,
+                                    max_size=self.env.remote_cache_size)
+        self.lib = self.remote.lib
+        self.data_dir_path = self.remote.cache_dir
+        file_name = '.'.join([self.env.project_code.lower(), self.env.data_file_suffix])
+        meta_path = '/'.join([self.env.meta_dir_name, file_name])
+        if not self.remote.fetch(meta_path):
+            print(Alert.remote_file_missing(self.env.remote_library, meta_path))
+            self.status.append(OperationStatusSignals.CheckOut.Failed)
+            self.remote.close()
+            return False
+        self.remote.fetch('/'.join([self.env.graph_dir_name, file_name]))
+        return True
+
+
+    def _check_out(self):
+        sparse = SparseSet(self.env.paths, self.env.include)
+        try:
+            contents = list(self._get_contents())
+            if sparse:
+                contents = self._select(contents, sparse)
+        except SnapshotNotFound:
+            print(Alert.snapshot_not_found(self.env.project_code, self.env.at))
+            self.status.append(HistorySignals.SnapshotLoad.Failed)
+            return
+        makedirs(self.workspace_path, exist_ok=True)
+        sparse.save(self.make_sparse_path())
+
+        if self.remote:
+            with profiler.span('fetch'):
+                self.lib.prefetch([(_blob_name_, _record_.digest)
+                                   for _record_, _, _blob_name_ in contents])
 
-        jira_ticket = self.request_jira_ticket()
+        with profiler.span('copy'):
+            for _ in contents:
+                record, store, blob_name = _
+                target_dir = self.make_workspace_path(record.target_dir)
+                makedirs(target_dir, exist_ok=True)
+                target_file_path = path_join(target_dir,
+                                             record.file_name)
+                try:
+                    size, digest = store.get(blob_name, target_file_path)
+                    corrupted = (record.digest is not None and
+                                 (size, digest) != (record.size, record.digest))
+                except decode_errors:
+                    size, corrupted = 0, True
+                profiler.count('files')
+                profiler.count('bytes', size)
+                if corrupted:
+                    print(Alert.blob_corrupted(blob_name, target_file_path))
+                    self.status.append(OperationStatusSignals.CheckOut.Failed)
+                else:
+                    self.status.append(OperationStatusSignals.CheckOut.Ok)
+
+        with profiler.span('ticket'):
+            jira_ticket = self.request_jira_ticket()
         ticket_summary_updated = not JIRASignals.TicketSummaryUpdate.Failed in self.status
         if ticket_summary_updated and self.env.git_in_workspace:
             repo = GitConnector(workspace_path=self.workspace_path,
@@ -191,23 +416,61 @@ class CheckOutOperation(Operation):
                              ticket_summary=jira_ticket)
             self.status.append(OperationStatusSignals.CheckOut.Ok)
 
+
+    def _select(self, contents, sparse):
+        '''Returns the items of contents selected by the sparse set together
+        with the files which the selected documents include.'''
+        graph = self.make_graph(self.data_dir_path).read()
+        selected = list(sparse.select(contents))
+        required = graph.required_by(graph.make_path(_[0].target_dir, _[0].file_name)
+                                     for _ in selected)
+        return selected + [_ for _ in contents
+                           if not sparse.matches(_[0].target_dir, _[0].file_name) and
+                           graph.make_path(_[0].target_dir, _[0].file_name) in required]
+
+
+    def _get_contents(self):
+        '''Yields a meta record, the store that keeps its contents, and the name
+        of the blob in that store. With a snapshot ID or date, the records are
+        taken from the matching snapshot instead of the current meta file.'''
+        if self.env.at:
+            history = self.make_history()
+            snapshot = history.find(self.env.at)
+            self.status.append(HistorySignals.SnapshotLoad.Ok)
+            for _record_, _object_name_ in snapshot.get_contents():
+                yield _record_, history.objects, _object_name_
+        else:
+            meta_doc = MetaDocument(product_code=self.env.project_code,
+                                    data_dir_path=self.data_dir_path,
+                                    meta_dir_name=self.env.meta_dir_name,
+                                    data_file_suffix=self.env.data_file_suffix,
+                                    record_id_sep=self.env.code_sep)
+            meta_doc.read()
+            for _signature_, _record_ in meta_doc.get_contents():
+                yield _record_, self.lib, _signature_
+
     
 
 class CheckInOperation(Operation):
     def __init__(self, env):
         super().__init__(env)
         env.source_dir = self.workspace_path
-        AddOperation(env)
+        added = AddOperation(env, sparse=SparseSet.load(self.make_sparse_path()))
 
         #jira_ticket = self.request_jira_ticket()
         #GitConnector(self.env.data_dir_path).make_branch(
         #    product_id=self.env.project_code,
         #    ticket_summary=jira_ticket)
-        self.status = OperationStatusSignals.CheckIn.Ok
+        if OperationStatusSignals.Add.Failed in added.status:
+            self.status.append(OperationStatusSignals.CheckIn.Failed)
+        else:
+            self.status.append(OperationStatusSignals.CheckIn.Ok)
 
 
 
 class MergeOperation(Operation):
+    render_cache_dir_name = 'render'
+
     def __init__(self, env):
         super().__init__(env)
         auto_directive = DirectiveBuffer.doc_property(
@@ -231,36 +494,81 @@ class MergeOperation(Operation):
                                     data_file_suffix=self.env.data_file_suffix,
                                     record_id_sep=self.env.code_sep)
             meta_doc.read()
+            affected = self.affected_documents()
+            renderer = self.make_renderer()
+            variables = None
+            if self.env.resolve_variables:
+                variables = self.make_variable_store().resolve(self.env.project_code)
 
-            for _ in meta_doc.get_contents():
-                signature, record = _
-                record = MetaRecord(**record)
-
-                if record.file_name.endswith(self.env.default_doc_format):
-                    target_dir = self.make_workspace_path(record.target_dir)
-                    target_file_path = path_join(target_dir,
-                                                 record.file_name)
-                    with open(target_file_path) as doc_file:
-                        buffer = DirectiveBuffer(doc_file, self.env)
-                        for _directive_ in buffer.directives:
-                            if _directive_ == auto_directive:
-                                agent = AutoAgent(self.env, doc_file)
-                                agent.run(buffer.directives[_directive_])
-                            elif _directive_ == product_directive:
-                                agent = ProductAgent(self.env, doc_file)
-                                agent.run(buffer.directives[_directive_])
-                            elif _directive_ == version_directive:
-                                agent = VersionAgent(self.env, doc_file)
-                                agent.run(buffer.directives[_directive_])
-                else:
-                    self.status.append(OperationStatusSignals.Merge.Failed)
+            with profiler.span('scan'):
+                for _, record in meta_doc.get_contents():
+                    if affected is not None and DependencyGraph.make_path(
+                            record.target_dir, record.file_name) not in affected:
+                        continue
+
+                    if record.file_name.endswith(self.env.default_doc_format):
+                        target_dir = self.make_workspace_path(record.target_dir)
+                        target_file_path = path_join(target_dir,
+                                                     record.file_name)
+                        with open(target_file_path) as doc_file, profiler.span('parse'):
+                            buffer = DirectiveBuffer(doc_file, self.env)
+                            profiler.count('files')
+                            for _directive_ in buffer.directives:
+                                if _directive_ == auto_directive:
+                                    agent = AutoAgent(self.env, doc_file)
+                                    agent.run(buffer.directives[_directive_])
+                                elif _directive_ == product_directive:
+                                    agent = ProductAgent(self.env, doc_file, renderer)
+                                    agent.run(buffer.directives[_directive_])
+                                elif _directive_ == version_directive:
+                                    agent = VersionAgent(self.env, doc_file, renderer)
+                                    agent.run(buffer.directives[_directive_])
+                        if variables:
+                            with profiler.span('substitute'):
+                                self._substitute(target_file_path, variables)
         else:
             self.status.append(OperationStatusSignals.Merge.Failed)
 
 
-Statistics = namedtuple('Statistics', ['file_path',
-                                       'sentence'])
+    def make_renderer(self):
+        '''The renderer of variants for the other projects of the library
+        which are checked out in the workspace.'''
+        targets = []
+        for _code_ in MetaDocument.product_codes(self.env.data_dir_path,
+                                                 self.env.meta_dir_name,
+                                                 self.env.data_file_suffix):
+            code = _code_.upper()
+            source_dir = path_join(self.env.workspace_dir_path, code,
+                                   self.env.doc_source_dir_name)
+            if code != self.env.project_code and isdir(source_dir):
+                targets.append(Target(code, self.env.code_sep, source_dir))
+        return VariantRenderer(project_code=self.env.project_code,
+                               code_sep=self.env.code_sep,
+                               source_dir=self.make_workspace_path(),
+                               targets=targets,
+                               cache_dir=path_join(self.env.data_dir_path,
+                                                   self.env.cache_dir_name,
+                                                   self.render_cache_dir_name),
+                               encoding=self.env.default_encoding)
+
 
+    def _substitute(self, file_path, variables):
+        '''Replaces references to shared variables in the file in one pass.
+        The file is only rewritten if something has been replaced.'''
+        substitute = VariableStore.make_substitution(variables)
+        temporary_path = file_path + '.tmp'
+        changed = False
+        with open(file_path, encoding=self.env.default_encoding) as source, \
+             open(temporary_path, 'w', encoding=self.env.default_encoding) as target:
+            for _line_ in source:
+                resolved = substitute(_line_)
+                changed = changed or resolved != _line_
+                target.write(resolved)
+        if changed:
+            replace(temporary_path, file_path)
+            profiler.count('files')
+        else:
+            remove(temporary_path)
 
 
 class DetectOperation(Operation):
@@ -274,36 +582,478 @@ class DetectOperation(Operation):
         super().__init__(env)
         self.target = target
         self.context = context
-        self.contents = {}
+        self.engine = grouping_engines[self.env.detect_engine or DictGroupingEngine.name]()
 
     def inspect(self):
         '''Iterates through the assets in the context of the supplied target'''
         project_documents = self.make_workspace_path()
         if self.target == TargetMark.Duplicate:
-            for _doc_ in self.collect(project_documents):
-                if _doc_.endswith(self.env.default_doc_format):
-                    self._collect_duplicates(_doc_)
+            documents = self.collect(project_documents)
+            affected = self.affected_documents()
+            with profiler.span('group'):
+                for _doc_ in documents:
+                    if affected is not None and _doc_[len(project_documents):].lstrip(path_sep) not in affected:
+                        continue
+                    if _doc_.endswith(self.env.default_doc_format):
+                        self._collect_duplicates(_doc_)
 
 
     def _collect_duplicates(self, document):
         if self.context is ContextMark.Paragraph:
-            doc = Text(document)
-            for _ in doc.paragraphs.contents:
-                for _s_ in _.sentences:
-                    if _s_ not in self.contents:
-                        self.contents[_s_] = []
-                    self.contents[_s_].append(Statistics(doc.file_path,
-                                                         _.sentences[_s_]))
+            self.engine.add(Text(document))
+
+
+    def display(self):
+        return self.display_groups(self.engine.groups())
+
+
+    @staticmethod
+    def display_groups(groups):
+        for _group_ in groups:
+            for _dupl_ in _group_:
+                text = _dupl_.sentence.text
+                if text.strip() and text[0].isalnum():
+                    yield _dupl_.file_path, text[:32].ljust(32)
+
+
+
+class GarbageCollectOperation(Operation):
+    '''Finds library blobs which are not referenced from any meta document and
+    removes them.
+
+    Meta documents are loaded one at a time, so only the set of referenced
+    blob names is kept in memory. Blobs modified within the grace period are
+    never removed, because an add or checkin running at the same time copies
+    blobs before it saves its meta document. Only loose blobs are removed;
+    orphaned blobs in pack files are dropped by the repack operation.'''
+    def __init__(self, env, dry_run=False):
+        super().__init__(env)
+        self.dry_run = dry_run
+        self.referenced = set()
+        self.orphans = []
+
+
+    def inspect(self):
+        self.referenced = self.referenced_blobs()
+
+        with profiler.span('scan'):
+            cutoff = time() - self.env.gc_grace_period
+            for _name_, _stat_ in self.lib.stats():
+                if _name_ not in self.referenced and _stat_.st_mtime < cutoff:
+                    self.orphans.append((_name_, _stat_.st_size))
+                    profiler.count('files')
+
+        if not self.dry_run:
+            with profiler.span('remove'):
+                for _name_, _ in self.orphans:
+                    self.lib.remove(_name_)
+        self.status.append(OperationStatusSignals.GarbageCollect.Ok)
+
+
+    def display(self):
+        for _name_, _size_ in self.orphans:
+            yield _name_, _size_
+
+
+
+class RepackOperation(Operation):
+    '''Moves all referenced lib blobs, loose or packed, into a single new pack
+    file. Packed blobs which no meta document refers to are dropped;
+    unreferenced loose blobs are left to the gc operation.'''
+    def __init__(self, env):
+        super().__init__(env)
+        with profiler.span('repack'):
+            self.packed = self.lib.repack(keep=self.referenced_blobs())
+            profiler.count('files', self.packed)
+        self.lib.close()
+        self.status.append(OperationStatusSignals.Repack.Ok)
+
+
+
+class MigrateOperation(Operation):
+    '''Moves loose lib blobs and snapshot objects to the layout selected in
+    the options. Other operations can run at the same time, because blobs
+    are found in either layout.'''
+    def __init__(self, env):
+        super().__init__(env)
+        objects = ObjectStore(path_join(self.env.data_dir_path,
+                                        self.env.objects_dir_name),
+                              layout=self.env.lib_layout)
+        with profiler.span('migrate'):
+            self.moved = self.lib.migrate() + objects.migrate()
+            profiler.count('files', self.moved)
+        self.status.append(OperationStatusSignals.Migrate.Ok)
+
+
+
+class VerifyOperation(Operation):
+    '''Checks that every lib blob referenced from a meta document exists and
+    matches the size and digest recorded when the file was added.
+
+    Blobs are read and hashed by a pool of worker processes. In incremental
+    mode, blobs whose fingerprint has not changed since they were last found
+    correct are skipped.'''
+    state_file_name = 'verify.state'
+
+    def __init__(self, env, incremental=False, workers=None):
+        super().__init__(env)
+        self.incremental = incremental
+        self.workers = workers or cpu_count()
+        self.checked = 0
+        self.skipped = 0
+        self.problems = []
+
+
+    def inspect(self):
+        tasks, owners, fingerprints = [], {}, {}
+        state = None
+        if self.incremental:
+            cache_dir = path_join(self.env.data_dir_path, self.env.cache_dir_name)
+            makedirs(cache_dir, exist_ok=True)
+            state = VerificationState(path_join(cache_dir, self.state_file_name))
+
+        for _meta_doc_ in self.meta_documents():
+            for _name_, _record_ in _meta_doc_.get_contents():
+                digest = _record_.digest
+                owners[_name_] = _meta_doc_.product_code
+                if state is not None:
+                    fingerprints[_name_] = self.lib.fingerprint(_name_), digest
+                    if state.is_current(_name_, *fingerprints[_name_]):
+                        self.skipped += 1
+                        continue
+                tasks.append((_name_, _record_.size, digest))
+
+        with profiler.span('verify'):
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     initializer=init_worker,
+                                     initargs=(self.lib.root_path,
+                                               self.env.lib_layout)) as pool:
+                chunksize = max(1, len(tasks) // (self.workers * 4))
+                for _name_, _status_ in pool.map(verify_blob, tasks, chunksize=chunksize):
+                    self.checked += 1
+                    if _status_ == VerifyStatus.ok:
+                        if state is not None and fingerprints[_name_][0]:
+                            state.update(_name_, *fingerprints[_name_])
+                    else:
+                        self.problems.append((owners[_name_], _name_, _status_))
+                        if state is not None:
+                            state.discard(_name_)
+            profiler.count('files', self.checked)
+
+        if state is not None:
+            state.save()
+        self.lib.close()
+        if self.problems:
+            self.status.append(OperationStatusSignals.Verify.Failed)
+        else:
+            self.status.append(OperationStatusSignals.Verify.Ok)
+
+
+    def report(self):
+        '''The machine readable result of the last inspection.'''
+        return OrderedDict([('checked', self.checked),
+                            ('skipped', self.skipped),
+                            ('failed', len(self.problems)),
+                            ('problems', [OrderedDict([('project_code', _code_),
+                                                       ('blob', _name_),
+                                                       ('status', _status_)])
+                                          for _code_, _name_, _status_ in self.problems])])
+
+
+    def display(self):
+        for _problem_ in self.problems:
+            yield _problem_
+
+
+
+class SearchOperation(Operation):
+    '''Finds the words of the query, in this order and next to each other,
+    in the documents of the project or of all projects in the library.'''
+    def __init__(self, env, query):
+        super().__init__(env)
+        self.tokens = [_ for _line_ in query for _ in Text.tokenize(_line_)]
+        self.hits = []
+
+
+    def inspect(self):
+        if self.env.project_code:
+            project_codes = [self.env.project_code.lower()]
+        else:
+            project_codes = SearchIndex.product_codes(self.env.data_dir_path,
+                                                      self.env.index_dir_name,
+                                                      self.env.data_file_suffix)
+        for _code_ in project_codes:
+            with profiler.span('index_load'):
+                index = self.make_search_index(_code_).read()
+            with profiler.span('search'):
+                for _path_, _line_ in index.search(self.tokens):
+                    self.hits.append((_code_.upper(), _path_, _line_))
+        profiler.count('hits', len(self.hits))
+        self.status.append(OperationStatusSignals.Search.Ok)
+
+
+    def display(self):
+        for _hit_ in self.hits:
+            yield _hit_
+
+
+
+class DiffOperation(Operation):
+    '''Finds the paragraphs added, removed and moved in the documents of the
+    project compared with another project, such as the next version of the
+    same product. Documents are read from the library; documents with the
+    same digest in both projects are not read at all.'''
+    signature_cache_name = 'signatures'
+
+    def __init__(self, env, against):
+        super().__init__(env)
+        self.against = against.strip().upper()
+        self.files = []
+        self.moved_between = []
+        self.unchanged = 0
+
+
+    def _documents(self, project_code):
+        '''Returns {path: (digest, blob name)} for the documents of the project,
+        or None if the project is not in the library.'''
+        meta_doc = MetaDocument(product_code=project_code,
+                                data_dir_path=self.env.data_dir_path,
+                                meta_dir_name=self.env.meta_dir_name,
+                                data_file_suffix=self.env.data_file_suffix,
+                                record_id_sep=self.env.code_sep)
+        try:
+            meta_doc.read()
+        except FileNotFoundError:
+            print(Alert.project_not_found(project_code))
+            return None
+        return {DependencyGraph.make_path(_record_.target_dir, _record_.file_name):
+                (_record_.digest, meta_doc.make_signature(_record_.file_name,
+                                                          _record_.lib_suffix))
+                for _record_ in meta_doc.find(extension=self.env.default_doc_format)}
+
+
+    def _read_lines(self, blob_name):
+        data = b''.join(self.lib.chunks(blob_name))
+        return data.decode(self.env.default_encoding, errors='replace').splitlines()
+
+
+    def inspect(self):
+        with profiler.span('load'):
+            old = self._documents(self.env.project_code)
+            new = old is not None and self._documents(self.against)
+        if old is None or new is None:
+            self.lib.close()
+            self.status.append(OperationStatusSignals.Diff.Failed)
+            return
+        cache = SignatureCache(path_join(self.env.data_dir_path,
+                                         self.env.cache_dir_name,
+                                         '.'.join(['-'.join([self.signature_cache_name,
+                                                             self.env.fingerprint_hash]),
+                                                   self.env.data_file_suffix])))
+        with profiler.span('compare'):
+            for _path_ in sorted(set(old) | set(new)):
+                old_digest, old_blob = old.get(_path_, (None, None))
+                new_digest, new_blob = new.get(_path_, (None, None))
+                if old_digest and old_digest == new_digest:
+                    self.unchanged += 1
+                    continue
+                old_signatures = old_blob and cache.get(
+                    old_digest, lambda: self._read_lines(old_blob)) or []
+                new_signatures = new_blob and cache.get(
+                    new_digest, lambda: self._read_lines(new_blob)) or []
+                profiler.count('files')
+                file_diff = compare_paragraphs(old_signatures, new_signatures, _path_)
+                if file_diff:
+                    self.files.append(file_diff)
+            self._find_moved_between()
+        cache.save()
+        self.lib.close()
+        self.status.append(OperationStatusSignals.Diff.Ok)
+
+
+    def _find_moved_between(self):
+        '''Pairs paragraphs removed from one document with the same paragraphs
+        added to another.'''
+        removed = {}
+        for _file_ in self.files:
+            for _change_ in _file_.removed:
+                removed.setdefault(_change_[0], []).append((_file_, _change_))
+        for _file_ in self.files:
+            for _change_ in list(_file_.added):
+                sources = removed.get(_change_[0])
+                if sources:
+                    source_file, source_change = sources.pop(0)
+                    source_file.removed.remove(source_change)
+                    _file_.added.remove(_change_)
+                    self.moved_between.append((source_file.path, source_change[1],
+                                               _file_.path, _change_[1]))
+        self.files = [_ for _ in self.files if _]
+
+
+    def report(self):
+        '''The machine readable result of the last inspection.'''
+        return OrderedDict([('project_code', self.env.project_code),
+                            ('against', self.against),
+                            ('unchanged', self.unchanged),
+                            ('files', [_.as_dict() for _ in self.files]),
+                            ('moved_between', [OrderedDict([('from', _[0]),
+                                                            ('from_line', _[1]),
+                                                            ('to', _[2]),
+                                                            ('to_line', _[3])])
+                                               for _ in self.moved_between])])
 
 
     def display(self):
-        if self.contents:
-            for _ in self.contents:
-                if len(self.contents[_]) > 1:
-                    for _dupl_ in self.contents[_]:
-                        text = _dupl_.sentence.text
-                        if text.strip() and text[0].isalnum():
-                            yield _dupl_.file_path, text[:32] + ' ' * padding
+        for _file_ in self.files:
+            yield _file_
+
 
 
+class WatchOperation(Operation):
+    '''Keeps the library up to date while the files of a checked out project
+    are edited. Only the files reported by the watcher are read: their blobs,
+    meta records, dependencies and search index entries are updated, and
+    their sentences are grouped again with those of the other documents to
+    report duplicates at once.
+
+    When the watch starts, every file of the workspace is compared with its
+    meta record, so changes made while nothing was watching are found too.
+    Snapshots and shared variables are only updated by checkin.'''
+    def __init__(self, env, poll=False):
+        super().__init__(env)
+        self.poll = poll
+        self.source_dir = self.make_workspace_path()
+        self.walker = self.make_walker()
+        self.rules = self.walker.make_rules(self.source_dir)
+        self.sparse = SparseSet.load(self.make_sparse_path())
+        self.meta_doc = MetaDocument(product_code=self.env.project_code,
+                                     data_dir_path=self.env.data_dir_path,
+                                     meta_dir_name=self.env.meta_dir_name,
+                                     data_file_suffix=self.env.data_file_suffix,
+                                     record_id_sep=self.env.code_sep)
+        try:
+            self.meta_doc.read()
+        except FileNotFoundError:
+            pass
+        self.suffixes = {_dir_: self.meta_doc.find(target_dir=_dir_)[0].lib_suffix
+                         for _dir_ in self.meta_doc.target_dirs()}
+        self.graph = self.make_graph().read()
+        self.index = self.make_search_index().read()
+        self.engine = IncrementalGroupingEngine()
+        self.watcher = None
+        self.updated = []
+        self.removed = []
+        self.seconds = 0
+
+
+    def start(self):
+        '''Starts watching and brings the library up to date with the
+        workspace.'''
+        self.watcher = make_watcher(self.source_dir, self.walker, self.poll)
+        self.update(None)
+
+
+    def watch(self):
+        '''Yields after each batch of changes which has updated the library.'''
+        for _changed_ in batches(self.watcher, self.env.watch_debounce):
+            if self.update(_changed_):
+                yield self
+
+
+    def _expand(self, changed):
+        '''The relative paths of the files to check for the given changed
+        files and directories; None stands for all files.'''
+        if changed is None:
+            paths = set(path_join(_record_.target_dir, _record_.file_name)
+                        for _, _record_ in self.meta_doc.get_contents())
+            paths.update(relpath(_, self.source_dir)
+                         for _ in self.walker.walk(self.source_dir))
+            return paths
+
+        paths = set()
+        for _path_ in changed:
+            full_path = path_join(self.source_dir, _path_)
+            if isdir(full_path):
+                paths.update(relpath(_, self.source_dir)
+                             for _ in self.walker.walk(full_path))
+            else:
+                paths.add(_path_)
+            # A directory moved or removed as a whole is reported once.
+            prefix = _path_ + path_sep
+            for _dir_ in self.meta_doc.target_dirs():
+                if _dir_ == _path_ or _dir_.startswith(prefix):
+                    paths.update(path_join(_dir_, _record_.file_name)
+                                 for _record_ in self.meta_doc.find(target_dir=_dir_))
+        return paths
+
+
+    def update(self, changed):
+        '''Updates the library with the changed paths. Returns True if any
+        file has been updated or removed.'''
+        started = monotonic()
+        self.updated, self.removed = [], []
+        doc_suffix = '.' + self.env.default_doc_format
+        for _path_ in sorted(self._expand(changed)):
+            full_path = path_join(self.source_dir, _path_)
+            file_dir, _, file_name = _path_.rpartition(path_sep)
+            document = DependencyGraph.make_path(file_dir, file_name)
+            records = self.meta_doc.find(target_dir=file_dir, file_name=file_name)
+            record = records[0] if records else None
+            if isfile(full_path) and self.walker.accepts(self.rules, _path_):
+                if self._is_current(record, full_path):
+                    if file_name.endswith(doc_suffix) and full_path not in self.engine.documents:
+                        self.engine.add(Text(full_path))
+                    continue
+                suffix = self.suffixes.get(file_dir)
+                if suffix is None:
+                    suffix = self.suffixes[file_dir] = self.make_lib_suffix(file_dir)
+                size, digest = self._save(self.env.code_sep.join([file_name, suffix]),
+                                          full_path)
+                record = MetaRecord(file_name=file_name,
+                                    target_dir=file_dir,
+                                    lib_suffix=suffix,
+                                    size=size,
+                                    digest=digest)
+                self.meta_doc.unregister(file_name, suffix)
+                self.meta_doc.register(record)
+                if file_name.endswith(doc_suffix):
+                    with open(full_path, encoding=self.env.default_encoding,
+                              errors='replace') as doc_file:
+                        lines = doc_file.readlines()
+                    self.graph.scan(document, lines)
+                    self.index.update(document, digest, lines)
+                    self.engine.add(Text(full_path))
+                self.updated.append(_path_)
+            elif record and (not self.sparse or self.sparse.matches(file_dir, file_name)):
+                self.meta_doc.unregister(record.file_name, record.lib_suffix)
+                self.graph.remove(document)
+                self.index.remove(document)
+                self.engine.remove(full_path)
+                self.removed.append(_path_)
+
+        if self.updated or self.removed:
+            self.meta_doc.save()
+            self.graph.save()
+            self.index.save()
+            self.status.append(OperationStatusSignals.Watch.Ok)
+        self.seconds = monotonic() - started
+        return bool(self.updated or self.removed)
+
+
+    @staticmethod
+    def _is_current(record, file_path):
+        return (record is not None and record.digest is not None and
+                record.size == getsize(file_path) and
+                ObjectStore.digest(file_path) == record.digest)
+
+
+    def display(self):
+        '''The duplicates which include a sentence of the updated documents.'''
+        changed = [path_join(self.source_dir, _) for _ in self.updated]
+        return DetectOperation.display_groups(self.engine.groups_of(changed))
+
 
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.close()
+        self.lib.close()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+'''Measures where operations spend their time.
+
+Code is instrumented with named spans and counters:
+
+    with profiler.span('walk'):
+        ...
+        profiler.count('files')
+
+While the profiler is disabled (the default), spans and counters do nothing
+beyond a flag check.'''
+
+import json
+
+from time import perf_counter, time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from constants import ProfileMode
+
+
+class Span:
+    '''A named phase of an operation. Spans opened inside other spans are
+    recorded with the path of their parents, e.g. `add/copy'.'''
+
+    __slots__ = ('_profiler', 'name', 'path', 'start', 'duration', 'counters')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self.name = name
+        self.path = name
+        self.start = None
+        self.duration = None
+        self.counters = OrderedDict()
+
+
+    def __enter__(self):
+        stack = self._profiler._stack
+        if stack:
+            self.path = '/'.join([stack[-1].path, self.name])
+        stack.append(self)
+        self.start = perf_counter()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.duration = perf_counter() - self.start
+        self._profiler._stack.pop()
+        self._profiler._finish(self)
+        return False
+
+
+    def as_dict(self):
+        return OrderedDict([('name', self.name),
+                            ('path', self.path),
+                            ('start', self.start - self._profiler.started),
+                            ('duration', self.duration),
+                            ('counters', self.counters)])
+
+
+
+class NullSpan:
+    '''Used in place of Span while the profiler is disabled.'''
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): return False
+
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.recording = False
+        self.listeners = []
+        self.started = None
+        self.wall_started = None
+        self.spans = []
+        self.counters = OrderedDict()
+        self._stack = []
+        self._null_span = NullSpan()
+
+
+    def span(self, name):
+        if self.enabled:
+            return Span(self, name)
+        return self._null_span
+
+
+    @property
+    def active(self):
+        '''True while at least one span is open.'''
+        return bool(self._stack)
+
+
+    def count(self, name, value=1):
+        '''Increments the named counter globally and in the innermost open span.'''
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if self._stack:
+                counters = self._stack[-1].counters
+                counters[name] = counters.get(name, 0) + value
+
+
+    def _finish(self, span):
+        '''Keeps the closed span while a session is recording and passes it to
+        the listeners, such as the memory tracer.'''
+        if self.recording:
+            self.spans.append(span)
+        for _listener_ in self.listeners:
+            _listener_(span)
+
+
+    def reset(self):
+        self.spans = []
+        self.counters = OrderedDict()
+        self._stack = []
+        self.started = perf_counter()
+        self.wall_started = time()
+
+
+    @contextmanager
+    def session(self, operation, mode=None, output_path=None):
+        '''Profiles everything executed in the body of the with statement and
+        reports the results according to mode. Without mode, this is a no-op.'''
+        if not mode:
+            yield self
+            return
+
+        self.reset()
+        self.enabled = True
+        self.recording = True
+        stats = None
+        if mode == ProfileMode.cprofile:
+            from cProfile import Profile
+            stats = Profile()
+            stats.enable()
+        try:
+            with self.span(operation):
+                yield self
+        finally:
+            self.enabled = False
+            self.recording = False
+            if stats:
+                stats.disable()
+                self._report_cprofile(stats, output_path)
+            elif mode == ProfileMode.json:
+                self._report_json(operation, output_path)
+            else:
+                for _line_ in self.summary():
+                    print(_line_)
+
+
+    def breakdown(self):
+        '''Aggregates spans by path: number of calls, total seconds, counters.'''
+        totals = OrderedDict()
+        for _span_ in sorted(self.spans, key=lambda _: _.start):
+            calls, seconds, counters = totals.get(_span_.path, (0, 0.0, OrderedDict()))
+            for _name_ in _span_.counters:
+                counters[_name_] = counters.get(_name_, 0) + _span_.counters[_name_]
+            totals[_span_.path] = (calls + 1, seconds + _span_.duration, counters)
+        return totals
+
+
+    def summary(self):
+        yield '{:<40} {:>8} {:>12}  {}'.format('phase', 'calls', 'seconds', 'counters')
+        totals = self.breakdown()
+        for _path_ in totals:
+            calls, seconds, counters = totals[_path_]
+            yield '{:<40} {:>8} {:>12.6f}  {}'.format(
+                _path_, calls, seconds,
+                ' '.join('{}={}'.format(*_) for _ in counters.items()))
+
+
+    def trace(self, operation):
+        '''The machine readable form of the collected spans and counters.'''
+        return OrderedDict([('operation', operation),
+                            ('started', self.wall_started),
+                            ('counters', self.counters),
+                            ('phases', OrderedDict(
+                                (_path_, OrderedDict([('calls', _calls_),
+                                                      ('seconds', _seconds_),
+                                                      ('counters', _counters_)]))
+                                for _path_, (_calls_, _seconds_, _counters_)
+                                in self.breakdown().items())),
+                            ('spans', [_.as_dict() for _ in self.spans])])
+
+
+    def _report_json(self, operation, output_path):
+        if output_path:
+            with open(output_path, 'w') as output_file:
+                json.dump(self.trace(operation), output_file, indent=2)
+        else:
+            print(json.dumps(self.trace(operation), indent=2))
+
+
+    @staticmethod
+    def _report_cprofile(stats, output_path):
+        if output_path:
+            stats.dump_stats(output_path)
+        else:
+            from pstats import Stats
+            Stats(stats).sort_stats('cumulative').print_stats(30)
+
+
+
+profiler = Profiler()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+'''Reads the library from a dli server over HTTP.
+
+Files are fetched into a local cache directory with the layout of a data
+directory (meta/, graph/, lib/), so the rest of the program reads them as it
+reads a local library. Every fetch is a conditional request: the ETag of
+each cached file is kept, and a file which has not changed on the server is
+answered with 304 Not Modified and not transferred again. A library file
+whose cached copy has the digest recorded in the meta document is not
+requested at all.
+
+An interrupted download is kept and resumed with a range request; If-Range
+makes the server send the whole file instead if it has changed in the
+meantime. Connections are kept open and reused. Library files in the cache
+take at most a configured number of bytes; the least recently used files
+are removed first, and use is recorded in the modification time of the
+files.'''
+
+import re
+import json
+import http.client
+
+from os import replace, remove, utime, makedirs
+from os.path import join as path_join, isfile, getsize, dirname
+from urllib.parse import urlsplit, quote
+from threading import Lock
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from store import BlobStore
+
+
+class ConnectionPool:
+    '''Keeps up to size idle HTTP connections to one server for reuse.'''
+
+    def __init__(self, url, size=4, timeout=30):
+        parts = urlsplit(url)
+        self.connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                 else http.client.HTTPConnection)
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = Lock()
+
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.connection_class(self.netloc, timeout=self.timeout), False
+
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+
+    @contextmanager
+    def response(self, path, headers):
+        '''Sends a GET request for path and yields the response. A reused
+        connection which the server has closed in the meantime is replaced
+        once.'''
+        connection, reused = self._acquire()
+        try:
+            connection.request('GET', self.base_path + path, headers=headers)
+            response = connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            connection.close()
+            if not reused:
+                raise
+            connection = self.connection_class(self.netloc, timeout=self.timeout)
+            connection.request('GET', self.base_path + path, headers=headers)
+            response = connection.getresponse()
+        try:
+            yield response
+            response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+
+
+    def close(self):
+        with self._lock:
+            for _connection_ in self._idle:
+                _connection_.close()
+            self._idle = []
+
+
+
+class RemoteLibrary:
+    '''The library served at url, cached in a directory of cache_dir named
+    after the url.'''
+
+    state_file_name = 'remote.json'
+    partial_suffix = '.part'
+
+    def __init__(self, url, cache_dir, lib_dir_name, max_size, connections=4):
+        self.url = url
+        self.cache_dir = path_join(cache_dir,
+                                   re.sub(r'[^\w.-]+', '_', url.split('://')[-1]).strip('_'))
+        self.pool = ConnectionPool(url, size=connections)
+        self._state_path = path_join(self.cache_dir, RemoteLibrary.state_file_name)
+        self.files = {}
+        self.blobs = {}
+        self.partial = {}
+        if isfile(self._state_path):
+            with open(self._state_path) as state_file:
+                state = json.load(state_file)
+            self.files = state['files']
+            self.blobs = state['blobs']
+            self.partial = state['partial']
+        self.lib = RemoteBlobStore(self, lib_dir_name, max_size)
+        self.fetched = 0
+        self.not_modified = 0
+
+
+    def download(self, remote_path, target_path, etag=None):
+        '''Brings target_path up to date with the file at remote_path. Returns
+        the ETag of the file, or None if the server has no such file.'''
+        headers = {}
+        if etag and isfile(target_path):
+            headers['If-None-Match'] = etag
+        partial_path = target_path + RemoteLibrary.partial_suffix
+        partial_etag = self.partial.get(remote_path)
+        offset = getsize(partial_path) if partial_etag and isfile(partial_path) else 0
+        if offset:
+            headers['Range'] = 'bytes={}-'.format(offset)
+            headers['If-Range'] = partial_etag
+
+        with self.pool.response(quote(remote_path), headers) as response:
+            if response.status == http.client.NOT_MODIFIED:
+                if offset:
+                    remove(partial_path)
+                self.partial.pop(remote_path, None)
+                self.not_modified += 1
+                return etag
+            if response.status == http.client.NOT_FOUND:
+                return None
+            if response.status not in (http.client.OK, http.client.PARTIAL_CONTENT):
+                raise OSError("GET {}{}: {} {}".format(self.url, remote_path,
+                                                       response.status, response.reason))
+            new_etag = response.getheader('ETag')
+            self.partial[remote_path] = new_etag
+            makedirs(dirname(partial_path), exist_ok=True)
+            mode = 'ab' if response.status == http.client.PARTIAL_CONTENT else 'wb'
+            with open(partial_path, mode) as target:
+                for _chunk_ in iter(lambda: response.read(BlobStore.chunk_size), b''):
+                    target.write(_chunk_)
+        replace(partial_path, target_path)
+        del self.partial[remote_path]
+        self.fetched += 1
+        return new_etag
+
+
+    def fetch(self, relative_path):
+        '''Brings the cached copy of a data file, such as meta/ps-8.0.data, up
+        to date. Returns False if the server has no such file.'''
+        target_path = path_join(self.cache_dir, relative_path)
+        etag = self.download('/' + relative_path, target_path,
+                             self.files.get(relative_path))
+        if etag is None:
+            self.files.pop(relative_path, None)
+            if isfile(target_path):
+                remove(target_path)
+            return False
+        self.files[relative_path] = etag
+        return True
+
+
+    def save(self):
+        makedirs(self.cache_dir, exist_ok=True)
+        with open(self._state_path + '.tmp', 'w') as state_file:
+            json.dump({'files': self.files,
+                       'blobs': self.blobs,
+                       'partial': self.partial}, state_file)
+        replace(self._state_path + '.tmp', self._state_path)
+
+
+    def close(self):
+        self.save()
+        self.pool.close()
+
+
+
+class RemoteBlobStore(BlobStore):
+    '''The local cache of the library files of a remote library. Blobs are
+    kept as the server stores them, so compressed blobs are decoded as
+    usual.'''
+
+    def __init__(self, library, lib_dir_name, max_size):
+        super().__init__(path_join(library.cache_dir, lib_dir_name))
+        self.library = library
+        self.lib_dir_name = lib_dir_name
+        self.max_size = max_size
+        self._size = sum(_stat_.st_size for _, _stat_ in self.stats())
+        self._lock = Lock()
+
+
+    def _is_current(self, name, digest):
+        entry = self.library.blobs.get(name)
+        return (entry is not None and digest is not None and
+                entry[1] == digest and isfile(self.path(name)))
+
+
+    def _fetch(self, name):
+        path = self.path(name)
+        entry = self.library.blobs.get(name)
+        old_size = getsize(path) if isfile(path) else 0
+        etag = self.library.download('/{}/{}'.format(self.lib_dir_name, name), path,
+                                     entry and entry[0])
+        if etag is None:
+            raise FileNotFoundError('{}/{}/{}'.format(self.library.url, self.lib_dir_name, name))
+        if entry is None or entry[0] != etag:
+            self.library.blobs[name] = [etag, None]
+        with self._lock:
+            self._size += getsize(path) - old_size
+        self._evict(keep=name)
+
+
+    def prefetch(self, blobs):
+        '''Fetches the blobs whose cached copies do not have the given digests,
+        over several connections at the same time.'''
+        missing = [_name_ for _name_, _digest_ in blobs if not self._is_current(_name_, _digest_)]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.library.pool.size) as pool:
+                list(pool.map(self._fetch, missing))
+            self.library.save()
+
+
+    def get(self, name, target_path):
+        if not isfile(self.path(name)):
+            self._fetch(name)
+        size, digest = super().get(name, target_path)
+        self.library.blobs[name] = [self.library.blobs.get(name, [None])[0], digest]
+        utime(self.path(name)) # most recently used
+        return size, digest
+
+
+    def _evict(self, keep):
+        '''Removes the least recently used blobs until the cache fits in
+        max_size bytes.'''
+        with self._lock:
+            if self._size <= self.max_size:
+                return
+            for _name_, _stat_ in sorted(self.stats(), key=lambda _: _[1].st_mtime_ns):
+                if self._size <= self.max_size:
+                    break
+                if _name_ == keep or _name_.endswith(RemoteLibrary.partial_suffix):
+                    continue
+                self.remove(_name_)
+                self.library.blobs.pop(_name_, None)
+                self._size -= _stat_.st_size
+
+
+    def close(self):
+        super().close()
+        self.library.close()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+'''Renders the product and version variants of shared documents.
+
+A block introduced by the dL:product or dL:version directive is kept only in
+the variants for the listed products or versions:
+
+    .. dL:version: 5.7 8.0
+
+       This paragraph only appears in the 5.7 and 8.0 variants.
+
+The block is the indented text which follows the directive; blocks may be
+nested. The directive lines are removed and the contents of the kept blocks
+are dedented. A target project is identified by its code: the product is the
+part before the code separator and the version is the rest (`PS-8.0' is
+version 8.0 of product PS).
+
+Each source is read once and all of its variants are produced in the same
+pass. Rendered variants are cached by the digest of the source and the
+product and version of the target.'''
+
+import re
+
+from os import makedirs, replace
+from os.path import join as path_join, isfile, dirname, relpath
+from hashlib import sha1
+
+from constants import DirectiveNameSpace
+from profiler import profiler
+
+
+class Target:
+    '''A project which receives rendered variants.'''
+    __slots__ = ('project_code', 'product', 'version', 'source_dir')
+
+    def __init__(self, project_code, code_sep, source_dir):
+        self.project_code = project_code
+        product, _, version = project_code.lower().partition(code_sep)
+        self.product = product
+        self.version = version
+        self.source_dir = source_dir
+
+
+    def accepts(self, attribute, values):
+        if attribute == DirectiveNameSpace.Default.product:
+            return self.product in values
+        return self.version in values
+
+
+
+class _Block:
+    __slots__ = ('indent', 'attribute', 'values', 'content_indent')
+
+    def __init__(self, indent, attribute, values):
+        self.indent = indent
+        self.attribute = attribute
+        self.values = values
+        self.content_indent = None
+
+
+
+class VariantRenderer:
+    '''Writes the variants of a source document to the workspaces of the
+    target projects.'''
+
+    def __init__(self, project_code, code_sep, source_dir, targets, cache_dir, encoding):
+        self.project_code = project_code
+        self.source_dir = source_dir
+        self.product = project_code.lower().partition(code_sep)[0]
+        self.targets = targets
+        self.cache_dir = cache_dir
+        self.encoding = encoding
+        self.directive_pattern = re.compile(
+            r'^([ \t]*)\.\.\s+{}:({}|{}):?(.*)$'.format(
+                re.escape(DirectiveNameSpace.Default._),
+                DirectiveNameSpace.Default.product,
+                DirectiveNameSpace.Default.version),
+            re.IGNORECASE)
+        self._rendered = set()
+
+
+    @staticmethod
+    def _values(text):
+        return frozenset(text.lower().replace(',', ' ').split())
+
+
+    def _cache_path(self, source_digest, target):
+        key = sha1('\0'.join([source_digest, target.product, target.version]).encode())
+        return path_join(self.cache_dir, key.hexdigest())
+
+
+    def render(self, source_path):
+        '''Writes the variants of the source to the target projects which it
+        applies to: the projects of the same product and of the products named
+        in its dL:product directives. Returns the number of variants written.'''
+        if source_path in self._rendered:
+            return 0
+        self._rendered.add(source_path)
+        relative_path = relpath(source_path, self.source_dir)
+
+        with open(source_path, 'rb') as source:
+            data = source.read()
+        source_digest = sha1(data).hexdigest()
+        text = data.decode(self.encoding, errors='replace')
+        lines = text.splitlines(keepends=True)
+
+        products = {self.product}
+        for _line_ in lines:
+            found = self.directive_pattern.match(_line_)
+            if found and found.group(2).lower() == DirectiveNameSpace.Default.product:
+                products |= self._values(found.group(3))
+        targets = [_ for _ in self.targets if _.product in products]
+
+        pending = []
+        for _target_ in targets:
+            cache_path = self._cache_path(source_digest, _target_)
+            if isfile(cache_path):
+                with open(cache_path, 'rb') as cached:
+                    self._write(path_join(_target_.source_dir, relative_path), cached.read())
+                profiler.count('cached')
+            else:
+                pending.append((_target_, cache_path))
+
+        if pending:
+            variants = self._render_lines(lines, [_[0] for _ in pending])
+            makedirs(self.cache_dir, exist_ok=True)
+            for (_target_, _cache_path_), _variant_ in zip(pending, variants):
+                rendered = ''.join(_variant_).encode(self.encoding)
+                self._write(_cache_path_, rendered)
+                self._write(path_join(_target_.source_dir, relative_path), rendered)
+                profiler.count('rendered')
+        return len(targets)
+
+
+    def _render_lines(self, lines, targets):
+        '''Returns one list of lines per target, produced in a single pass
+        over the source lines.'''
+        variants = [[] for _ in targets]
+        stack = []
+        everyone = range(len(targets))
+        accepted = everyone
+
+        def accepting():
+            return [_i_ for _i_ in everyone
+                    if all(targets[_i_].accepts(_.attribute, _.values) for _ in stack)]
+
+        for _line_ in lines:
+            stripped = _line_.lstrip(' \t')
+            blank = not stripped.strip()
+            indent = len(_line_) - len(stripped)
+            if not blank:
+                if stack and (indent <= stack[-1].indent or stack[-1].content_indent is None):
+                    while stack and indent <= stack[-1].indent:
+                        stack.pop()
+                    if stack and stack[-1].content_indent is None:
+                        stack[-1].content_indent = indent
+                    accepted = accepting()
+
+            found = self.directive_pattern.match(_line_)
+            if found:
+                stack.append(_Block(indent,
+                                    found.group(2).lower(),
+                                    self._values(found.group(3))))
+                accepted = accepting()
+                continue
+
+            if blank and stack and stack[-1].content_indent is None:
+                continue # the separator between a directive and its block
+            if stack and not blank:
+                dedent = stack[-1].content_indent - stack[0].indent
+                _line_ = _line_[min(dedent, indent):]
+            for _index_ in accepted:
+                variants[_index_].append(_line_)
+        return variants
+
+
+    @staticmethod
+    def _write(path, data):
+        makedirs(dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as output_file:
+            output_file.write(data)
+        replace(path + '.tmp', path)
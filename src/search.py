@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+'''Finds words and phrases in the documents of all projects in the library.
+
+Each project has an inverted index: for every token, the files where it
+occurs and the positions of the token within each file. Positions are counted
+in tokens from the start of the file, so a phrase is found by checking that
+its tokens occur at consecutive positions. Each file keeps the position of
+the first token of every line to turn positions into line numbers, and the
+digest of its contents so that only changed files are indexed again.'''
+
+import json
+
+from os import makedirs, replace, scandir
+from os.path import join as path_join, isfile, isdir
+from bisect import bisect_right
+
+from text import Text
+
+
+class SearchIndex:
+    '''The positional inverted index of one project.'''
+
+    digest_key = 'digest'
+    lines_key = 'lines'
+    tokens_key = 'tokens'
+
+    def __init__(self, product_code, data_dir_path, index_dir_name, data_file_suffix):
+        self.product_code = product_code.lower().strip()
+        self._index_dir_path = path_join(data_dir_path, index_dir_name)
+        self._data_file_suffix = data_file_suffix
+        self.files = {}
+        self.postings = {}
+
+
+    @property
+    def path(self):
+        return path_join(self._index_dir_path,
+                         '.'.join([self.product_code, self._data_file_suffix]))
+
+
+    @staticmethod
+    def product_codes(data_dir_path, index_dir_name, data_file_suffix):
+        '''Yields the product codes of all indexed projects.'''
+        index_dir_path = path_join(data_dir_path, index_dir_name)
+        if not isdir(index_dir_path):
+            return
+        suffix = '.' + data_file_suffix
+        with scandir(index_dir_path) as entries:
+            for _entry_ in entries:
+                if _entry_.name.endswith(suffix):
+                    yield _entry_.name[:-len(suffix)]
+
+
+    def is_current(self, path, digest):
+        entry = self.files.get(path)
+        return bool(entry and digest and entry[self.digest_key] == digest)
+
+
+    def update(self, path, digest, lines):
+        '''Indexes the lines of the file at path, replacing its old postings.'''
+        self.remove(path)
+        positions = {}
+        line_starts = []
+        position = 0
+        for _line_ in lines:
+            line_starts.append(position)
+            for _token_ in Text.tokenize(_line_):
+                positions.setdefault(_token_, []).append(position)
+                position += 1
+        for _token_ in positions:
+            self.postings.setdefault(_token_, {})[path] = positions[_token_]
+        self.files[path] = {self.digest_key: digest,
+                            self.lines_key: line_starts,
+                            self.tokens_key: list(positions)}
+
+
+    def remove(self, path):
+        entry = self.files.pop(path, None)
+        if entry:
+            for _token_ in entry[self.tokens_key]:
+                files = self.postings[_token_]
+                del files[path]
+                if not files:
+                    del self.postings[_token_]
+
+
+    def prune(self, paths):
+        '''Removes the files which are not in paths.'''
+        for _path_ in [_ for _ in self.files if _ not in paths]:
+            self.remove(_path_)
+
+
+    def search(self, tokens):
+        '''Yields (file path, line number) for each occurrence of the tokens at
+        consecutive positions. Line numbers start at 1.'''
+        if not tokens:
+            return
+        postings = [self.postings.get(_token_) for _token_ in tokens]
+        if not all(postings):
+            return
+        # Join on the rarest token first
+        files = set(min(postings, key=len))
+        for _files_ in postings:
+            files.intersection_update(_files_)
+        for _path_ in sorted(files):
+            rest = [set(_files_[_path_]) for _files_ in postings[1:]]
+            line_starts = self.files[_path_][self.lines_key]
+            for _start_ in postings[0][_path_]:
+                if all(_start_ + _offset_ + 1 in _positions_
+                       for _offset_, _positions_ in enumerate(rest)):
+                    yield _path_, bisect_right(line_starts, _start_)
+
+
+    def read(self):
+        if isfile(self.path):
+            with open(self.path) as input_file:
+                data = json.load(input_file)
+            self.files = data['files']
+            self.postings = data['postings']
+        return self
+
+
+    def save(self):
+        makedirs(self._index_dir_path, exist_ok=True)
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as output_file:
+            json.dump({'files': self.files, 'postings': self.postings},
+                      output_file, separators=(',', ':'))
+        replace(temporary_path, self.path)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+'''Serves a library to remote clients over HTTP (see remote.py).
+
+The server is read only and small enough to run on a workstation or in a
+test: library files are served from the store as they are stored
+(compressed or not, loose or packed) at /<lib dir>/<name>, and the meta
+documents and dependency graphs of projects at /<meta dir>/<file> and
+/<graph dir>/<file>.
+
+Responses carry an ETag, which changes whenever the file changes, and
+Content-Length, so that connections are kept open. Conditional requests
+(If-None-Match) are answered with 304 Not Modified, and a single range of
+bytes (Range, with If-Range) with 206 Partial Content.'''
+
+import re
+
+from hashlib import sha1
+from os import stat
+from os.path import join as path_join
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+
+class LibraryRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    range_pattern = re.compile(r'^bytes=(\d+)-(\d*)$')
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+
+    def _respond(self, send_body):
+        dir_name, _, name = unquote(self.path.partition('?')[0]).lstrip('/').partition('/')
+        if not name or '/' in name or name.startswith('.'):
+            return self._send_status(HTTPStatus.NOT_FOUND)
+        if dir_name == self.server.lib_dir_name:
+            found = self._blob(name)
+        elif dir_name in self.server.data_dir_names:
+            found = self._data_file(dir_name, name)
+        else:
+            found = None
+        if found is None:
+            return self._send_status(HTTPStatus.NOT_FOUND)
+        size, etag, read = found
+
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+
+        start, end = 0, size
+        requested = self.range_pattern.match(self.headers.get('Range', ''))
+        if requested and self.headers.get('If-Range', etag) == etag:
+            start = int(requested.group(1))
+            end = min(size, int(requested.group(2)) + 1) if requested.group(2) else size
+            if start >= end:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', 'bytes */{}'.format(size))
+                self.send_header('Content-Length', '0')
+                return self.end_headers()
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end - 1, size))
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+        if send_body:
+            for _chunk_ in read(start, end):
+                self.wfile.write(_chunk_)
+
+
+    def _send_status(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+    def _blob(self, name):
+        store = self.server.lib
+        fingerprint = store.fingerprint(name)
+        if fingerprint is None:
+            return None
+
+        def read(start, end):
+            position = 0
+            for _chunk_ in store.raw_chunks(name):
+                chunk_end = position + len(_chunk_)
+                if chunk_end > start and position < end:
+                    yield _chunk_[max(0, start - position):end - position]
+                position = chunk_end
+
+        etag = '"{}"'.format(sha1(repr(fingerprint).encode()).hexdigest()[:20])
+        return store.raw_size(name), etag, read
+
+
+    def _data_file(self, dir_name, name):
+        path = path_join(self.server.data_dir_path, dir_name, name)
+        try:
+            status = stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        def read(start, end):
+            with open(path, 'rb') as data_file:
+                data_file.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    chunk = data_file.read(min(remaining, self.server.lib.chunk_size))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+        etag = '"{:x}-{:x}"'.format(status.st_mtime_ns, status.st_size)
+        return status.st_size, etag, read
+
+
+
+class LibraryServer(ThreadingHTTPServer):
+    '''Serves the library in data_dir_path: lib is the store of library
+    files and data_dir_names are the directories of data files which
+    clients may read.'''
+    daemon_threads = True
+
+    def __init__(self, address, data_dir_path, lib, lib_dir_name, data_dir_names):
+        self.data_dir_path = data_dir_path
+        self.lib = lib
+        self.lib_dir_name = lib_dir_name
+        self.data_dir_names = frozenset(data_dir_names)
+        super().__init__(address, LibraryRequestHandler)
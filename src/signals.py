@@ -35,6 +35,46 @@ class OperationStatusSignals:
         class Failed: pass
 
 
+    class GarbageCollect:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Repack:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Migrate:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Verify:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Search:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Diff:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Watch:
+        class Ok: pass
+        class Failed: pass
+
+
+    class Batch:
+        class Ok: pass
+        class Failed: pass
+
+
 class GitSignals:
     class RepositoryCreate:
         class Ok: pass
@@ -47,6 +87,15 @@ class GitSignals:
         class Failed: pass
 
 
+class HistorySignals:
+    class SnapshotCreate:
+        class Ok: pass
+        class Failed: pass
+    class SnapshotLoad:
+        class Ok: pass
+        class Failed: pass
+
+
 class VerificationSignals:
     class TicketCodeValid:
         class Ok: pass
@@ -73,3 +122,13 @@ class TargetMark:
 class ContextMark:
     class Paragraph: pass
     class Sentence: pass
+
+
+
+def has_failed(status):
+    '''Tells whether the status of an operation, a signal or a list of
+    signals, includes a Failed signal.'''
+    if status is None:
+        return False
+    signals = status if isinstance(status, list) else [status]
+    return any(_signal_.__name__ == 'Failed' for _signal_ in signals)
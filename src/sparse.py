@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+'''Selects a subset of the files of a project for a sparse checkout.'''
+
+import re
+import yaml
+
+from fnmatch import translate
+from os import remove
+from os.path import isfile
+
+
+class SparseSet:
+    '''Directory and file name patterns which select meta records.
+
+    Path patterns are matched against the directory of a file relative to the
+    source directory of the project. `*' and `?' do not match a slash; `**'
+    matches any number of directories, so `installation/**' selects the
+    installation directory and everything below it. Include patterns are
+    matched against file names. A record is selected if it matches any path
+    pattern (or there are none) and any include pattern (or there are none).
+
+    Records are grouped by directory, so each directory is matched once no
+    matter how many files it has.'''
+
+    file_name = '.sparse'
+    paths_key = 'paths'
+    include_key = 'include'
+
+    def __init__(self, paths=(), include=()):
+        self.paths = list(paths or ())
+        self.include = list(include or ())
+        self._path = self.paths and re.compile(
+            '|'.join(self._translate(_) for _ in self.paths)).match
+        self._name = self.include and re.compile(
+            '|'.join(translate(_) for _ in self.include)).match
+        self._dirs = {}
+
+
+    @staticmethod
+    def _translate(pattern):
+        pattern = pattern.strip('/')
+        suffix = r'\Z'
+        if pattern == '**':
+            return r'.*\Z'
+        if pattern.endswith('/**'):
+            pattern, suffix = pattern[:-3], r'(?:/.*)?\Z'
+        tokens = {'**': '.*', '*': '[^/]*', '?': '[^/]'}
+        return '(?:{}{})'.format(
+            ''.join(tokens.get(_, re.escape(_)) for _ in re.split(r'(\*\*|\*|\?)', pattern)),
+            suffix)
+
+
+    def __bool__(self):
+        return bool(self.paths or self.include)
+
+
+    def matches_dir(self, target_dir):
+        selected = self._dirs.get(target_dir)
+        if selected is None:
+            selected = self._dirs[target_dir] = bool(not self._path or self._path(target_dir))
+        return selected
+
+
+    def matches(self, target_dir, file_name):
+        return (self.matches_dir(target_dir) and
+                bool(not self._name or self._name(file_name)))
+
+
+    def select(self, contents):
+        '''Yields the items of contents whose first element, a meta record,
+        is selected.'''
+        by_dir = {}
+        for _item_ in contents:
+            by_dir.setdefault(_item_[0].target_dir, []).append(_item_)
+        for _dir_ in by_dir:
+            if self.matches_dir(_dir_):
+                for _item_ in by_dir[_dir_]:
+                    if not self._name or self._name(_item_[0].file_name):
+                        yield _item_
+
+
+    def save(self, path):
+        '''Keeps the patterns next to the workspace copy of the project so that
+        checkin knows which files were checked out. An empty set removes the
+        file.'''
+        if not self:
+            if isfile(path):
+                remove(path)
+            return
+        with open(path, 'w') as output_file:
+            yaml.dump({self.paths_key: self.paths, self.include_key: self.include},
+                      stream=output_file, default_flow_style=False)
+
+
+    @staticmethod
+    def load(path):
+        if not isfile(path):
+            return SparseSet()
+        with open(path) as input_file:
+            data = yaml.safe_load(input_file) or {}
+        return SparseSet(data.get(SparseSet.paths_key), data.get(SparseSet.include_key))
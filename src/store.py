@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+'''Stores the binary contents (blobs) of library files
+
+Blobs may be compressed. A compressed blob starts with a header that names
+its codec, so blobs written with different settings can be read back
+transparently; blobs without the header are read as they are.
+
+Blobs are written as separate (loose) files. Repacking moves them into pack
+files: append-only archives of many blobs with a sorted index of names,
+offsets and lengths. A loose blob takes precedence over a packed blob with
+the same name, so updating a packed blob only requires writing it again.
+
+Loose blobs are either kept directly in the store directory (the flat
+layout) or spread over two levels of sub directories named after the hash
+prefix of the blob name (the fan-out layout: ab/cd/name). Reads look in both
+layouts, so a store can be migrated while it is in use.'''
+
+import zlib
+import lzma
+
+from os import (makedirs, scandir, remove, rename, stat, getpid,
+                open as os_open, close, pread, O_RDONLY)
+from os.path import join as path_join, isfile, exists, sep as path_sep
+from bisect import bisect_left
+from hashlib import sha1
+from shutil import copyfile as copy_file
+from time import time
+from collections import OrderedDict
+
+from delta import encode, decode
+
+
+class Codec:
+    '''A streaming compression method. The factories must return objects with
+    the interface of zlib (de)compression objects: compress/flush and
+    decompress (flush is optional for decompressors).'''
+    def __init__(self, name, make_compressor, make_decompressor):
+        self.name = name
+        self.make_compressor = make_compressor
+        self.make_decompressor = make_decompressor
+
+
+
+codecs = {}
+
+def register_codec(codec):
+    '''Makes the codec available to stores by its name.'''
+    codecs[codec.name] = codec
+
+register_codec(Codec('zlib', zlib.compressobj, zlib.decompressobj))
+register_codec(Codec('lzma', lzma.LZMACompressor, lzma.LZMADecompressor))
+
+# Raised while a blob is decoded when it is damaged: by a codec, when the
+# header names an unknown or garbled codec, or by a truncated delta.
+decode_errors = (zlib.error, lzma.LZMAError, KeyError, ValueError, IndexError)
+
+
+
+class Pack:
+    '''An archive of blobs and its index.
+
+    The index is a text file with one `name<TAB>offset<TAB>length' line per
+    blob, sorted by name, so that a blob is found by binary search. The pack is
+    opened once and blobs are read with pread.'''
+
+    pack_suffix = '.pack'
+    index_suffix = '.idx'
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.names = []
+        self.offsets = []
+        self.lengths = []
+        self._fd = None
+        with open(base_path + Pack.index_suffix) as index:
+            for _line_ in index:
+                name, offset, length = _line_.rstrip('\n').split('\t')
+                self.names.append(name)
+                self.offsets.append(int(offset))
+                self.lengths.append(int(length))
+
+
+    def find(self, name):
+        '''Returns the position of the blob in the index or None.'''
+        position = bisect_left(self.names, name)
+        if position < len(self.names) and self.names[position] == name:
+            return position
+        return None
+
+
+    def read(self, position, chunk_size):
+        if self._fd is None:
+            self._fd = os_open(self.base_path + Pack.pack_suffix, O_RDONLY)
+        offset = self.offsets[position]
+        end = offset + self.lengths[position]
+        while offset < end:
+            chunk = pread(self._fd, min(chunk_size, end - offset), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+
+
+    def close(self):
+        if self._fd is not None:
+            close(self._fd)
+            self._fd = None
+
+
+    # Operations which only read a few blobs do not close the store; the
+    # descriptor must not outlive the pack in a long running process.
+    __del__ = close
+
+
+    @staticmethod
+    def write(base_path, blobs, chunk_size):
+        '''Writes a new pack from (name, raw chunks) pairs. The index is moved
+        into place last, so readers never see a pack without a complete
+        index.'''
+        index = []
+        offset = 0
+        temporary_suffix = '.tmp'
+        with open(base_path + Pack.pack_suffix + temporary_suffix, 'wb') as pack:
+            for _name_, _chunks_ in blobs:
+                length = 0
+                for _chunk_ in _chunks_:
+                    pack.write(_chunk_)
+                    length += len(_chunk_)
+                index.append((_name_, offset, length))
+                offset += length
+        with open(base_path + Pack.index_suffix + temporary_suffix, 'w') as index_file:
+            for _entry_ in sorted(index):
+                index_file.write('{}\t{}\t{}\n'.format(*_entry_))
+        rename(base_path + Pack.pack_suffix + temporary_suffix, base_path + Pack.pack_suffix)
+        rename(base_path + Pack.index_suffix + temporary_suffix, base_path + Pack.index_suffix)
+        return len(index)
+
+
+    def remove(self):
+        self.close()
+        remove(self.base_path + Pack.index_suffix)
+        remove(self.base_path + Pack.pack_suffix)
+
+
+
+class BlobStore:
+    '''A directory of the library where each blob has a unique name.
+
+    With a codec, blobs are compressed as they are written unless the
+    extension of the source file is in skip_extensions (formats that are
+    already compressed, such as png).'''
+
+    chunk_size = 1 << 16
+    header_mark = b'\x00dL\x00'
+    no_codec = 'none'
+    pack_dir_name = 'packs'
+    flat_layout = 'flat'
+    fanout_layout = 'fanout'
+
+    def __init__(self, root_path, codec=None, skip_extensions=(), layout=None):
+        self.root_path = root_path
+        self.codec = codec and codec != BlobStore.no_codec and codecs[codec] or None
+        self.skip_extensions = frozenset(_.lower() for _ in skip_extensions or ())
+        self.layout = layout or BlobStore.flat_layout
+        self._pack_path = path_join(self.root_path, self.pack_dir_name)
+        self._packs = None
+        self._shards = set()
+        self._buffer = None
+        makedirs(self.root_path, exist_ok=True)
+
+
+    def _layout_path(self, name, layout):
+        if layout == BlobStore.fanout_layout:
+            prefix = sha1(name.encode()).hexdigest()
+            return path_join(self.root_path, prefix[:2], prefix[2:4], name)
+        return path_join(self.root_path, name)
+
+
+    def path(self, name):
+        '''The path of the loose blob with the given name in the current layout.'''
+        return self._layout_path(name, self.layout)
+
+
+    def _other_path(self, name):
+        other = (BlobStore.flat_layout if self.layout == BlobStore.fanout_layout
+                 else BlobStore.fanout_layout)
+        return self._layout_path(name, other)
+
+
+    def _loose_paths(self, name):
+        '''Candidate paths of a loose blob. The current layout is checked again
+        last in case the blob is moved by a migration in the meantime.'''
+        path = self.path(name)
+        return path, self._other_path(name), path
+
+
+    def _find_loose(self, name):
+        for _path_ in self._loose_paths(name):
+            if isfile(_path_):
+                return _path_
+        return None
+
+
+    def _write_path(self, name):
+        path = self.path(name)
+        if self.layout == BlobStore.fanout_layout:
+            shard = path.rpartition(path_sep)[0]
+            if shard not in self._shards:
+                makedirs(shard, exist_ok=True)
+                self._shards.add(shard)
+        return path
+
+
+    @property
+    def packs(self):
+        '''Packs in the store, newest first. Loaded on first use.'''
+        if self._packs is None:
+            self._packs = []
+            if exists(self._pack_path):
+                with scandir(self._pack_path) as entries:
+                    base_names = sorted((_entry_.name[:-len(Pack.index_suffix)]
+                                         for _entry_ in entries
+                                         if _entry_.name.endswith(Pack.index_suffix)),
+                                        reverse=True)
+                self._packs = [Pack(path_join(self._pack_path, _name_))
+                               for _name_ in base_names]
+        return self._packs
+
+
+    def _find_packed(self, name):
+        for _pack_ in self.packs:
+            position = _pack_.find(name)
+            if position is not None:
+                return _pack_, position
+        return None, None
+
+
+    def exists(self, name):
+        return self._find_loose(name) is not None or self._find_packed(name)[0] is not None
+
+
+    def put(self, source_path, name):
+        '''Copies the file at source_path into the store under the given name.
+        Returns the size and the SHA1 digest of the file, computed while it is
+        copied.'''
+        compressor = None
+        if self.codec and source_path.rpartition('.')[-1].lower() not in self.skip_extensions:
+            compressor = self.codec.make_compressor()
+        with open(source_path, 'rb') as source, open(self._write_path(name), 'wb') as target:
+            if compressor:
+                target.write(self.header_mark + self.codec.name.encode() + b'\n')
+            size, digest = self._copy(source, target, compressor)
+        self._remove_other(name)
+        return size, digest
+
+
+    def _copy(self, source, target, compressor=None):
+        '''Copies source to target through one buffer, which is reused by all
+        copies of this store, and hashes the data on the way.'''
+        if self._buffer is None:
+            self._buffer = bytearray(self.chunk_size)
+        view = memoryview(self._buffer)
+        hasher = sha1()
+        size = 0
+        length = source.readinto(view)
+        while length:
+            chunk = view[:length]
+            hasher.update(chunk)
+            target.write(compressor.compress(chunk) if compressor else chunk)
+            size += length
+            length = source.readinto(view)
+        if compressor:
+            target.write(compressor.flush())
+        return size, hasher.hexdigest()
+
+
+    def put_raw(self, source_path, name):
+        '''Copies the file at source_path as it is: a blob copied from another
+        store keeps its encoding.'''
+        copy_file(source_path, self._write_path(name))
+        self._remove_other(name)
+        return name
+
+
+    def put_chunks(self, chunks, name):
+        '''Writes the supplied raw chunks as the blob with the given name.'''
+        with open(self._write_path(name), 'wb') as target:
+            for _chunk_ in chunks:
+                target.write(_chunk_)
+        self._remove_other(name)
+        return name
+
+
+    def _remove_other(self, name):
+        '''Removes the copy of a blob just written which is left in the other
+        layout, so that a migration cannot bring the old contents back. A
+        flat blob named like a shard directory (or a shard named like a flat
+        blob) is not a copy, so only files are removed.'''
+        other_path = self._other_path(name)
+        if isfile(other_path):
+            remove(other_path)
+
+
+    def raw_chunks(self, name):
+        '''Yields the blob as it is stored, from a loose file or a pack.'''
+        for _path_ in self._loose_paths(name):
+            try:
+                blob = open(_path_, 'rb')
+            except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                continue
+            with blob:
+                yield from iter(lambda: blob.read(self.chunk_size), b'')
+            return
+        pack, position = self._find_packed(name)
+        if pack is None:
+            raise FileNotFoundError(self.path(name))
+        yield from pack.read(position, self.chunk_size)
+
+
+    def _split_header(self, chunk):
+        '''Returns the codec named in the header of the first chunk of a blob
+        (None if there is no header) and the rest of the chunk.'''
+        if chunk.startswith(self.header_mark):
+            codec_name, _, rest = chunk[len(self.header_mark):].partition(b'\n')
+            return codecs[codec_name.decode()], rest
+        return None, chunk
+
+
+    def chunks(self, name):
+        '''Yields the decoded contents of the blob in chunks.'''
+        raw = self.raw_chunks(name)
+        codec, first = self._split_header(next(raw, b''))
+        if codec is None:
+            yield first
+            yield from raw
+            return
+        decompressor = codec.make_decompressor()
+        yield decompressor.decompress(first)
+        for _chunk_ in raw:
+            yield decompressor.decompress(_chunk_)
+        flush = getattr(decompressor, 'flush', None)
+        if flush:
+            yield flush()
+
+
+    def fingerprint(self, name):
+        '''Returns a tuple which changes whenever the stored blob changes: the
+        stat of a loose blob or the pack and position of a packed blob. Returns
+        None if there is no such blob.'''
+        path = self._find_loose(name)
+        if path:
+            status = stat(path)
+            return (path, status.st_size, status.st_mtime_ns, status.st_ino)
+        pack, position = self._find_packed(name)
+        if pack is not None:
+            return (pack.base_path, pack.offsets[position], pack.lengths[position])
+        return None
+
+
+    def raw_size(self, name):
+        '''The size of the blob as it is stored, or None if there is no such
+        blob.'''
+        path = self._find_loose(name)
+        if path:
+            return stat(path).st_size
+        pack, position = self._find_packed(name)
+        if pack is not None:
+            return pack.lengths[position]
+        return None
+
+
+    def prefetch(self, blobs):
+        '''Loads the blobs given as (name, digest) pairs ahead of get. Blobs
+        are read where they are; stores which fetch blobs from elsewhere
+        override this to fetch them together.'''
+        pass
+
+
+    def _find_plain_loose(self, name):
+        '''Returns the path of the loose blob if it is not compressed.'''
+        for _path_ in self._loose_paths(name):
+            try:
+                with open(_path_, 'rb') as blob:
+                    if blob.read(len(self.header_mark)) != self.header_mark:
+                        return _path_
+                    return None
+            except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                continue
+        return None
+
+
+    def get(self, name, target_path):
+        '''Copies the decoded blob with the given name to target_path. Returns
+        the size and the SHA1 digest of the data written, so that the caller
+        can check them against the recorded values without reading the file
+        again.'''
+        plain_path = self._find_plain_loose(name)
+        with open(target_path, 'wb') as target:
+            if plain_path:
+                with open(plain_path, 'rb') as source:
+                    return self._copy(source, target)
+            hasher = sha1()
+            size = 0
+            for _chunk_ in self.chunks(name):
+                hasher.update(_chunk_)
+                target.write(_chunk_)
+                size += len(_chunk_)
+        return size, hasher.hexdigest()
+
+
+    def names(self):
+        '''Yields the names of loose and packed blobs, each name once.'''
+        seen = set()
+        for _name_, _ in self.stats():
+            seen.add(_name_)
+            yield _name_
+        for _pack_ in self.packs:
+            for _name_ in _pack_.names:
+                if _name_ not in seen:
+                    seen.add(_name_)
+                    yield _name_
+
+
+    def stats(self):
+        '''Yields the name and the os.stat_result of each loose blob.'''
+        for _name_, _, _stat_ in self._loose_entries():
+            yield _name_, _stat_
+
+
+    @staticmethod
+    def _is_shard(entry):
+        return (len(entry.name) == 2 and entry.is_dir() and
+                all(_ in '0123456789abcdef' for _ in entry.name))
+
+
+    def _loose_entries(self, path=None, depth=0):
+        '''Yields the name, the path and the os.stat_result of each loose blob
+        in both layouts.'''
+        with scandir(path or self.root_path) as entries:
+            for _entry_ in entries:
+                if depth < 2 and BlobStore._is_shard(_entry_):
+                    yield from self._loose_entries(_entry_.path, depth + 1)
+                elif depth in (0, 2) and _entry_.is_file():
+                    yield _entry_.name, _entry_.path, _entry_.stat()
+
+
+    def remove(self, name):
+        '''Removes the loose blob in either layout.'''
+        removed = False
+        for _path_ in (self.path(name), self._other_path(name)):
+            if isfile(_path_):
+                remove(_path_)
+                removed = True
+        if not removed:
+            raise FileNotFoundError(self.path(name))
+
+
+    def migrate(self):
+        '''Moves loose blobs stored in the other layout to the current layout.
+        Each blob is renamed atomically, so readers find it at any time. A
+        blob already in the current layout is newer, so the copy in the other
+        layout is removed instead.
+
+        Returns the number of moved blobs.'''
+        moved = 0
+        for _name_, _path_, _ in list(self._loose_entries()):
+            target_path = self.path(_name_)
+            if _path_ == target_path:
+                continue
+            if isfile(target_path):
+                remove(_path_)
+            else:
+                rename(_path_, self._write_path(_name_))
+                moved += 1
+        return moved
+
+
+    def repack(self, keep=None):
+        '''Moves all blobs into one new pack. When keep (a collection of names)
+        is supplied, blobs with other names are dropped. Loose blobs that were
+        modified while the pack was being written are left in place.
+
+        Returns the number of packed blobs.'''
+        makedirs(self._pack_path, exist_ok=True)
+        loose = dict((_name_, _stat_.st_mtime) for _name_, _stat_ in self.stats())
+        old_packs = list(self.packs)
+        selected = [_name_ for _name_ in self.names() if keep is None or _name_ in keep]
+        base_path = path_join(self._pack_path,
+                              'pack-{:.6f}-{}'.format(time(), getpid()))
+        packed = Pack.write(base_path,
+                            ((_name_, self.raw_chunks(_name_)) for _name_ in selected),
+                            self.chunk_size)
+
+        for _pack_ in old_packs:
+            _pack_.remove()
+        for _name_ in selected:
+            path = self._find_loose(_name_)
+            try:
+                if path and _name_ in loose and stat(path).st_mtime == loose[_name_]:
+                    remove(path)
+            except FileNotFoundError:
+                pass
+        self._packs = None
+        return packed
+
+
+    def close(self):
+        for _pack_ in self._packs or ():
+            _pack_.close()
+
+
+
+class ObjectStore(BlobStore):
+    '''Content addressed blob store: the name of each blob is the digest of its
+    contents. Adding the same contents twice stores them only once.
+
+    With max_chain, a new version of a file may be stored as a delta against
+    an earlier version (its base), which may itself be a delta: at most
+    max_chain deltas are applied to rebuild an object. The objects rebuilt
+    most recently are cached, so that rebuilding the objects of one snapshot
+    does not rebuild the same bases again. Compressed blobs are always
+    stored whole.'''
+
+    delta_mark = b'\x00dD\x00'
+    cache_size = 32 << 20 # bytes of rebuilt objects
+
+    def __init__(self, root_path, codec=None, skip_extensions=(), layout=None, max_chain=0):
+        super().__init__(root_path, codec, skip_extensions, layout)
+        self.max_chain = max_chain or 0
+        self._rebuilt = OrderedDict()
+        self._rebuilt_size = 0
+
+
+    @staticmethod
+    def digest(file_path, chunk_size=None):
+        hasher = sha1()
+        with open(file_path, 'rb') as data:
+            for _chunk_ in iter(lambda: data.read(chunk_size or ObjectStore.chunk_size), b''):
+                hasher.update(_chunk_)
+        return hasher.hexdigest()
+
+
+    def add(self, source_path):
+        '''Stores the file at source_path unless identical contents are already
+        stored. Returns the name (digest) of the object. The file is stored as
+        it is, so a compressed lib blob stays compressed.'''
+        name = ObjectStore.digest(source_path)
+        if not self.exists(name):
+            self.put_raw(source_path, name)
+        return name
+
+
+    def add_blob(self, store, name, base=None):
+        '''Like add, but takes the blob with the given name from another store,
+        whether it is loose or packed. The blob is stored as a delta against
+        the object named base when that saves at least half of its size. A
+        blob which may become a delta is read once, into memory; otherwise it
+        is hashed and copied in chunks.'''
+        if self.max_chain and base and self.exists(base):
+            data = b''.join(store.raw_chunks(name))
+            digest = sha1(data).hexdigest()
+            if self.exists(digest):
+                return digest
+            delta = base != digest and self._make_delta(base, data)
+            self.put_chunks([delta or data], digest)
+            return digest
+
+        hasher = sha1()
+        for _chunk_ in store.raw_chunks(name):
+            hasher.update(_chunk_)
+        digest = hasher.hexdigest()
+        if not self.exists(digest):
+            self.put_chunks(store.raw_chunks(name), digest)
+        return digest
+
+
+    def _delta_header(self, name):
+        '''Returns the base and the chain length of a delta object, or None if
+        the object is stored whole.'''
+        raw = super().raw_chunks(name)
+        first = next(raw, b'')
+        raw.close()
+        if not first.startswith(ObjectStore.delta_mark):
+            return None
+        base, depth = first[len(ObjectStore.delta_mark):].partition(b'\n')[0].split()
+        return base.decode(), int(depth)
+
+
+    def _make_delta(self, base, data):
+        if data.startswith(self.header_mark):
+            return None
+        header = self._delta_header(base)
+        depth = header[1] + 1 if header else 1
+        if depth > self.max_chain:
+            return None
+        source = self.rebuild(base)
+        if source.startswith(self.header_mark):
+            return None
+        delta = encode(source, data)
+        if len(delta) > len(data) // 2:
+            return None
+        return b''.join([ObjectStore.delta_mark,
+                         '{} {}\n'.format(base, depth).encode(),
+                         delta])
+
+
+    def rebuild(self, name):
+        '''Returns the raw contents of the object, applying the deltas of its
+        chain to the object at the end of the chain.'''
+        chain = []
+        while name not in self._rebuilt:
+            raw = b''.join(super().raw_chunks(name))
+            if not raw.startswith(ObjectStore.delta_mark):
+                self._remember(name, raw)
+                break
+            header, _, delta = raw[len(ObjectStore.delta_mark):].partition(b'\n')
+            chain.append((name, delta))
+            name = header.split()[0].decode()
+        data = self._rebuilt[name]
+        self._rebuilt.move_to_end(name)
+        for _name_, _delta_ in reversed(chain):
+            data = decode(data, _delta_)
+            self._remember(_name_, data)
+        return data
+
+
+    def _remember(self, name, data):
+        self._rebuilt[name] = data
+        self._rebuilt_size += len(data)
+        while self._rebuilt_size > ObjectStore.cache_size and len(self._rebuilt) > 1:
+            _, forgotten = self._rebuilt.popitem(last=False)
+            self._rebuilt_size -= len(forgotten)
+
+
+    def raw_chunks(self, name):
+        '''Yields the object as it was added: a delta object is rebuilt.'''
+        raw = super().raw_chunks(name)
+        first = next(raw, b'')
+        if first.startswith(ObjectStore.delta_mark):
+            raw.close()
+            yield self.rebuild(name)
+            return
+        yield first
+        yield from raw
+
+
+    def _find_plain_loose(self, name):
+        path = super()._find_plain_loose(name)
+        if path:
+            with open(path, 'rb') as blob:
+                if blob.read(len(ObjectStore.delta_mark)) == ObjectStore.delta_mark:
+                    return None
+        return path
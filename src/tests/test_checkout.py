@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+'''Tests of checking projects out of the library. Run from the src directory:
+
+    python3 -m unittest discover tests
+'''
+
+import unittest
+
+from os import makedirs, listdir
+from os.path import join as path_join
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from lib import DocProject
+from signals import OperationStatusSignals
+from constants import OperationName as op_name
+from bench.runner import BenchEnvironment
+
+
+class CorruptedBlobTest(unittest.TestCase):
+    def setUp(self):
+        self.root_dir = mkdtemp(prefix='dl-test-checkout-')
+        self.env = BenchEnvironment(self.root_dir)
+        self.source_dir = path_join(self.root_dir, 'ps-t')
+        makedirs(path_join(self.source_dir, self.env.doc_source_dir_name))
+        with open(path_join(self.source_dir, self.env.doc_source_dir_name,
+                            'index.rst'), 'w') as source_file:
+            source_file.write('Percona Server\n==============\n\n' * 100)
+
+
+    def tearDown(self):
+        rmtree(self.root_dir, ignore_errors=True)
+
+
+    def _run(self, operation):
+        env = self.env.make(operation, 'PS-T', source_dir=self.source_dir,
+                            compression='zlib')
+        return getattr(DocProject(env), operation)()
+
+
+    def test_corrupted_zlib_blob(self):
+        '''A compressed blob which cannot be decoded fails the checkout.'''
+        self._run(op_name.add)
+        lib_path = path_join(self.env.data_dir_path, self.env.lib_dir_name)
+        blob_path = path_join(lib_path, listdir(lib_path)[0])
+        with open(blob_path, 'rb') as blob:
+            data = bytearray(blob.read())
+        header_length = data.index(b'\n') + 1
+        data[header_length:header_length + 8] = b'\xff' * 8
+        with open(blob_path, 'wb') as blob:
+            blob.write(data)
+
+        status = self._run(op_name.checkout)
+        self.assertIn(OperationStatusSignals.CheckOut.Failed, status)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+'''Tests of the blob store. Run from the src directory:
+
+    python3 -m unittest discover tests
+'''
+
+import unittest
+
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from store import BlobStore
+
+
+class FlatLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.root_path = mkdtemp(prefix='dl-test-store-')
+        self.store = BlobStore(self.root_path)
+
+
+    def tearDown(self):
+        rmtree(self.root_path, ignore_errors=True)
+
+
+    def test_shard_named_blobs(self):
+        '''Blobs named like fan-out shards do not hide the other layout
+        paths of later blobs.'''
+        names = [str(_) for _ in range(300)] + ['ab', 'cd']
+        for _name_ in names:
+            self.store.put_chunks([_name_.encode()], _name_)
+        for _name_ in names:
+            self.assertEqual(b''.join(self.store.chunks(_name_)), _name_.encode())
+        self.store.remove('15')
+        self.assertFalse(self.store.exists('15'))
+        with self.assertRaises(FileNotFoundError):
+            list(self.store.chunks('15'))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
 
-from re import split as re_split
-from hashlib import sha1
+from re import split as re_split, compile as re_compile, escape
 from collections import OrderedDict
 from string import punctuation, whitespace
 
 from signals import ContextMark
 from messages import Info
+from profiler import profiler
+from hashing import get_hasher
+
+
+fingerprint_hasher = get_hasher('sha1')
+
+def use_fingerprint_hash(name):
+    '''Selects the hash of sentence and paragraph signatures.'''
+    global fingerprint_hasher
+    fingerprint_hasher = get_hasher(name)
+
+
+_token_sep = re_compile('[{}{}]'.format(whitespace, escape(punctuation))).split
+
 
 
 class Text:
@@ -22,7 +35,10 @@ class Text:
         self.file_path = file_path
         self.paragraphs = Paragraphs()
         self.sentences = OrderedDict()
-        self.read_lines(file_path)
+        with profiler.span('parse'):
+            self.read_lines(file_path)
+            profiler.count('paragraphs', len(self.paragraphs))
+            profiler.enabled and profiler.count('sentences', sum(len(_) for _ in self.paragraphs.contents))
 
 
     def read_lines(self, file_path):
@@ -42,10 +58,14 @@ class Text:
         that punctuation, whitespace, and case differences are not accounted for.'''
 
         line = line.rstrip()
-        pattern = "[{}{}]".format(whitespace, punctuation)
-        processed = [each for each in re_split(pattern, line) if each]
+        return ''.join(Text.tokenize(line)), line
+
+
+    @staticmethod
+    def tokenize(line):
+        '''Returns the lowercase words of the line without punctuation.'''
+        return [each for each in _token_sep(line.lower()) if each]
 
-        return ''.join(processed).lower(), line
 
     @staticmethod
     def split_at_token(paragraph, end_marks=None, sep_chars=None):
@@ -70,8 +90,8 @@ class Text:
 class TextFragment:
     def __init__(self, line, simplify_fn):
         self.simplified, self.text = simplify_fn(line)
-        self.signature = sha1(bytes(self.simplified,
-                                    encoding='UTF-8')).hexdigest()
+        self.signature = fingerprint_hasher(bytes(self.simplified,
+                                                  encoding='UTF-8')).hexdigest()
 
 
 
@@ -110,8 +130,8 @@ class Paragraph:
 
     @property
     def signature(self):
-        return sha1(bytes(''.join(self.sentences.keys()),
-                          encoding='UTF-8')).hexdigest()
+        return fingerprint_hasher(bytes(''.join(self.sentences.keys()),
+                                        encoding='UTF-8')).hexdigest()
 
 
 
@@ -154,13 +174,10 @@ class Paragraphs:
         this instance.
         '''
         
-        own_signatures = [self[_own_].signature
-                          for _own_ in self.contents]
-        received_signatures = [paragraphs[_received_].signature
-                               for _received_ in paragraphs.contents]
-        return [_compared_
-                for _compared_ in received_signatures
-                if _compared_ in own_signatures]
+        own_signatures = set(_own_.signature for _own_ in self.contents)
+        return [_received_.signature
+                for _received_ in paragraphs.contents
+                if _received_.signature in own_signatures]
 
 
 
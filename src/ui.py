@@ -6,6 +6,7 @@ from messages import Help
 from constants import (OperationName as op_name,
                        UIArgumentName as ui_name,
                        OptionInclude,
+                       ProfileMode,
                        NameFactory)
 
 
@@ -35,7 +36,7 @@ class CLIArgumentFactory(NameFactory):
 
 
 class CLI:
-    def __init__(self, option_sep_char, name_sep_char):
+    def __init__(self, option_sep_char, name_sep_char, argv=None):
         self.arguments = dict()
         self.operation = None
 
@@ -45,9 +46,28 @@ class CLI:
         project_code = cli_attr.make(ui_name.project_code)
         source_dir = cli_attr.make(ui_name.source_dir)
         ticket_id = cli_attr.make(ui_name.ticket_id)
+        ticket_summary = cli_attr.make(ui_name.ticket_summary)
         include = cli_attr.make(ui_name.include)
+        paths = cli_attr.make(ui_name.paths)
+        affected_by = cli_attr.make(ui_name.affected_by)
+        resolve_variables = cli_attr.make(ui_name.resolve_variables)
+        query = cli_attr.make(ui_name.query)
+        against = cli_attr.make(ui_name.against)
         context = cli_attr.make(ui_name.context)
         target = cli_attr.make(ui_name.target)
+        at = cli_attr.make(ui_name.at)
+        dry_run = cli_attr.make(ui_name.dry_run)
+        incremental = cli_attr.make(ui_name.incremental)
+        workers = cli_attr.make(ui_name.workers)
+        report = cli_attr.make(ui_name.report)
+        socket = cli_attr.make(ui_name.socket)
+        poll = cli_attr.make(ui_name.poll)
+        manifest = cli_attr.make(ui_name.manifest)
+        port = cli_attr.make(ui_name.port)
+        bind = cli_attr.make(ui_name.bind)
+        self._profile = cli_attr.make(ui_name.profile)
+        self._profile_output = cli_attr.make(ui_name.profile_output)
+        self._trace_memory = cli_attr.make(ui_name.trace_memory)
 
         main_command = argparse.ArgumentParser()
         sub_commands = main_command.add_subparsers(dest=ui_name.operation)
@@ -68,6 +88,24 @@ class CLI:
                                  required=True)
         checkout_sc.add_argument(ticket_id.option, dest=ticket_id.name,
                                  required=True)
+        checkout_sc.add_argument(at.option,
+                                 dest=at.name,
+                                 required=False,
+                                 help=Help.checkout_at())
+        checkout_sc.add_argument(ticket_summary.option,
+                                 dest=ticket_summary.name,
+                                 required=False,
+                                 help=Help.ticket_summary())
+        checkout_sc.add_argument(paths.option,
+                                 dest=paths.name,
+                                 action='append',
+                                 required=False,
+                                 help=Help.checkout_paths())
+        checkout_sc.add_argument(include.option,
+                                 dest=include.name,
+                                 action='append',
+                                 required=False,
+                                 help=Help.checkout_include())
 
         checkin_sc = sub_commands.add_parser(op_name.checkin,
                                              help=Help.checkin_project())
@@ -90,6 +128,15 @@ class CLI:
                               default=OptionInclude.auto,
                               dest=include.name,
                               required=False)
+        merge_sc.add_argument(affected_by.option,
+                              dest=affected_by.name,
+                              action='append',
+                              required=False,
+                              help=Help.affected_by())
+        merge_sc.add_argument(resolve_variables.option,
+                              dest=resolve_variables.name,
+                              action='store_true',
+                              help=Help.resolve_variables())
 
         detect_sc = sub_commands.add_parser(op_name.detect,
                                             help=Help.detect_project())
@@ -102,8 +149,131 @@ class CLI:
         detect_sc.add_argument(context.option,
                                dest=context.name,
                                required=False)
+        detect_sc.add_argument(affected_by.option,
+                               dest=affected_by.name,
+                               action='append',
+                               required=False,
+                               help=Help.affected_by())
 
-        self.arguments = vars(main_command.parse_args())
+        gc_sc = sub_commands.add_parser(op_name.gc,
+                                        help=Help.gc_library())
+        gc_sc.add_argument(dry_run.option,
+                           dest=dry_run.name,
+                           action='store_true',
+                           help=Help.dry_run())
+
+        sub_commands.add_parser(op_name.repack,
+                                help=Help.repack_library())
+
+        sub_commands.add_parser(op_name.migrate,
+                                help=Help.migrate_library())
+
+        verify_sc = sub_commands.add_parser(op_name.verify,
+                                            help=Help.verify_library())
+        verify_sc.add_argument(incremental.option,
+                               dest=incremental.name,
+                               action='store_true',
+                               help=Help.incremental())
+        verify_sc.add_argument(workers.option,
+                               dest=workers.name,
+                               type=int,
+                               required=False,
+                               help=Help.workers())
+        verify_sc.add_argument(report.option,
+                               dest=report.name,
+                               required=False,
+                               help=Help.verify_report())
+
+        search_sc = sub_commands.add_parser(op_name.search,
+                                            help=Help.search_library())
+        search_sc.add_argument(query.name,
+                               nargs='+',
+                               help=Help.search_query())
+        search_sc.add_argument(project_code.option,
+                               dest=project_code.name,
+                               required=False,
+                               help=Help.search_project())
+
+        diff_sc = sub_commands.add_parser(op_name.diff,
+                                          help=Help.diff_projects())
+        diff_sc.add_argument(project_code.option,
+                             dest=project_code.name,
+                             required=True)
+        diff_sc.add_argument(against.option,
+                             dest=against.name,
+                             required=True,
+                             help=Help.diff_against())
+        diff_sc.add_argument(report.option,
+                             dest=report.name,
+                             required=False,
+                             help=Help.diff_report())
+
+        daemon_sc = sub_commands.add_parser(op_name.daemon,
+                                            help=Help.run_daemon())
+        daemon_sc.add_argument(socket.option,
+                               dest=socket.name,
+                               required=False,
+                               help=Help.daemon_socket())
+
+        watch_sc = sub_commands.add_parser(op_name.watch,
+                                           help=Help.watch_project())
+        watch_sc.add_argument(project_code.option,
+                              dest=project_code.name,
+                              required=True)
+        watch_sc.add_argument(poll.option,
+                              dest=poll.name,
+                              action='store_true',
+                              help=Help.watch_poll())
+
+        batch_sc = sub_commands.add_parser(op_name.batch,
+                                           help=Help.run_batch())
+        batch_sc.add_argument(manifest.name,
+                              help=Help.batch_manifest())
+        batch_sc.add_argument(workers.option,
+                              dest=workers.name,
+                              type=int,
+                              required=False,
+                              help=Help.batch_workers())
+
+        serve_sc = sub_commands.add_parser(op_name.serve,
+                                           help=Help.serve_library())
+        serve_sc.add_argument(port.option,
+                              dest=port.name,
+                              type=int,
+                              default=8080,
+                              help=Help.serve_port())
+        serve_sc.add_argument(bind.option,
+                              dest=bind.name,
+                              default='127.0.0.1',
+                              help=Help.serve_bind())
+
+        for _sc_ in sub_commands.choices.values():
+            self._add_common_arguments(_sc_)
+
+        self.arguments = vars(main_command.parse_args(argv))
+
+
+    def _add_common_arguments(self, sub_command):
+        '''Adds the arguments accepted by every sub command.'''
+        sub_command.add_argument(self._profile.option,
+                                 dest=self._profile.name,
+                                 nargs='?',
+                                 const=ProfileMode.summary,
+                                 choices=[ProfileMode.summary,
+                                          ProfileMode.cprofile,
+                                          ProfileMode.json],
+                                 required=False,
+                                 help=Help.profile())
+        sub_command.add_argument(self._profile_output.option,
+                                 dest=self._profile_output.name,
+                                 required=False,
+                                 help=Help.profile_output())
+        sub_command.add_argument(self._trace_memory.option,
+                                 dest=self._trace_memory.name,
+                                 nargs='?',
+                                 const='-',
+                                 required=False,
+                                 help=Help.trace_memory())
 
 
 
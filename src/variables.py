@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+'''Shares reStructuredText substitutions (variables) between projects.
+
+A variable is defined in a document with the replace directive:
+
+    .. |product| replace:: Percona Server for MySQL
+
+Variables are kept in layers: one for the whole library, one per product
+(the project code up to the code separator, such as `ps' for `ps-8.0') and
+one per project. A project sees the variables of all three layers; the more
+specific layer wins. The project layer is collected when the project is added
+or checked in; the library and product layers are maintained by hand.'''
+
+import re
+import yaml
+
+from os import makedirs, stat, replace
+from os.path import join as path_join
+
+
+class VariableStore:
+    '''Reads, writes and resolves the layers of variables.'''
+
+    library_layer = 'library'
+    definition_pattern = re.compile(r'^\s*\.\.\s+\|([^|]+)\|\s+replace::\s*(.*?)\s*$')
+    # A reference followed by `_' is a hyperlink, which is left to Sphinx
+    reference_pattern = re.compile(r'\|([^|\s](?:[^|]*[^|\s])?)\|(?!_)')
+
+    def __init__(self, data_dir_path, variables_dir_name, data_file_suffix, code_sep):
+        self._variables_dir_path = path_join(data_dir_path, variables_dir_name)
+        self._data_file_suffix = data_file_suffix
+        self._code_sep = code_sep
+        self._layers = {}
+
+
+    def _make_path(self, layer):
+        return path_join(self._variables_dir_path,
+                         '.'.join([layer.lower().strip(), self._data_file_suffix]))
+
+
+    def layers(self, project_code):
+        '''The layers seen by the project, from the least to the most specific.'''
+        project_code = project_code.lower().strip()
+        product_code = project_code.partition(self._code_sep)[0]
+        layers = [self.library_layer]
+        for _layer_ in (product_code, project_code):
+            if _layer_ not in layers:
+                layers.append(_layer_)
+        return layers
+
+
+    def read(self, layer):
+        '''Returns the variables of the layer. A layer is read again only when
+        its file changes.'''
+        path = self._make_path(layer)
+        try:
+            modified = stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        cached = self._layers.get(path)
+        if cached is None or cached[0] != modified:
+            with open(path) as input_file:
+                cached = self._layers[path] = (modified, yaml.safe_load(input_file) or {})
+        return cached[1]
+
+
+    def save(self, layer, variables):
+        makedirs(self._variables_dir_path, exist_ok=True)
+        path = self._make_path(layer)
+        with open(path + '.tmp', 'w') as output_file:
+            yaml.dump(dict(variables), stream=output_file, default_flow_style=False)
+        replace(path + '.tmp', path)
+
+
+    def resolve(self, project_code):
+        '''Returns the lookup table of all variables visible in the project.'''
+        table = {}
+        for _layer_ in self.layers(project_code):
+            table.update(self.read(_layer_))
+        return table
+
+
+    @staticmethod
+    def scan(lines, variables):
+        '''Adds the definitions found in lines to the variables dictionary.'''
+        match = VariableStore.definition_pattern.match
+        for _line_ in lines:
+            found = match(_line_)
+            if found:
+                variables[found.group(1)] = found.group(2)
+        return variables
+
+
+    @staticmethod
+    def make_substitution(table):
+        '''Returns a function which replaces each reference to a variable of
+        the table in a line by its value. Definitions and unknown references
+        are left as they are. A line is matched once against one pattern,
+        whatever the number of variables.'''
+        def lookup(found):
+            return table.get(found.group(1), found.group(0))
+        match = VariableStore.definition_pattern.match
+        sub = VariableStore.reference_pattern.sub
+
+        def substitute(line):
+            if '|' in line and not match(line):
+                return sub(lookup, line)
+            return line
+        return substitute
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+'''Checks that library blobs exist and match the size and digest recorded in
+the meta documents.
+
+Blobs are checked in a pool of processes. The result of each check is kept in
+a state file together with the fingerprint of the blob (see
+BlobStore.fingerprint), so that an incremental run only reads blobs which
+changed since they were last found correct.'''
+
+import json
+
+from hashlib import sha1
+from os import replace
+from os.path import isfile
+
+from store import BlobStore, decode_errors
+
+
+class VerifyStatus:
+    ok = 'ok'
+    missing = 'missing'
+    size_mismatch = 'size_mismatch'
+    digest_mismatch = 'digest_mismatch'
+    corrupt = 'corrupt' # the blob cannot be read or decoded
+    unverified = 'unverified' # the meta record has no size or digest
+
+
+
+_store = None
+
+def init_worker(root_path, layout):
+    global _store
+    _store = BlobStore(root_path, layout=layout)
+
+
+def verify_blob(task):
+    '''Reads the blob and compares it with the expected size and digest.
+    Returns the name of the blob and its status.'''
+    name, size, digest = task
+    hasher = sha1()
+    length = 0
+    try:
+        for _chunk_ in _store.chunks(name):
+            hasher.update(_chunk_)
+            length += len(_chunk_)
+    except FileNotFoundError:
+        return name, VerifyStatus.missing
+    except decode_errors + (OSError,):
+        return name, VerifyStatus.corrupt
+    if size is None or digest is None:
+        return name, VerifyStatus.unverified
+    if length != size:
+        return name, VerifyStatus.size_mismatch
+    if hasher.hexdigest() != digest:
+        return name, VerifyStatus.digest_mismatch
+    return name, VerifyStatus.ok
+
+
+
+class VerificationState:
+    '''Fingerprints and digests of the blobs found correct by the last run.'''
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.entries = {}
+        if isfile(state_path):
+            with open(state_path) as state_file:
+                self.entries = json.load(state_file)
+
+
+    def is_current(self, name, fingerprint, digest):
+        entry = self.entries.get(name)
+        return bool(entry and fingerprint and
+                    entry == [list(fingerprint), digest])
+
+
+    def update(self, name, fingerprint, digest):
+        self.entries[name] = [list(fingerprint), digest]
+
+
+    def discard(self, name):
+        self.entries.pop(name, None)
+
+
+    def save(self):
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w') as state_file:
+            json.dump(self.entries, state_file)
+        replace(temporary_path, self.state_path)
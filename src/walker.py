@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+'''Finds documentation files in a directory tree.'''
+
+import re
+
+from os import scandir
+from os.path import join as path_join, isfile, isdir, sep as path_sep
+from fnmatch import translate
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class IgnoreRules:
+    '''Glob patterns of files and directories to skip.
+
+    A pattern without a slash matches the name of an entry at any depth. A
+    pattern with a slash matches the path relative to the top of the tree. A
+    trailing slash restricts the pattern to directories. This is the subset of
+    the .gitignore syntax that the walker supports; negated patterns (!) are
+    not supported and are skipped.'''
+
+    gitignore_file_name = '.gitignore'
+
+    def __init__(self, patterns=()):
+        names, paths, dir_names, dir_paths = [], [], [], []
+        for _pattern_ in patterns:
+            _pattern_ = _pattern_.strip()
+            if not _pattern_ or _pattern_.startswith(('#', '!')):
+                continue
+            dir_only = _pattern_.endswith('/')
+            _pattern_ = _pattern_.rstrip('/')
+            anchored = '/' in _pattern_
+            _pattern_ = _pattern_.lstrip('/')
+            target = ((dir_paths if dir_only else paths) if anchored
+                      else (dir_names if dir_only else names))
+            target.append(translate(_pattern_))
+        self._name = self._compile(names)
+        self._path = self._compile(paths)
+        self._dir_name = self._compile(names + dir_names)
+        self._dir_path = self._compile(paths + dir_paths)
+
+
+    @staticmethod
+    def _compile(patterns):
+        return patterns and re.compile('|'.join(patterns)).match
+
+
+    @staticmethod
+    def read_gitignore(top_dir):
+        path = path_join(top_dir, IgnoreRules.gitignore_file_name)
+        if isfile(path):
+            with open(path) as gitignore:
+                return [_line_.rstrip('\n') for _line_ in gitignore]
+        return []
+
+
+    def ignores_file(self, name, relative_path):
+        return bool((self._name and self._name(name)) or
+                    (self._path and self._path(relative_path)))
+
+
+    def ignores_dir(self, name, relative_path):
+        return bool((self._dir_name and self._dir_name(name)) or
+                    (self._dir_path and self._dir_path(relative_path)))
+
+
+
+class DirectoryWalker:
+    '''Yields the paths of files whose extensions are in the given collection.
+
+    Ignored directories are pruned, so the walker never descends into them.
+    With more than one worker, directories are scanned concurrently; this pays
+    off on very wide trees and network file systems. Paths are yielded as soon
+    as their directory is scanned so that the caller can process them while
+    the walk continues.'''
+
+    def __init__(self, extensions, ignore=(), use_gitignore=False, workers=1):
+        self.extensions = frozenset(extensions)
+        self.ignore = ignore
+        self.use_gitignore = use_gitignore
+        self.workers = workers or 1
+
+
+    def _scan(self, rules, top_dir, relative_dir):
+        '''Returns the matching file paths and the sub directories to visit.'''
+        files, dirs = [], []
+        extensions = self.extensions
+        with scandir(path_join(top_dir, relative_dir)) as entries:
+            for _entry_ in entries:
+                name = _entry_.name
+                relative_path = path_join(relative_dir, name) if relative_dir else name
+                if _entry_.is_dir(follow_symlinks=False):
+                    if not rules.ignores_dir(name, relative_path):
+                        dirs.append(relative_path)
+                elif name.rpartition('.')[-1] in extensions:
+                    if not rules.ignores_file(name, relative_path):
+                        files.append(_entry_.path)
+        return files, dirs
+
+
+    def make_rules(self, top_dir):
+        patterns = list(self.ignore)
+        if self.use_gitignore:
+            patterns += IgnoreRules.read_gitignore(top_dir)
+        return IgnoreRules(patterns)
+
+
+    def accepts(self, rules, relative_path):
+        '''Whether a walk from the top of the tree would yield the file at
+        relative_path.'''
+        parts = relative_path.split(path_sep)
+        for _index_ in range(1, len(parts)):
+            if rules.ignores_dir(parts[_index_ - 1], path_join(*parts[:_index_])):
+                return False
+        name = parts[-1]
+        return name.rpartition('.')[-1] in self.extensions and not rules.ignores_file(name, relative_path)
+
+
+    def walk(self, top_dir):
+        if not isdir(top_dir):
+            return
+        rules = self.make_rules(top_dir)
+
+        if self.workers > 1:
+            yield from self._walk_parallel(rules, top_dir)
+            return
+
+        pending = deque([''])
+        while pending:
+            files, dirs = self._scan(rules, top_dir, pending.popleft())
+            yield from files
+            pending.extend(dirs)
+
+
+    def _walk_parallel(self, rules, top_dir):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {pool.submit(self._scan, rules, top_dir, '')}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for _future_ in done:
+                    files, dirs = _future_.result()
+                    for _dir_ in dirs:
+                        running.add(pool.submit(self._scan, rules, top_dir, _dir_))
+                    yield from files
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+'''Reports the files changed under a directory tree as they are saved.
+
+On Linux, the kernel reports changes through inotify, which is used through
+ctypes: every directory of the tree that the walker would enter is watched,
+and directories created later are watched as soon as they appear. Elsewhere,
+or when inotify is not available (such as on some network file systems), the
+tree is walked again at a fixed interval and the modification times and
+sizes of the files are compared.
+
+Editors save a file in several steps (a temporary file, a rename, a change of
+attributes), so changes are collected until none arrives for a short period:
+a burst of events is reported as one batch.'''
+
+import ctypes
+import ctypes.util
+import struct
+
+from os import read as os_read, close, fsdecode, stat, scandir
+from os.path import join as path_join, relpath
+from select import select
+from time import monotonic, sleep
+
+
+class InotifyWatcher:
+    '''Watches a tree with inotify. poll returns the relative paths of the
+    files and directories which have changed, or None if the kernel has
+    dropped events and the whole tree must be checked again.'''
+
+    name = 'inotify'
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+
+    mask = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    event = struct.Struct('iIII')
+    buffer_size = 64 * 1024
+
+    def __init__(self, top_dir, rules):
+        self.top_dir = top_dir
+        self.rules = rules
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(InotifyWatcher.IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, 'inotify_init1')
+        self._dirs = {}
+        try:
+            self._add('')
+        except OSError:
+            self.close()
+            raise
+
+
+    def _add(self, relative_dir):
+        '''Watches the directory and the directories under it.'''
+        path = path_join(self.top_dir, relative_dir)
+        descriptor = self._libc.inotify_add_watch(self._fd, path.encode(), InotifyWatcher.mask)
+        if descriptor < 0:
+            errno = ctypes.get_errno()
+            if not relative_dir:
+                raise OSError(errno, 'inotify_add_watch', path)
+            return # removed in the meantime
+        self._dirs[descriptor] = relative_dir
+        try:
+            children = _list_dirs(path)
+        except FileNotFoundError:
+            return
+        for _name_ in children:
+            relative_path = path_join(relative_dir, _name_) if relative_dir else _name_
+            if not self.rules.ignores_dir(_name_, relative_path):
+                self._add(relative_path)
+
+
+    def poll(self, timeout):
+        '''Waits up to timeout seconds (forever if None) for changes.'''
+        if not select([self._fd], [], [], timeout)[0]:
+            return set()
+        data = os_read(self._fd, InotifyWatcher.buffer_size)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = InotifyWatcher.event.unpack_from(data, offset)
+            offset += InotifyWatcher.event.size
+            name = fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & InotifyWatcher.IN_Q_OVERFLOW:
+                return None
+            if mask & InotifyWatcher.IN_IGNORED:
+                self._dirs.pop(descriptor, None)
+                continue
+            relative_dir = self._dirs.get(descriptor)
+            if relative_dir is None or not name:
+                continue
+            relative_path = path_join(relative_dir, name) if relative_dir else name
+            changed.add(relative_path)
+            if (mask & InotifyWatcher.IN_ISDIR and mask & (InotifyWatcher.IN_CREATE |
+                                                           InotifyWatcher.IN_MOVED_TO) and
+                    not self.rules.ignores_dir(name, relative_path)):
+                self._add(relative_path)
+        return changed
+
+
+    def close(self):
+        if self._fd is not None:
+            close(self._fd)
+            self._fd = None
+
+
+
+class PollingWatcher:
+    '''Watches a tree by walking it again every interval seconds.'''
+
+    name = 'polling'
+    interval = 0.5
+
+    def __init__(self, top_dir, walker):
+        self.top_dir = top_dir
+        self.walker = walker
+        self._files = self._scan()
+
+
+    def _scan(self):
+        files = {}
+        for _path_ in self.walker.walk(self.top_dir):
+            try:
+                status = stat(_path_)
+            except FileNotFoundError:
+                continue
+            files[relpath(_path_, self.top_dir)] = (status.st_mtime_ns, status.st_size)
+        return files
+
+
+    def poll(self, timeout):
+        '''Waits up to timeout seconds (forever if None) for changes.'''
+        started = monotonic()
+        while True:
+            files = self._scan()
+            changed = set(_path_ for _path_ in files.keys() | self._files.keys()
+                          if files.get(_path_) != self._files.get(_path_))
+            self._files = files
+            if changed:
+                return changed
+            if timeout is not None and monotonic() - started >= timeout:
+                return changed
+            sleep(PollingWatcher.interval if timeout is None
+                  else min(PollingWatcher.interval, timeout))
+
+
+    def close(self):
+        pass
+
+
+
+def _list_dirs(path):
+    with scandir(path) as entries:
+        return [_entry_.name for _entry_ in entries if _entry_.is_dir(follow_symlinks=False)]
+
+
+
+def make_watcher(top_dir, walker, poll=False):
+    '''Returns an inotify watcher unless polling is requested or inotify is
+    not available.'''
+    if not poll:
+        try:
+            return InotifyWatcher(top_dir, walker.make_rules(top_dir))
+        except (OSError, AttributeError):
+            pass # not Linux, or the limit of inotify instances is reached
+    return PollingWatcher(top_dir, walker)
+
+
+
+def batches(watcher, debounce, limit=0.8):
+    '''Yields the sets of paths changed together: a batch ends when no change
+    arrives within debounce seconds, or after limit seconds so that feedback
+    is not delayed by continuous changes. None stands for a batch which may
+    include any file.'''
+    while True:
+        changed = watcher.poll(None)
+        if changed == set():
+            continue
+        started = monotonic()
+        while changed is not None and monotonic() - started < limit:
+            more = watcher.poll(debounce)
+            if not more:
+                if more is None:
+                    changed = None
+                break
+            changed |= more
+        yield changed